@@ -1,30 +1,193 @@
-
-from langchain_huggingface import HuggingFaceEmbeddings
-from langchain_community.vectorstores import FAISS
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from langchain_core.embeddings import Embeddings
 from langchain_text_splitters import RecursiveCharacterTextSplitter
+from vector_store import VectorStore, DEFAULT_PATH
+from embedding_cache import CachedEmbeddings
+
+# Embedding pipeline settings; tune per machine with benchmarks/embedding_throughput.py
+EMBED_BATCH_SIZE = int(os.environ.get("RAG_EMBED_BATCH_SIZE", 32))
+EMBED_WORKERS = int(os.environ.get("RAG_EMBED_WORKERS", 2))
+
+
+class BatchedEmbeddings(Embeddings):
+    """
+    Embeds documents in fixed-size batches on a bounded thread pool.
+    Texts are sorted by length first so each batch pads to a similar size,
+    and results are returned in the original order.
+    """
+
+    def __init__(self, model, batch_size: int = EMBED_BATCH_SIZE, max_workers: int = EMBED_WORKERS):
+        self.model = model
+        self.model_name = getattr(model, "model_name", type(model).__name__)
+        self.batch_size = max(1, batch_size)
+        self.max_workers = max(1, max_workers)
+
+    def embed_documents(self, texts):
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        batches = [order[i:i + self.batch_size] for i in range(0, len(order), self.batch_size)]
+        if len(batches) <= 1 or self.max_workers == 1:
+            results = [self.model.embed_documents([texts[i] for i in batch]) for batch in batches]
+        else:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                results = list(pool.map(lambda batch: self.model.embed_documents([texts[i] for i in batch]), batches))
+
+        vectors = [None] * len(texts)
+        for batch, batch_vectors in zip(batches, results):
+            for i, vector in zip(batch, batch_vectors):
+                vectors[i] = vector
+        return vectors
+
+    def embed_query(self, text):
+        return self.model.embed_query(text)
+
+
+class LazyEmbeddings(Embeddings):
+    """
+    Defers constructing the embedding model (torch + sentence-transformers) until it is needed.
+    warm_up() starts loading in a background thread; embed calls block only until it is ready.
+    """
+
+    def __init__(self, loader, model_name: str):
+        self._loader = loader
+        self.model_name = model_name
+        self._model = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        with self._lock:
+            if self._model is None:
+                self._model = self._loader()
+        return self._model
+
+    def _background_load(self):
+        try:
+            self._load()
+        except Exception as e:
+            print(f"Background embedding model load failed ({e}). Will retry on first use.", file=sys.stderr)
+
+    def warm_up(self):
+        if self._model is None:
+            threading.Thread(target=self._background_load, name="embed-warmup", daemon=True).start()
+
+    def is_ready(self) -> bool:
+        return self._model is not None
+
+    @property
+    def model(self):
+        return self._model if self._model is not None else self._load()
+
+    def embed_documents(self, texts):
+        return self.model.embed_documents(texts)
+
+    def embed_query(self, text):
+        return self.model.embed_query(text)
+
+
+EMBED_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+
+def _load_base_model():
+    from langchain_huggingface import HuggingFaceEmbeddings
+    try:
+        # Try default initialization (will use CUDA/MPS if available)
+        return HuggingFaceEmbeddings(model_name=EMBED_MODEL_NAME)
+    except Exception as e:
+        print(f"GPU initialization failed for embeddings ({e}). Falling back to CPU...", file=sys.stderr)
+        return HuggingFaceEmbeddings(
+            model_name=EMBED_MODEL_NAME,
+            model_kwargs={'device': 'cpu'}
+        )
+
+base_model = LazyEmbeddings(_load_base_model, EMBED_MODEL_NAME)
+
+def warm_up():
+    """Start loading the embedding model in the background (call once at server boot)."""
+    base_model.warm_up()
+
+# Every embed_model user hits the on-disk embedding cache before running the transformer
+embed_model = CachedEmbeddings(BatchedEmbeddings(base_model))
+
+CHUNK_SIZE = 500
+CHUNK_OVERLAP = 100
+text_splitter = RecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
+
+# Persistent on-disk indexes shared by every RAG caller (Gmail, Drive, ...), one per embedding model
+_stores = {}
+_stores_lock = threading.Lock()
+
+def get_store(embed_model=embed_model):
+    name = getattr(embed_model, "model_name", type(embed_model).__name__)
+    with _stores_lock:
+        if name not in _stores:
+            _stores[name] = VectorStore(embed_model, path=os.path.join(DEFAULT_PATH, name.replace("/", "_")))
+        return _stores[name]
+
+def stream_chunks(pieces, splitter=text_splitter, chunk_size=CHUNK_SIZE):
+    """
+    Incrementally split an iterable of text pieces (e.g. PDF pages) into chunks.
+    Only a few chunks' worth of text is buffered; the trailing chunk is carried over
+    so chunks still span piece boundaries.
+    """
+    buffer = ""
+    for piece in pieces:
+        if not piece:
+            continue
+        buffer = f"{buffer}\n{piece}" if buffer else piece
+        if len(buffer) >= 4 * chunk_size:
+            chunks = splitter.split_text(buffer)
+            yield from chunks[:-1]
+            buffer = chunks[-1] if chunks else ""
+    if buffer.strip():
+        yield from splitter.split_text(buffer)
+
+def index_stream(doc_id, digest, pieces, metadata=None, embed_model=embed_model, store=None, pinned=False):
+    """Stream one large document into the index without materializing its full text.
+    `pieces` is only consumed if `digest` differs from what is already indexed for `doc_id`.
+    `pinned` documents are kept until forget(), whatever else is indexed."""
+    if store is None:
+        store = get_store(embed_model)
+    store.upsert_stream(doc_id, digest, stream_chunks(pieces), metadata, pinned=pinned)
+    return doc_id
+
+def is_indexed(doc_id, digest, embed_model=embed_model, store=None):
+    """True if `doc_id` is already indexed at `digest`, so its text need not be extracted."""
+    if store is None:
+        store = get_store(embed_model)
+    return store.is_current(doc_id, digest)
+
+def persist(embed_model=embed_model, store=None):
+    """Write pending index updates to disk now, e.g. after a batch of index_stream calls."""
+    if store is None:
+        store = get_store(embed_model)
+    store.flush()
+
+def forget(doc_ids, embed_model=embed_model, store=None):
+    """Remove documents from the index."""
+    if store is None:
+        store = get_store(embed_model)
+    return store.remove(doc_ids)
+
+def retrieve(query, doc_ids=None, embed_model=embed_model, results=5, store=None, hybrid=False):
+    """Return the `results` most relevant indexed chunks for `query`, joined as context."""
+    if store is None:
+        store = get_store(embed_model)
+
+    print("Retrieving Relevant Information...", file=sys.stderr)
+    relevant_docs = store.search(query, k=results, doc_ids=doc_ids, hybrid=hybrid)
+    return "\n\n".join([doc.page_content for doc in relevant_docs])
+
+def RAG(docs, query, embed_model=embed_model, results=5, store=None, hybrid=False):
+    """Index `docs` and return the `results` most relevant chunks for `query`.
+    hybrid=True fuses BM25 keyword ranking with vector similarity (better for exact terms like course codes)."""
+
+    if store is None:
+        store = get_store(embed_model)
+
+    print("Indexing documents...", file=sys.stderr)
+    doc_ids = store.upsert(docs, text_splitter)
+    if hasattr(embed_model, "cache"):
+        print(f"Embedding cache: {embed_model.cache.stats()}", file=sys.stderr)
 
-try:
-    # Try default initialization (will use CUDA/MPS if available)
-    embed_model = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
-except Exception as e:
-    print(f"GPU initialization failed for embeddings ({e}). Falling back to CPU...")
-    embed_model = HuggingFaceEmbeddings(
-        model_name="sentence-transformers/all-MiniLM-L6-v2",
-        model_kwargs={'device': 'cpu'}
-    )
-
-def RAG(docs, query, embed_model=embed_model, results=5):
-
-    print("Encoding text...")
-    text_splitter = RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=100)
-    all_splits = text_splitter.split_documents(docs)
-    texts = [doc.page_content for doc in all_splits]
-    vectorstore = FAISS.from_texts(texts, embed_model)
-
-    print("Retrieving Relevant Information...")
-    retriever = vectorstore.as_retriever(search_kwargs={"k": results})
-    
-    relevant_docs = retriever.invoke(query)
-    context = "\n\n".join([doc.page_content for doc in relevant_docs])
-
-    return context
\ No newline at end of file
+    return retrieve(query, doc_ids, embed_model=embed_model, results=results, store=store, hybrid=hybrid)
@@ -0,0 +1,96 @@
+"""
+Calendar lookup benchmark.
+Runs the calendar tools against a local Calendar stand-in (fake_calendar.py) with a fixed
+delay per request, comparing one events.list call per lookup (the old behaviour) with the
+local mirror kept current through syncToken incremental sync. Reports per-lookup latency,
+the cost of the first full sync, and of a sync tick with nothing and with one change.
+
+Usage: python benchmarks/calendar_mirror.py [--events 300] [--lookups 50] [--latency-ms 80]
+"""
+import argparse
+import datetime
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("NO_GCE_CHECK", "True")
+
+from fake_calendar import Calendar, calendar_service, start_server
+from services.calender import GoogleCalendar
+
+QUERIES = ["quiz", "lab", "exam schedule", "KD101", "project"]
+
+
+def api_upcoming(service, max_results=10):
+    now = datetime.datetime.now(datetime.UTC).isoformat()
+    return service.events().list(calendarId="primary", timeMin=now, maxResults=max_results,
+                                 singleEvents=True, orderBy="startTime").execute().get("items", [])
+
+
+def api_search(service, query, max_results=10, days_ahead=30):
+    now = datetime.datetime.now(datetime.UTC)
+    return service.events().list(calendarId="primary", q=query, timeMin=now.isoformat(),
+                                 timeMax=(now + datetime.timedelta(days=days_ahead)).isoformat(),
+                                 maxResults=max_results, singleEvents=True,
+                                 orderBy="startTime").execute().get("items", [])
+
+
+def timed(handler, fn):
+    handler.requests, handler.bytes_sent = 0, 0
+    start = time.perf_counter()
+    result = fn()
+    return result, {"ms": round((time.perf_counter() - start) * 1000, 3), "requests": handler.requests,
+                    "kb": round(handler.bytes_sent / 1024, 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=300)
+    parser.add_argument("--lookups", type=int, default=50)
+    parser.add_argument("--latency-ms", type=float, default=80)
+    parser.add_argument("--json", help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    server, url, handler = start_server(Calendar(count=args.events), latency=args.latency_ms / 1000)
+    service = calendar_service(url)
+    results = {"events": args.events}
+
+    lookups = [lambda: api_upcoming(service)] + [lambda q=q: api_search(service, q) for q in QUERIES]
+    api_ms = [timed(handler, lookups[n % len(lookups)])[1]["ms"] for n in range(args.lookups)]
+    results["api_lookup_ms"] = round(statistics.mean(api_ms), 3)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        calendar = GoogleCalendar(None, store_path=os.path.join(tmp, "calendar_mirror.json"))
+        calendar.service = service
+        _, results["full_sync"] = timed(handler, lambda: calendar.sync(force=True))
+
+        lookups = [calendar.upcoming_events] + [lambda q=q: calendar.search_events(q) for q in QUERIES]
+        mirror_ms = [timed(handler, lookups[n % len(lookups)])[1]["ms"] for n in range(args.lookups)]
+        results["mirror_lookup_ms"] = round(statistics.mean(mirror_ms), 3)
+
+        # Same answers as the API for upcoming events and for a search
+        same = [e["id"] for e in api_upcoming(service)] == [e["id"] for e in calendar.upcoming_events()]
+        same &= [e["id"] for e in api_search(service, "quiz")] == [e["id"] for e in calendar.search_events("quiz")]
+        results["same_results"] = same
+
+        _, results["idle_tick"] = timed(handler, lambda: calendar.sync(force=True))
+        created = calendar.create_event("Quiz 3 review", (datetime.datetime.now(datetime.UTC) + datetime.timedelta(hours=2)).isoformat(),
+                                        (datetime.datetime.now(datetime.UTC) + datetime.timedelta(hours=3)).isoformat())
+        server.RequestHandlerClass.calendar.delete(created["id"])
+        _, results["change_tick"] = timed(handler, lambda: calendar.sync(force=True))
+        results["deleted_event_gone"] = created["id"] not in calendar.mirror.events
+
+    server.shutdown()
+    for key, value in results.items():
+        print(f"{key:18s} {value}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
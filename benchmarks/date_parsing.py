@@ -0,0 +1,102 @@
+"""
+Date parsing benchmark.
+Times parse_datetime_to_iso (used by calendar_create) on typical inputs, comparing plain
+dateparser across all its locales (the old behaviour), dateparser restricted to
+DATEPARSER_LANGUAGES, the fast path for common formats, and the per-day memo. Also checks
+that the fast path agrees with dateparser wherever it answers, and reports the first parse in a
+fresh process (dateparser import and locale loading included), which the fast path avoids,
+and that phrases dateparser resolves against the current time ("next week") are not memoized.
+
+Usage: python benchmarks/date_parsing.py [--repeats 20]
+"""
+import argparse
+import datetime
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import pytz
+
+import services.calender as calendar_module
+from services.calender import DATEPARSER_LANGUAGES, _fast_parse, _parse, _parse_on_day, parse_datetime_to_iso
+
+TIMEZONE = "Asia/Kolkata"
+SETTINGS = {"TIMEZONE": TIMEZONE, "RETURN_AS_TIMEZONE_AWARE": True}
+INPUTS = ["8th Sep 2025 at 23:30", "2025-09-08T23:30:00+05:30", "2025-09-08 23:30", "tomorrow 5pm",
+          "Tomorrow at 5:30 PM", "today at 11am", "Sep 8, 2025 11:30 pm", "1st March 2026 at 9:05",
+          "5pm", "next friday at 3pm", "12am tomorrow", "in 2 hours", "at 5", "tomorrow 5", "20250908",
+          "day after tomorrow", "next week", "2 days later"]
+LIVE_INPUTS = ["day after tomorrow", "next week", "2 days later"]
+
+
+def first_parse_ms(code):
+    """Wall time of the first parse of INPUTS[0] in a fresh interpreter."""
+    script = (f"import sys, time; sys.path.insert(0, {ROOT!r}); start = time.perf_counter(); {code}; "
+              "print((time.perf_counter() - start) * 1000)")
+    out = subprocess.run([sys.executable, "-c", script], check=True, capture_output=True, text=True).stdout
+    return round(float(out.split()[-1]), 1)
+
+
+def per_call_ms(fn, repeats):
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for text in INPUTS:
+            try:
+                fn(text)
+            except ValueError:
+                pass
+        times.append((time.perf_counter() - start) * 1000 / len(INPUTS))
+    return round(statistics.median(times), 3)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--json", help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    text, settings = INPUTS[0], f"settings={SETTINGS!r}"
+    results = {
+        "first_parse_all_locales_ms": first_parse_ms(f"import dateparser; dateparser.parse({text!r}, {settings})"),
+        "first_parse_languages_ms": first_parse_ms(
+            f"import dateparser; dateparser.parse({text!r}, languages={DATEPARSER_LANGUAGES!r}, {settings})"),
+        "first_parse_fast_path_ms": first_parse_ms(
+            f"from services.calender import parse_datetime_to_iso; parse_datetime_to_iso({text!r}, {TIMEZONE!r})"),
+    }
+
+    import dateparser
+    tz = pytz.timezone(TIMEZONE)
+    results["fast_path_hits"] = f"{sum(_fast_parse(text, tz) is not None for text in INPUTS)}/{len(INPUTS)}"
+    # The fast path must give dateparser's answer whenever it gives one
+    results["matches_dateparser"] = all(
+        fast == dateparser.parse(text, languages=DATEPARSER_LANGUAGES, settings=SETTINGS)
+        for text in INPUTS if (fast := _fast_parse(text, tz)) is not None)
+
+    results["dateparser_all_locales_ms"] = per_call_ms(lambda text: dateparser.parse(text, settings=SETTINGS), args.repeats)
+    results["dateparser_languages_ms"] = per_call_ms(
+        lambda text: dateparser.parse(text, languages=DATEPARSER_LANGUAGES, settings=SETTINGS), args.repeats)
+    results["fast_path_ms"] = per_call_ms(lambda text: _parse(text, TIMEZONE), args.repeats)
+    calendar_module._parse_on_day.cache_clear()
+    results["memoized_ms"] = per_call_ms(lambda text: parse_datetime_to_iso(text, TIMEZONE), args.repeats)
+    # Already memoized above; a second later these must still follow the clock
+    time.sleep(1)
+    today = datetime.datetime.now(tz).date()
+    results["live_not_memoized"] = all(
+        parse_datetime_to_iso(text, TIMEZONE) != _parse_on_day(text, TIMEZONE, today)[0] for text in LIVE_INPUTS)
+
+    for key, value in results.items():
+        print(f"{key:27s} {value}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Drive download cap benchmark.
+Runs GoogleDrive.get_results over a listing that mixes normal PDFs with an oversized PDF, a
+large plain-text file and a Google Slides deck, served by a local Drive stand-in
+(fake_drive.py). It compares whole-file downloads in one chunk with no checks (the old
+behaviour) against streamed chunked downloads with a per-file byte cap, where unsupported
+formats and oversized files are skipped from the listing alone. It also times extracting
+a long PDF in full vs. stopping at DRIVE_MAX_TEXT_CHARS. Embeddings use a hash embedder.
+
+Usage: python benchmarks/drive_download.py [--max-file-mb 2] [--big-mb 12] [--latency-ms 50]
+"""
+import argparse
+import functools
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("NO_GCE_CHECK", "True")
+
+import services.drive as drive_module
+from fake_drive import Files, drive_service, start_server
+from rag_suite import HashEmbeddings
+from services.drive import DownloadCache, DriveIndex, GoogleDrive, extract_pages, extract_text
+from synthetic import make_pdf, paragraph
+from vector_store import VectorStore
+
+SLIDES = "application/vnd.google-apps.presentation"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--max-file-mb", type=float, default=2)
+    parser.add_argument("--big-mb", type=float, default=12, help="Size of the oversized PDF and text file")
+    parser.add_argument("--latency-ms", type=float, default=50)
+    parser.add_argument("--pages", type=int, default=1000, help="Pages of the long PDF for the extraction cap")
+    parser.add_argument("--max-chars", type=int, default=200000)
+    parser.add_argument("--json", help="Write results to this JSON file")
+    args = parser.parse_args()
+    big = int(args.big_mb * 1024 * 1024)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        files = Files()
+        for n in range(3):
+            with open(make_pdf(os.path.join(tmp, f"doc{n}.pdf"), pages=20, seed=n), "rb") as f:
+                files.add(f"file{n}", f"doc{n}.pdf", "application/pdf", f.read())
+        files.add("slides", "lecture.pptx", SLIDES, b"")
+        with open(make_pdf(os.path.join(tmp, "doc0.pdf"), pages=20), "rb") as f:
+            files.add("scan", "scan.pdf", "application/pdf", f.read() + os.urandom(big))
+        rng = random.Random(0)
+        text = "\n".join(paragraph(rng) for _ in range(200)).encode()
+        files.add("log", "notes.txt", "text/plain", text * (big // len(text) + 1))
+        server, url, handler = start_server(files, latency=args.latency_ms / 1000)
+        local = threading.local()
+
+        def thread_service():
+            if not hasattr(local, "service"):
+                local.service = drive_service(url)
+            return local.service
+
+        results = {}
+        for label in ("whole_files", "capped"):
+            store = VectorStore(HashEmbeddings(), path=os.path.join(tmp, f"index_{label}"))
+            for name in ("index_stream", "is_indexed", "retrieve"):
+                original = getattr(drive_module, f"_bench_{name}", getattr(drive_module, name))
+                setattr(drive_module, f"_bench_{name}", original)
+                setattr(drive_module, name, functools.partial(original, store=store))
+            drive = GoogleDrive(None, cache=DownloadCache(os.path.join(tmp, f"cache_{label}")),
+                                text_cache=DownloadCache(os.path.join(tmp, f"text_{label}")),
+                                index=DriveIndex(os.path.join(tmp, f"state_{label}.json")))
+            drive.service = drive_service(url)
+            drive._thread_service = thread_service
+            if label == "whole_files":
+                drive.chunk_bytes = 100 * 1024 * 1024
+                drive.max_file_bytes = float("inf")
+                drive._skip_reason = lambda file: None
+            else:
+                drive.max_file_bytes = int(args.max_file_mb * 1024 * 1024)
+            handler.requests, handler.bytes_sent = 0, 0
+            start = time.perf_counter()
+            context = drive.get_results("quiz deadline", ["quiz"], max_results=6)
+            elapsed = time.perf_counter() - start
+            results[label] = {"seconds": round(elapsed, 2), "requests": handler.requests,
+                              "mb_downloaded": round(handler.bytes_sent / 2**20, 2),
+                              "cache_mb": round(sum(e["size"] for e in drive.cache.entries.values()) / 2**20, 2),
+                              "context_chars": len(context)}
+            print(f"{label:12s} {results[label]}")
+        server.shutdown()
+
+        path = make_pdf(os.path.join(tmp, "long.pdf"), pages=args.pages)
+        start = time.perf_counter()
+        pages = list(extract_pages(path))
+        full = time.perf_counter() - start
+        start = time.perf_counter()
+        capped = list(extract_text(path, max_chars=args.max_chars))
+        results["extract"] = {"full_seconds": round(full, 2), "full_pages": len(pages),
+                              "capped_seconds": round(time.perf_counter() - start, 2), "capped_pages": len(capped)}
+        print(f"{'extract':12s} {results['extract']}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""
+Drive corpus index benchmark.
+Serves synthetic PDFs from a local Drive stand-in (fake_drive.py) and measures:
+
+  cold         GoogleDrive.get_results with nothing indexed (list, download, extract, embed)
+  backfill     the first GoogleDrive.sync, which indexes the whole corpus
+  warm         get_results answered from the synced corpus index (one files.list, no downloads)
+  outside      get_results for keywords only a file outside the corpus (past INDEX_MAX_FILES) matches
+  incremental  a sync after one file is modified and one deleted (changes.list)
+  reindex      a sync over an emptied vector index, re-indexing the corpus from the extracted-text cache
+  concurrent   two threads indexing the same file at once (background sync and a search) with a slow
+               embedder; the store must come out consistent and searchable
+
+with HTTP requests and bytes downloaded for each. Embeddings use a hash embedder.
+
+Usage: python benchmarks/drive_index.py [--files 10] [--pages 40] [--latency-ms 50] [--queries 20]
+"""
+import argparse
+import functools
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("NO_GCE_CHECK", "True")
+
+import services.drive as drive_module
+from fake_drive import Files, drive_service, start_server
+from rag_suite import QUERIES, HashEmbeddings
+from services.drive import DownloadCache, DriveIndex, GoogleDrive
+from synthetic import make_pdf
+from vector_store import VectorStore
+
+
+class SlowEmbeddings(HashEmbeddings):
+    """Hash embedder that takes a while per batch, so concurrent indexing of one file overlaps."""
+
+    def embed_documents(self, texts):
+        time.sleep(0.05)
+        return super().embed_documents(texts)
+
+
+def use_store(store):
+    """Point the RAG helpers services.drive calls at `store`."""
+    for name in ("index_stream", "is_indexed", "retrieve", "forget", "persist"):
+        original = getattr(drive_module, f"_bench_{name}", getattr(drive_module, name))
+        setattr(drive_module, f"_bench_{name}", original)
+        setattr(drive_module, name, functools.partial(original, store=store))
+
+
+def measure(handler, fn):
+    handler.requests, handler.bytes_sent = 0, 0
+    start = time.perf_counter()
+    result = fn()
+    return result, {"ms": round((time.perf_counter() - start) * 1000, 1), "requests": handler.requests,
+                    "kb_downloaded": round(handler.bytes_sent / 1024, 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=10)
+    parser.add_argument("--pages", type=int, default=40)
+    parser.add_argument("--latency-ms", type=float, default=50)
+    parser.add_argument("--queries", type=int, default=20)
+    parser.add_argument("--json", help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        files = Files()
+        for n in range(args.files):
+            path = make_pdf(os.path.join(tmp, f"doc{n}.pdf"), pages=args.pages, seed=n)
+            with open(path, "rb") as f:
+                files.add(f"file{n}", f"doc{n}.pdf", "application/pdf", f.read(), text="quiz notes")
+        # Listed last, so the backfill (capped at --files) leaves it out of the corpus
+        path = make_pdf(os.path.join(tmp, "outside.pdf"), pages=args.pages, seed=args.files)
+        with open(path, "rb") as f:
+            files.add("outside", "outside.pdf", "application/pdf", f.read(), text="hostel allotment")
+        drive_module.INDEX_MAX_FILES = args.files
+        server, url, handler = start_server(files, latency=args.latency_ms / 1000)
+        local = threading.local()
+
+        def thread_service():
+            if not hasattr(local, "service"):
+                local.service = drive_service(url)
+            return local.service
+
+        def new_drive(label, embedder=None):
+            store = VectorStore(embedder or HashEmbeddings(), path=os.path.join(tmp, f"index_{label}"))
+            use_store(store)
+            drive = GoogleDrive(None, cache=DownloadCache(os.path.join(tmp, f"cache_{label}")),
+                                text_cache=DownloadCache(os.path.join(tmp, f"text_{label}")),
+                                index=DriveIndex(os.path.join(tmp, f"state_{label}.json")))
+            drive.service = drive_service(url)
+            drive._thread_service = thread_service
+            return drive, store
+
+        results = {"files": args.files, "pages": args.pages}
+        drive, _ = new_drive("cold")
+        _, results["cold"] = measure(handler, lambda: drive.get_results(QUERIES[0], ["quiz"], max_results=5))
+
+        drive, store = new_drive("corpus")
+        _, results["backfill"] = measure(handler, drive.sync)
+        timings = []
+        for n in range(args.queries):
+            _, row = measure(handler, lambda: drive.get_results(QUERIES[n % len(QUERIES)], ["quiz"]))
+            timings.append(row)
+        results["warm"] = {"mean_ms": round(statistics.mean(r["ms"] for r in timings), 1),
+                           "requests": sum(r["requests"] for r in timings),
+                           "kb_downloaded": round(sum(r["kb_downloaded"] for r in timings), 1)}
+
+        context, results["outside"] = measure(handler, lambda: drive.get_results(QUERIES[0], ["allotment"]))
+        results["outside"]["found"] = "outside" in drive.index.file_ids() and bool(context.strip())
+
+        with open(os.path.join(tmp, "doc0.pdf"), "rb") as f:
+            files.modify("file1", f.read(), "2025-10-01T00:00:00.000Z")
+        files.delete("file2")
+        _, results["incremental"] = measure(handler, drive.sync)
+        results["incremental"]["corpus_files"] = len(drive.index.file_ids())
+
+        # Lose the vector index but keep the text cache: re-indexing needs no downloads or parsing
+        store.flush()
+        shutil.rmtree(store.path)
+        store = VectorStore(HashEmbeddings(), path=store.path)
+        use_store(store)
+        _, results["reindex"] = measure(handler, drive.sync)
+        results["reindex"]["indexed"] = sum(store.is_current(file_id, entry["version"])
+                                            for file_id, entry in drive.index.entries().items())
+
+        drive, store = new_drive("concurrent", SlowEmbeddings())
+        file = drive.service.files().get(fileId="file0", fields="id, name, mimeType, modifiedTime, size").execute()
+        errors = []
+
+        def index_file():
+            try:
+                drive.index_file(file, thread_service())
+            except Exception as e:
+                errors.append(repr(e))
+
+        def race():
+            threads = [threading.Thread(target=index_file) for _ in range(2)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        _, results["concurrent"] = measure(handler, race)
+        chunks = sum(len(entry["chunks"]) for entry in store.manifest.values())
+        results["concurrent"]["errors"] = errors
+        results["concurrent"]["consistent"] = (chunks > 0 and store.vectorstore.index.ntotal == chunks
+                                               and bool(store.search(QUERIES[0], doc_ids=["file0"])))
+        server.shutdown()
+
+    for label in ("cold", "backfill", "warm", "outside", "incremental", "reindex", "concurrent"):
+        print(f"{label:12s} {results[label]}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
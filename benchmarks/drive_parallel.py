@@ -0,0 +1,103 @@
+"""
+Drive search wall-time benchmark.
+Runs GoogleDrive.get_results for a handful of synthetic PDFs served by a local Drive stand-in
+(fake_drive.py) with per-request latency and limited bandwidth, comparing the old sequential
+path (download one file, then the next, then extract each in-process) with concurrent
+downloads and process-pool extraction. Embeddings use a hash embedder, so the numbers cover
+download + extraction + indexing, not the transformer. Every run starts with an empty
+download cache and index.
+
+Usage: python benchmarks/drive_parallel.py [--files 5] [--pages 150] [--latency-ms 100] [--bandwidth-kbps 500]
+"""
+import argparse
+import functools
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import services.drive as drive_module
+from fake_drive import Files, drive_service, start_server
+from rag_suite import HashEmbeddings
+from services.drive import DownloadCache, DriveIndex, GoogleDrive, extract_pages, file_digest
+from synthetic import make_pdf
+from vector_store import VectorStore
+
+
+def sequential(drive, query, keywords, max_results):
+    """get_results as it was before downloads and extraction ran in parallel."""
+    filepaths, file_ids = [], []
+    for file in drive.iter_files(keywords, page_size=max_results):
+        path = drive.fetch_file(file)
+        if path:
+            filepaths.append(path)
+            file_ids.append(file["id"])
+            if len(filepaths) >= max_results:
+                break
+    for path, file_id in zip(filepaths, file_ids):
+        drive_module.index_stream(file_id, file_digest(path), extract_pages(path), metadata={"file": path})
+    return drive_module.retrieve(query, file_ids)
+
+
+def parallel(drive, query, keywords, max_results):
+    return drive.get_results(query, keywords, max_results=max_results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=5)
+    parser.add_argument("--pages", type=int, default=150)
+    parser.add_argument("--latency-ms", type=float, default=100)
+    parser.add_argument("--bandwidth-kbps", type=int, default=500, help="Per-download bandwidth in KB/s")
+    parser.add_argument("--json", help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        files = Files()
+        for n in range(args.files):
+            path = make_pdf(os.path.join(tmp, f"doc{n}.pdf"), pages=args.pages, seed=n)
+            with open(path, "rb") as f:
+                files.add(f"file{n}", f"doc{n}.pdf", "application/pdf", f.read())
+        server, url, handler = start_server(files, latency=args.latency_ms / 1000,
+                                            bandwidth=args.bandwidth_kbps * 1024)
+        local = threading.local()
+
+        def thread_service():
+            if not hasattr(local, "service"):
+                local.service = drive_service(url)
+            return local.service
+
+        results = {"files": args.files, "pages": args.pages,
+                   "pdf_mb": round(sum(len(d) for _, d in files.files.values()) / 2**20, 2)}
+        for label, fn in (("sequential", sequential), ("parallel", parallel)):
+            store = VectorStore(HashEmbeddings(), path=os.path.join(tmp, f"index_{label}"))
+            for name in ("index_stream", "is_indexed", "retrieve"):
+                original = getattr(drive_module, f"_bench_{name}", getattr(drive_module, name))
+                setattr(drive_module, f"_bench_{name}", original)
+                setattr(drive_module, name, functools.partial(original, store=store))
+            drive = GoogleDrive(None, cache=DownloadCache(os.path.join(tmp, f"cache_{label}")),
+                                text_cache=DownloadCache(os.path.join(tmp, f"text_{label}")),
+                                index=DriveIndex(os.path.join(tmp, f"state_{label}.json")))
+            drive.service = drive_service(url)
+            drive._thread_service = thread_service
+            handler.requests = 0
+            start = time.perf_counter()
+            context = fn(drive, "quiz deadline", ["quiz"], args.files)
+            elapsed = time.perf_counter() - start
+            results[label] = {"seconds": round(elapsed, 2), "requests": handler.requests,
+                              "context_chars": len(context)}
+            print(f"{label:10s} {elapsed:6.2f} s  requests {handler.requests}")
+
+        server.shutdown()
+    print(json.dumps(results, indent=2))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Embedding throughput benchmark.
+Measures chunks/sec of RAG.BatchedEmbeddings across batch sizes and worker counts
+on synthetic chunks, so RAG_EMBED_BATCH_SIZE / RAG_EMBED_WORKERS can be picked per machine.
+
+Usage: python benchmarks/embedding_throughput.py [--chunks 512] [--batch-sizes 8 16 32 64] [--workers 1 2 4]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from RAG import BatchedEmbeddings, base_model
+
+WORDS = ("quiz exam deadline lecture assignment submission course meeting schedule "
+         "project report review grade syllabus tutorial lab midsem endsem notice").split()
+
+
+def synthetic_chunks(n, seed=0):
+    """Chunks of varying length (roughly 20-500 chars) like RecursiveCharacterTextSplitter output."""
+    rng = random.Random(seed)
+    return [" ".join(rng.choice(WORDS) for _ in range(rng.randint(3, 70))) for _ in range(n)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=512)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 8, 16, 32, 64, 128])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--json", help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    texts = synthetic_chunks(args.chunks)
+    base_model.embed_documents(texts[:8])  # warm up
+
+    results = []
+    for workers in args.workers:
+        for batch_size in args.batch_sizes:
+            model = BatchedEmbeddings(base_model, batch_size=batch_size, max_workers=workers)
+            start = time.perf_counter()
+            model.embed_documents(texts)
+            elapsed = time.perf_counter() - start
+            row = {"batch_size": batch_size, "workers": workers, "seconds": round(elapsed, 3),
+                   "chunks_per_sec": round(len(texts) / elapsed, 1)}
+            results.append(row)
+            print(f"batch={batch_size:4d} workers={workers:2d}  {row['chunks_per_sec']:8.1f} chunks/sec")
+
+    best = max(results, key=lambda r: r["chunks_per_sec"])
+    print(f"Best: RAG_EMBED_BATCH_SIZE={best['batch_size']} RAG_EMBED_WORKERS={best['workers']}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
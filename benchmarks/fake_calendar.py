@@ -0,0 +1,143 @@
+"""
+Local stand-in for the Google Calendar REST API, for offline benchmarks.
+Serves events.list (time window, q, orderBy, paging, and syncToken incremental sync with
+cancelled events), events.insert and events.delete on the primary calendar, with a
+configurable delay per HTTP round-trip. calendar_service() builds a googleapiclient
+Calendar service pointed at it.
+"""
+import json
+import random
+import re
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import synthetic
+
+TZ = timezone(timedelta(hours=5, minutes=30))
+
+
+def _start(event):
+    return datetime.fromisoformat(event["start"]["dateTime"])
+
+
+def _end(event):
+    return datetime.fromisoformat(event["end"]["dateTime"])
+
+
+class Calendar:
+    def __init__(self, count=300, days=60, seed=0):
+        self.rng = random.Random(seed)
+        self.events = {}  # id -> event, including cancelled ones
+        self.log = []     # event ids in change order; a sync token is an offset into it
+        now = datetime.now(TZ).replace(minute=0, second=0, microsecond=0)
+        for _ in range(count):
+            start = now + timedelta(hours=self.rng.randint(-24 * days, 24 * days))
+            self.insert({"summary": synthetic.sentence(self.rng, 2, 5).rstrip("."),
+                         "location": self.rng.choice(["L7", "LHC", "KD101", "Online", ""]),
+                         "start": {"dateTime": start.isoformat()},
+                         "end": {"dateTime": (start + timedelta(hours=1)).isoformat()}})
+
+    def insert(self, body):
+        event_id = f"ev{len(self.log):06d}"
+        event = {**body, "id": event_id, "status": "confirmed"}
+        self.events[event_id] = event
+        self.log.append(event_id)
+        return event
+
+    def delete(self, event_id):
+        self.events[event_id] = {"id": event_id, "status": "cancelled"}
+        self.log.append(event_id)
+
+
+class Handler(BaseHTTPRequestHandler):
+    calendar: Calendar = None
+    latency = 0.0
+    requests = 0
+    bytes_sent = 0
+
+    def log_message(self, *args):
+        pass
+
+    def _send_json(self, status, obj):
+        body = json.dumps(obj).encode() if obj is not None else b""
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        type(self).bytes_sent += len(body)
+
+    def _list(self, query):
+        cal = self.calendar
+        size = int(query.get("maxResults", 250))
+        if "syncToken" in query:
+            if not query["syncToken"].isdigit() or int(query["syncToken"]) > len(cal.log):
+                return 410, {"error": {"code": 410, "message": "Sync token is no longer valid"}}
+            changed = dict.fromkeys(cal.log[int(query["syncToken"]):])
+            items = [cal.events[i] for i in changed]
+        else:
+            items = [e for e in cal.events.values() if e["status"] != "cancelled"]
+            if "timeMin" in query:
+                low = datetime.fromisoformat(query["timeMin"])
+                items = [e for e in items if _end(e) > low]
+            if "timeMax" in query:
+                high = datetime.fromisoformat(query["timeMax"])
+                items = [e for e in items if _start(e) < high]
+            if "q" in query:
+                needle = query["q"].lower()
+                items = [e for e in items if needle in f"{e['summary']} {e['location']}".lower()]
+            if query.get("orderBy") == "startTime":
+                items.sort(key=_start)
+        start = int(query.get("pageToken", 0))
+        out = {"kind": "calendar#events", "timeZone": "Asia/Kolkata", "items": items[start:start + size]}
+        if start + size < len(items):
+            out["nextPageToken"] = str(start + size)
+        elif "orderBy" not in query:
+            out["nextSyncToken"] = str(len(cal.log))
+        return 200, out
+
+    def do_GET(self):
+        type(self).requests += 1
+        time.sleep(self.latency)
+        parsed = urlparse(self.path)
+        if parsed.path != "/calendar/v3/calendars/primary/events":
+            return self._send_json(404, {"error": {"code": 404, "message": "Not Found"}})
+        self._send_json(*self._list({k: v[-1] for k, v in parse_qs(parsed.query).items()}))
+
+    def do_POST(self):
+        type(self).requests += 1
+        time.sleep(self.latency)
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        self._send_json(200, self.calendar.insert(body))
+
+    def do_DELETE(self):
+        type(self).requests += 1
+        time.sleep(self.latency)
+        match = re.fullmatch(r"/calendar/v3/calendars/primary/events/([^/?]+)", urlparse(self.path).path)
+        if not match or match.group(1) not in self.calendar.events:
+            return self._send_json(404, {"error": {"code": 404, "message": "Not Found"}})
+        self.calendar.delete(match.group(1))
+        self.send_response(204)
+        self.end_headers()
+
+
+def start_server(calendar, latency=0.05):
+    """Start the fake API on a free localhost port; returns (server, base_url, handler_class)."""
+    handler = type("FakeCalendarHandler", (Handler,), {"calendar": calendar, "latency": latency,
+                                                       "requests": 0, "bytes_sent": 0})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/", handler
+
+
+def calendar_service(base_url):
+    import httplib2
+    from googleapiclient import discovery_cache
+    from googleapiclient.discovery import build_from_document
+    doc = json.loads(discovery_cache.get_static_doc("calendar", "v3"))
+    doc["rootUrl"] = base_url
+    doc["baseUrl"] = base_url + "calendar/v3/"
+    return build_from_document(doc, http=httplib2.Http())
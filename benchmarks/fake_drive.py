@@ -0,0 +1,127 @@
+"""
+Local stand-in for the Google Drive REST API, for offline benchmarks.
+Serves files.list (honouring `fullText contains` terms against the text a file was added
+with), files.get, files.get?alt=media and the changes feed (changes.getStartPageToken,
+changes.list) from in-memory files, with a configurable delay per HTTP round-trip and a
+per-connection download bandwidth. Media downloads honour Range requests, so chunked
+downloads that stop early transfer only what they read. drive_service() builds a googleapiclient Drive service
+pointed at it.
+"""
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+class Files:
+    def __init__(self):
+        self.files = {}  # id -> (metadata, bytes)
+        self.text = {}  # id -> text matched by fullText queries; files without it match any query
+        self.changes = []  # change log; a page token is an offset into it
+
+    def add(self, file_id, name, mime_type, data, modified_time="2025-09-01T00:00:00.000Z", text=None):
+        meta = {"id": file_id, "name": name, "mimeType": mime_type, "modifiedTime": modified_time,
+                "owners": [{"displayName": "Me"}]}
+        if not mime_type.startswith("application/vnd.google-apps"):
+            meta["size"] = str(len(data))
+        self.files[file_id] = (meta, data)
+        if text is not None:
+            self.text[file_id] = text.lower()
+        self.changes.append({"fileId": file_id, "removed": False, "file": self.files[file_id][0]})
+
+    def modify(self, file_id, data, modified_time):
+        meta, _ = self.files[file_id]
+        self.add(file_id, meta["name"], meta["mimeType"], data, modified_time)
+
+    def delete(self, file_id):
+        del self.files[file_id]
+        self.text.pop(file_id, None)
+        self.changes.append({"fileId": file_id, "removed": True})
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    files: Files = None
+    latency = 0.0
+    bandwidth = 0  # bytes per second per download, 0 = unlimited
+    requests = 0
+    bytes_sent = 0
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, body, content_type="application/json", headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        step = max(self.bandwidth // 20, 1) if self.bandwidth else len(body) or 1
+        for start in range(0, len(body), step):
+            self.wfile.write(body[start:start + step])
+            if self.bandwidth:
+                time.sleep(step / self.bandwidth)
+        type(self).bytes_sent += len(body)
+
+    def do_GET(self):
+        type(self).requests += 1
+        time.sleep(self.latency)
+        parsed = urlparse(self.path)
+        query = {k: v[-1] for k, v in parse_qs(parsed.query).items()}
+        if parsed.path == "/drive/v3/files":
+            terms = [t.lower() for t in re.findall(r"fullText contains '([^']*)'", query.get("q", ""))]
+            entries = [meta for file_id, (meta, _) in self.files.files.items()
+                       if not terms or file_id not in self.files.text
+                       or any(t in self.files.text[file_id] for t in terms)]
+            start = int(query.get("pageToken", 0))
+            size = int(query.get("pageSize", 100))
+            out = {"files": entries[start:start + size]}
+            if start + size < len(entries):
+                out["nextPageToken"] = str(start + size)
+            return self._send(200, json.dumps(out).encode())
+        if parsed.path == "/drive/v3/changes/startPageToken":
+            return self._send(200, json.dumps({"startPageToken": str(len(self.files.changes))}).encode())
+        if parsed.path == "/drive/v3/changes":
+            start = int(query.get("pageToken", 0))
+            size = int(query.get("pageSize", 100))
+            out = {"changes": self.files.changes[start:start + size]}
+            if start + size < len(self.files.changes):
+                out["nextPageToken"] = str(start + size)
+            else:
+                out["newStartPageToken"] = str(len(self.files.changes))
+            return self._send(200, json.dumps(out).encode())
+        match = re.fullmatch(r"/drive/v3/files/([^/]+)", parsed.path)
+        if match and match.group(1) in self.files.files:
+            meta, data = self.files.files[match.group(1)]
+            if query.get("alt") == "media":
+                match = re.fullmatch(r"bytes=(\d+)-(\d*)", self.headers.get("Range", ""))
+                if not match:
+                    return self._send(200, data, meta["mimeType"])
+                start = int(match.group(1))
+                end = min(int(match.group(2) or len(data) - 1), len(data) - 1)
+                return self._send(206, data[start:end + 1], meta["mimeType"],
+                                  {"Content-Range": f"bytes {start}-{end}/{len(data)}"})
+            return self._send(200, json.dumps(meta).encode())
+        self._send(404, json.dumps({"error": {"code": 404, "message": "Not Found"}}).encode())
+
+
+def start_server(files, latency=0.05, bandwidth=0):
+    """Start the fake API on a free localhost port; returns (server, base_url, handler_class)."""
+    handler = type("FakeDriveHandler", (Handler,), {"files": files, "latency": latency, "bandwidth": bandwidth,
+                                                     "requests": 0, "bytes_sent": 0})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/", handler
+
+
+def drive_service(base_url):
+    import httplib2
+    from googleapiclient import discovery_cache
+    from googleapiclient.discovery import build_from_document
+    doc = json.loads(discovery_cache.get_static_doc("drive", "v3"))
+    doc["rootUrl"] = base_url
+    doc["baseUrl"] = base_url + "drive/v3/"
+    return build_from_document(doc, http=httplib2.Http())
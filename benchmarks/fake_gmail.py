@@ -0,0 +1,160 @@
+"""
+Local stand-in for the Gmail REST API, for offline benchmarks.
+Serves messages.list, messages.get (full/metadata) and history.list from an in-memory mailbox,
+plus the multipart/mixed batch endpoint, with a configurable delay per HTTP round-trip.
+gmail_service() builds a googleapiclient Gmail service pointed at it.
+"""
+import base64
+import json
+import random
+import re
+import threading
+import time
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import synthetic
+
+
+def make_message(msg_id, rng, history_id, unread=True):
+    content = synthetic.email_content(rng, body_sentences=8)
+    header_block, body = content.split("\nBody: ", 1)
+    headers = [{"name": k, "value": v} for k, v in (line.split(": ", 1) for line in header_block.splitlines())]
+    data = base64.urlsafe_b64encode(body.encode()).decode()
+    return {
+        "id": msg_id, "threadId": msg_id, "historyId": str(history_id), "internalDate": str(history_id * 1000),
+        "labelIds": ["INBOX"] + (["UNREAD"] if unread else []),
+        "snippet": body[:100],
+        "payload": {"mimeType": "multipart/alternative", "headers": headers, "parts": [
+            {"mimeType": "text/plain", "body": {"data": data, "size": len(body)}},
+            {"mimeType": "text/html", "body": {"data": base64.urlsafe_b64encode(f"<p>{body}</p>".encode()).decode()}},
+        ]},
+    }
+
+
+class Mailbox:
+    def __init__(self, count=100, seed=0):
+        self.rng = random.Random(seed)
+        self.history_id = 1000
+        self.messages = {}
+        self.order = []   # newest first
+        self.history = []  # (history_id, msg_id)
+        for _ in range(count):
+            self.add()
+
+    def add(self, unread=True):
+        self.history_id += 1
+        msg_id = f"{self.history_id:016x}"
+        self.messages[msg_id] = make_message(msg_id, self.rng, self.history_id, unread)
+        self.order.insert(0, msg_id)
+        self.history.append((self.history_id, msg_id))
+        return msg_id
+
+
+class Handler(BaseHTTPRequestHandler):
+    mailbox: Mailbox = None
+    latency = 0.0
+    requests = 0
+    bytes_sent = 0
+
+    def log_message(self, *args):
+        pass
+
+    def _send_json(self, status, obj):
+        body = json.dumps(obj).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        type(self).bytes_sent += len(body)
+
+    def route(self, method, url):
+        parsed = urlparse(url)
+        query = {k: v[-1] for k, v in parse_qs(parsed.query).items()}
+        path = parsed.path
+        box = self.mailbox
+        match = re.fullmatch(r"/gmail/v1/users/me/messages/([^/]+)", path)
+        if match:
+            msg = box.messages.get(match.group(1))
+            if msg is None:
+                return 404, {"error": {"code": 404, "message": "Not Found"}}
+            if query.get("format") == "metadata":
+                wanted = parse_qs(parsed.query).get("metadataHeaders", [])
+                headers = [h for h in msg["payload"]["headers"] if not wanted or h["name"] in wanted]
+                return 200, {**{k: v for k, v in msg.items() if k != "payload"},
+                             "payload": {"mimeType": msg["payload"]["mimeType"], "headers": headers}}
+            return 200, msg
+        if path == "/gmail/v1/users/me/messages":
+            ids = box.order
+            if "is:unread" in query.get("q", ""):
+                ids = [i for i in ids if "UNREAD" in box.messages[i]["labelIds"]]
+            start = int(query.get("pageToken", 0))
+            size = int(query.get("maxResults", 100))
+            page = ids[start:start + size]
+            out = {"messages": [{"id": i, "threadId": i} for i in page], "resultSizeEstimate": len(ids)}
+            if start + size < len(ids):
+                out["nextPageToken"] = str(start + size)
+            return 200, out
+        if path == "/gmail/v1/users/me/history":
+            since = int(query.get("startHistoryId", 0))
+            added = [{"id": h, "messagesAdded": [{"message": {"id": m, "labelIds": box.messages[m]["labelIds"]}}]}
+                     for h, m in box.history if h > since]
+            return 200, {"history": added, "historyId": str(box.history_id)}
+        if path == "/gmail/v1/users/me/profile":
+            return 200, {"emailAddress": "me@example.com", "historyId": str(box.history_id)}
+        return 404, {"error": {"code": 404, "message": f"No route for {method} {path}"}}
+
+    def do_GET(self):
+        type(self).requests += 1
+        time.sleep(self.latency)
+        self._send_json(*self.route("GET", self.path))
+
+    def do_POST(self):
+        type(self).requests += 1
+        time.sleep(self.latency)
+        length = int(self.headers.get("Content-Length", 0))
+        raw = self.rfile.read(length)
+        if not self.path.startswith("/batch"):
+            return self._send_json(404, {})
+        envelope = BytesParser(policy=HTTP).parsebytes(
+            b"Content-Type: " + self.headers["Content-Type"].encode() + b"\r\n\r\n" + raw)
+        boundary = "batch_fake_boundary"
+        out = []
+        for part in envelope.iter_parts():
+            request_line = part.get_content().splitlines()[0] if isinstance(part.get_content(), str) \
+                else part.get_payload(decode=True).decode().splitlines()[0]
+            method, url, _ = request_line.split(" ", 2)
+            status, obj = self.route(method, url)
+            content_id = part["Content-ID"].strip("<>")
+            body = json.dumps(obj)
+            out.append(f"--{boundary}\r\nContent-Type: application/http\r\nContent-ID: <response-{content_id}>\r\n\r\n"
+                       f"HTTP/1.1 {status} OK\r\nContent-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n"
+                       f"{body}\r\n")
+        payload = ("".join(out) + f"--{boundary}--\r\n").encode()
+        self.send_response(200)
+        self.send_header("Content-Type", f"multipart/mixed; boundary={boundary}")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+        type(self).bytes_sent += len(payload)
+
+
+def start_server(mailbox, latency=0.05):
+    """Start the fake API on a free localhost port; returns (server, base_url, handler_class)."""
+    handler = type("FakeGmailHandler", (Handler,), {"mailbox": mailbox, "latency": latency, "requests": 0, "bytes_sent": 0})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/", handler
+
+
+def gmail_service(base_url):
+    import httplib2
+    from googleapiclient import discovery_cache
+    from googleapiclient.discovery import build_from_document
+    doc = json.loads(discovery_cache.get_static_doc("gmail", "v1"))
+    doc["rootUrl"] = base_url
+    doc["baseUrl"] = base_url
+    return build_from_document(doc, http=httplib2.Http())
@@ -0,0 +1,322 @@
+"""
+Local stand-in for an IMAP4rev1 server (the IITK webmail), for offline benchmarks.
+Serves one INBOX of synthetic messages over plain TCP with a configurable delay for the
+connection setup (standing in for the TLS handshake and greeting) and per command.
+Messages can carry a PDF attachment to show the cost of full-message fetches.
+Supports LOGIN, SELECT/EXAMINE, SEARCH, FETCH (RFC822, FLAGS, UID, RFC822.SIZE, INTERNALDATE,
+BODY[...] / BODY.PEEK[...] sections with partial ranges), their UID forms, IDLE, NOOP and LOGOUT.
+fake_iitk_mail() returns an IITKMail whose connections go to the stand-in.
+"""
+import email
+import random
+import re
+import select
+import socketserver
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from email.message import EmailMessage
+from email.utils import format_datetime
+
+import synthetic
+
+TOKEN_RE = re.compile(rb'\(|\)|"(?:[^"\\]|\\.)*"|[^\s()]+')
+
+
+def make_message(rng, when, attachment_bytes=0):
+    content = synthetic.email_content(rng, body_sentences=8)
+    header_block, body = content.split("\nBody: ", 1)
+    msg = EmailMessage()
+    for line in header_block.splitlines():
+        name, value = line.split(": ", 1)
+        if name != "Date":
+            msg[name] = value
+    msg["Date"] = format_datetime(when)
+    msg["To"] = "me@iitk.ac.in"
+    msg.set_content(body)
+    if attachment_bytes:
+        msg.add_attachment(rng.randbytes(attachment_bytes), maintype="application", subtype="pdf",
+                           filename="notice.pdf")
+    return msg.as_bytes()
+
+
+class Mailbox:
+    def __init__(self, count=200, seed=0, uid_validity=1, attachment_every=0, attachment_bytes=1024 * 1024):
+        """Every `attachment_every`-th message (0: none) carries an `attachment_bytes` PDF."""
+        self.rng = random.Random(seed)
+        self.attachment_every = attachment_every
+        self.attachment_bytes = attachment_bytes
+        self.uid_validity = uid_validity
+        self.next_uid = 1
+        self.messages = []  # dicts: uid, raw, flags, date; sequence number = position + 1
+        self.changed = threading.Condition()
+        start = datetime.now(timezone.utc) - timedelta(hours=count)
+        for n in range(count):
+            self.add(when=start + timedelta(hours=n), seen=self.rng.random() < 0.7)
+
+    def add(self, when=None, seen=False):
+        with self.changed:
+            when = when or datetime.now(timezone.utc)
+            attach = self.attachment_every and self.next_uid % self.attachment_every == 0
+            raw = make_message(self.rng, when, self.attachment_bytes if attach else 0)
+            self.messages.append({"uid": self.next_uid, "raw": raw,
+                                  "flags": {"\\Seen"} if seen else set(), "date": when})
+            self.next_uid += 1
+            self.changed.notify_all()
+        return self.next_uid - 1
+
+
+def _unquote(token):
+    token = token.decode()
+    if token.startswith('"'):
+        return re.sub(r'\\(.)', r'\1', token[1:-1])
+    return token
+
+
+def _parse_set(spec, maximum):
+    out = []
+    for part in spec.split(","):
+        if ":" in part:
+            lo, hi = part.split(":")
+            lo = maximum if lo == "*" else int(lo)
+            hi = maximum if hi == "*" else int(hi)
+            out.extend(range(min(lo, hi), max(lo, hi) + 1))
+        else:
+            out.append(maximum if part == "*" else int(part))
+    return out
+
+
+class Handler(socketserver.StreamRequestHandler):
+    mailbox: Mailbox = None
+    latency = 0.0
+    handshake = 0.0
+    capabilities = "IMAP4rev1 IDLE UIDPLUS"
+    connections = 0
+    commands = 0
+    bytes_sent = 0
+
+    def send(self, data):
+        data = data if isinstance(data, bytes) else data.encode()
+        self.wfile.write(data)
+        type(self).bytes_sent += len(data)
+
+    def handle(self):
+        type(self).connections += 1
+        time.sleep(self.handshake)
+        self.send(f"* OK [CAPABILITY {self.capabilities}] fake IMAP ready\r\n")
+        self.seen_count = 0
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            line = line.rstrip(b"\r\n")
+            while line.endswith(b"}"):  # {n} literal follows
+                size = int(line[line.rindex(b"{") + 1:-1])
+                self.send("+ go ahead\r\n")
+                line = line[:line.rindex(b"{")] + b'"' + self.rfile.read(size) + b'"' + self.rfile.readline().rstrip(b"\r\n")
+            tag, _, rest = line.partition(b" ")
+            command, _, args = rest.partition(b" ")
+            command = command.upper().decode()
+            uid = command == "UID"
+            if uid:
+                command, _, args = args.partition(b" ")
+                command = command.upper().decode()
+            type(self).commands += 1
+            time.sleep(self.latency)
+            tag = tag.decode()
+            if command == "LOGOUT":
+                self.send(f"* BYE logging out\r\n{tag} OK LOGOUT completed\r\n")
+                return
+            handler = getattr(self, "cmd_" + command.lower(), None)
+            if handler is None:
+                self.send(f"{tag} BAD unknown command {command}\r\n")
+                continue
+            handler(tag, args, uid)
+
+    def _exists_update(self):
+        count = len(self.mailbox.messages)
+        if count != self.seen_count:
+            self.seen_count = count
+            self.send(f"* {count} EXISTS\r\n")
+
+    def cmd_capability(self, tag, args, uid):
+        self.send(f"* CAPABILITY {self.capabilities}\r\n{tag} OK CAPABILITY completed\r\n")
+
+    def cmd_login(self, tag, args, uid):
+        self.send(f"{tag} OK LOGIN completed\r\n")
+
+    def cmd_noop(self, tag, args, uid):
+        self._exists_update()
+        self.send(f"{tag} OK NOOP completed\r\n")
+
+    def cmd_select(self, tag, args, uid, mode="READ-WRITE"):
+        box = self.mailbox
+        self.seen_count = len(box.messages)
+        self.send(f"* FLAGS (\\Seen \\Answered \\Flagged \\Deleted \\Draft)\r\n* {self.seen_count} EXISTS\r\n"
+                  f"* 0 RECENT\r\n* OK [UIDVALIDITY {box.uid_validity}] UIDs valid\r\n"
+                  f"* OK [UIDNEXT {box.next_uid}] predicted next UID\r\n{tag} OK [{mode}] SELECT completed\r\n")
+
+    def cmd_examine(self, tag, args, uid):
+        self.cmd_select(tag, args, uid, mode="READ-ONLY")
+
+    def cmd_idle(self, tag, args, uid):
+        self.send("+ idling\r\n")
+        while not select.select([self.connection], [], [], 0.05)[0]:
+            self._exists_update()
+        self.rfile.readline()  # DONE
+        self.send(f"{tag} OK IDLE terminated\r\n")
+
+    def cmd_close(self, tag, args, uid):
+        self.send(f"{tag} OK CLOSE completed\r\n")
+
+    # SEARCH
+
+    def _criterion(self, tokens, msg, seq):
+        token = tokens.pop(0)
+        if token == b"(":
+            matched = True
+            while tokens[0] != b")":
+                matched &= self._criterion(tokens, msg, seq)
+            tokens.pop(0)
+            return matched
+        key = token.decode().upper()
+        if key == "ALL":
+            return True
+        if key in ("SEEN", "UNSEEN"):
+            return ("\\Seen" in msg["flags"]) == (key == "SEEN")
+        if key == "NOT":
+            return not self._criterion(tokens, msg, seq)
+        if key == "OR":
+            a = self._criterion(tokens, msg, seq)
+            b = self._criterion(tokens, msg, seq)
+            return a or b
+        if key in ("SINCE", "BEFORE"):
+            day = datetime.strptime(_unquote(tokens.pop(0)), "%d-%b-%Y").date()
+            return msg["date"].date() >= day if key == "SINCE" else msg["date"].date() < day
+        if key in ("SUBJECT", "FROM", "BODY", "TEXT"):
+            needle = _unquote(tokens.pop(0)).lower().encode()
+            header, _, body = msg["raw"].partition(b"\n\n")
+            if key in ("BODY", "TEXT"):
+                # Servers match against the decoded text, not quoted-printable soft line breaks
+                if "text" not in msg:
+                    parsed = email.message_from_bytes(msg["raw"])
+                    msg["text"] = b"".join(part.get_payload(decode=True) or b"" for part in parsed.walk()
+                                           if part.get_content_type() == "text/plain").lower()
+                return needle in msg["text"] or (key == "TEXT" and needle in header.lower())
+            for line in header.splitlines():
+                if line.lower().startswith(key.lower().encode() + b":"):
+                    return needle in line.lower()
+            return False
+        if key == "UID":
+            return msg["uid"] in _parse_set(tokens.pop(0).decode(), self.mailbox.next_uid - 1)
+        if key == "CHARSET":
+            tokens.pop(0)
+            return self._criterion(tokens, msg, seq)
+        return _parse_set(key, len(self.mailbox.messages)).count(seq) > 0
+
+    def cmd_search(self, tag, args, uid):
+        tokens = TOKEN_RE.findall(args)
+        hits = []
+        for seq, msg in enumerate(list(self.mailbox.messages), 1):
+            remaining = list(tokens)
+            matched = True
+            while remaining:
+                matched &= self._criterion(remaining, msg, seq)
+            if matched:
+                hits.append(str(msg["uid"] if uid else seq))
+        self.send(f"* SEARCH {' '.join(hits)}\r\n{tag} OK SEARCH completed\r\n")
+
+    # FETCH
+
+    @staticmethod
+    def _section(msg, section):
+        header, _, body = msg["raw"].partition(b"\n\n")
+        name = section.upper()
+        if name == "":
+            return msg["raw"]
+        if name == "TEXT":
+            return body
+        if name == "HEADER":
+            return header + b"\n\n"
+        match = re.fullmatch(r"HEADER\.FIELDS \((.*)\)", name)
+        if match:
+            wanted = match.group(1).split()
+            lines, keep = [], False
+            for line in header.splitlines():
+                if not line[:1].isspace():  # not a folded continuation line
+                    keep = line.split(b":", 1)[0].decode().upper() in wanted
+                if keep:
+                    lines.append(line)
+            return b"\n".join(lines) + b"\n\n"
+        return b""
+
+    def cmd_fetch(self, tag, args, uid):
+        spec, _, items = args.decode().partition(" ")
+        items = items.strip()
+        if items.startswith("(") and items.endswith(")"):
+            items = items[1:-1]
+        wanted = re.findall(r"BODY(?:\.PEEK)?\[[^\]]*\](?:<\d+\.\d+>)?|[A-Z0-9.]+", items, re.I)
+        box = self.mailbox
+        messages = list(box.messages)
+        if uid:
+            by_uid = {m["uid"]: (seq, m) for seq, m in enumerate(messages, 1)}
+            targets = [by_uid[u] for u in _parse_set(spec, box.next_uid - 1) if u in by_uid]
+            if "UID" not in [w.upper() for w in wanted]:
+                wanted.insert(0, "UID")
+        else:
+            targets = [(seq, messages[seq - 1]) for seq in _parse_set(spec, len(messages)) if 0 < seq <= len(messages)]
+        for seq, msg in targets:
+            parts = []
+            for item in wanted:
+                upper = item.upper()
+                if upper == "UID":
+                    parts.append(f"UID {msg['uid']}".encode())
+                elif upper == "FLAGS":
+                    parts.append(f"FLAGS ({' '.join(sorted(msg['flags']))})".encode())
+                elif upper == "RFC822.SIZE":
+                    parts.append(f"RFC822.SIZE {len(msg['raw'])}".encode())
+                elif upper == "INTERNALDATE":
+                    parts.append(f'INTERNALDATE "{msg["date"].strftime("%d-%b-%Y %H:%M:%S %z")}"'.encode())
+                elif upper == "RFC822":
+                    msg["flags"].add("\\Seen")
+                    parts.append(b"RFC822 {%d}\r\n%s" % (len(msg["raw"]), msg["raw"]))
+                elif upper.startswith("BODY"):
+                    match = re.fullmatch(r"BODY(\.PEEK)?\[([^\]]*)\](?:<(\d+)\.(\d+)>)?", item, re.I)
+                    data = self._section(msg, match.group(2))
+                    label = f"BODY[{match.group(2)}]"
+                    if match.group(3) is not None:
+                        origin = int(match.group(3))
+                        data = data[origin:origin + int(match.group(4))]
+                        label += f"<{origin}>"
+                    if not match.group(1):
+                        msg["flags"].add("\\Seen")
+                    parts.append(label.encode() + b" {%d}\r\n%s" % (len(data), data))
+            self.send(b"* %d FETCH (%s)\r\n" % (seq, b" ".join(parts)))
+        self.send(f"{tag} OK FETCH completed\r\n")
+
+
+def start_server(mailbox, latency=0.02, handshake=0.15, idle=True):
+    """Start the fake server on a free localhost port; returns (server, port, handler_class)."""
+    handler = type("FakeIMAPHandler", (Handler,), {
+        "capabilities": "IMAP4rev1 IDLE UIDPLUS" if idle else "IMAP4rev1 UIDPLUS", "mailbox": mailbox, "latency": latency, "handshake": handshake, "connections": 0, "commands": 0, "bytes_sent": 0})
+    server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, server.server_address[1], handler
+
+
+def fake_iitk_mail(port, **kwargs):
+    """An IITKMail that opens plain-TCP connections to the stand-in instead of IMAP over TLS.
+    Its mail mirror is in memory unless a store_path is given, never the real iitk_mail.db."""
+    import imaplib
+    from services.iitk_mail import IITKMail
+
+    class FakeIITKMail(IITKMail):
+        def _open(self):
+            return imaplib.IMAP4("127.0.0.1", port)
+
+    kwargs.setdefault("store_path", ":memory:")
+    mail = FakeIITKMail(**kwargs)
+    mail.email_address = mail.email_address or "me@iitk.ac.in"
+    mail.password = mail.password or "password"
+    return mail
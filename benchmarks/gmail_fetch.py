@@ -0,0 +1,94 @@
+"""
+Gmail fetch latency benchmark.
+Runs Gmail.search against a local fake of the Gmail API with a fixed delay per HTTP
+round-trip, comparing one messages.get per message with the batched fetch, across message counts.
+Then simulates background triage ticks of Gmail.unread, where the local store and history
+sync should reduce each tick to a single history.list call (plus a fetch of new mail), and
+compares a cold unread() fetching full messages with the metadata-only triage view.
+
+Usage: python benchmarks/gmail_fetch.py [--counts 1 5 10 25 50] [--latency-ms 50]
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_gmail import Mailbox, gmail_service, start_server
+from services.mail import Gmail, GmailStore, parse_message
+
+
+def sequential(gmail, count):
+    listed = gmail.service.users().messages().list(userId="me", labelIds=["INBOX"], maxResults=count).execute()
+    return [parse_message(gmail.service.users().messages().get(userId="me", id=m["id"], format="full").execute())
+            for m in listed.get("messages", [])]
+
+
+def batched(gmail, count):
+    return gmail.search("", results=count)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--counts", type=int, nargs="+", default=[1, 5, 10, 25, 50])
+    parser.add_argument("--latency-ms", type=float, default=50)
+    parser.add_argument("--json", help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    mailbox = Mailbox(count=max(args.counts))
+    server, url, handler = start_server(mailbox, latency=args.latency_ms / 1000)
+    tmp = tempfile.TemporaryDirectory()
+    gmail = Gmail.__new__(Gmail)
+    gmail.service = gmail_service(url)
+    gmail.store = GmailStore(os.path.join(tmp.name, "gmail_cache.db"))
+
+    results = []
+    for count in args.counts:
+        row = {"messages": count}
+        for label, fn in (("sequential", sequential), ("batched", batched)):
+            gmail.store.reset()
+            handler.requests = 0
+            start = time.perf_counter()
+            messages = fn(gmail, count)
+            row[f"{label}_ms"] = round((time.perf_counter() - start) * 1000, 1)
+            row[f"{label}_requests"] = handler.requests
+            assert len(messages) == count, messages
+        results.append(row)
+        print(f"{count:4d} msgs  sequential {row['sequential_ms']:8.1f} ms ({row['sequential_requests']} req)  "
+              f"batched {row['batched_ms']:8.1f} ms ({row['batched_requests']} req)")
+
+    triage = {}
+    for label, flag in (("full", False), ("triage", True)):
+        gmail.store.reset()
+        handler.requests, handler.bytes_sent = 0, 0
+        start = time.perf_counter()
+        gmail.unread(max_results=max(args.counts), triage=flag)
+        triage[label] = {"ms": round((time.perf_counter() - start) * 1000, 1), "requests": handler.requests,
+                         "bytes": handler.bytes_sent}
+        print(f"cold unread ({label:6s}): {triage[label]['ms']:8.1f} ms  {handler.requests} req  "
+              f"{handler.bytes_sent / 1024:8.1f} KiB")
+
+    gmail.store.reset()
+    ticks = []
+    for tick in range(4):
+        if tick == 2:
+            mailbox.add()
+        handler.requests = 0
+        start = time.perf_counter()
+        gmail.unread(max_results=10, triage=True)
+        ticks.append({"tick": tick, "ms": round((time.perf_counter() - start) * 1000, 1), "requests": handler.requests})
+        print(f"triage tick {tick}{' (1 new mail)' if tick == 2 else ''}: {ticks[-1]['ms']:8.1f} ms "
+              f"({handler.requests} req)")
+    server.shutdown()
+    tmp.cleanup()
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"fetch": results, "cold_unread": triage, "triage_ticks": ticks}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+IITK mail (IMAP) fetch benchmark.
+Compares the old per-message FETCH (RFC822) loop with the single UID FETCH of header fields
+and a partial body that IITKMail now uses, against a local IMAP stand-in (fake_imap.py)
+where every fourth message carries a 1 MB PDF attachment. Reports time, bytes sent by the
+server and how many messages each strategy marked as read.
+
+Usage: python benchmarks/imap_fetch.py [--counts 5 10 25] [--latency-ms 20] [--attachment-kb 1024]
+"""
+import argparse
+import email
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_imap import Mailbox, fake_iitk_mail, start_server
+
+
+def per_message_rfc822(mail, conn, count):
+    status, data = conn.search(None, "ALL")
+    results = []
+    for i in reversed(data[0].split()[-count:]):
+        status, data = conn.fetch(i, "(RFC822)")
+        for part in data:
+            if isinstance(part, tuple):
+                results.append(mail._format_email(email.message_from_bytes(part[1]), include_body=True))
+    return results
+
+
+def bulk_uid_fetch(mail, conn, count):
+    status, data = conn.uid("search", None, "ALL")
+    return mail._fetch_formatted(conn, data[0].split()[-count:])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--counts", type=int, nargs="+", default=[5, 10, 25])
+    parser.add_argument("--latency-ms", type=float, default=20)
+    parser.add_argument("--attachment-kb", type=int, default=1024)
+    parser.add_argument("--json", help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    results = []
+    for count in args.counts:
+        row = {"messages": count}
+        outputs = {}
+        box = Mailbox(count=100, attachment_every=4, attachment_bytes=args.attachment_kb * 1024)
+        server, port, handler = start_server(box, latency=args.latency_ms / 1000, handshake=0)
+        mail = fake_iitk_mail(port)
+        conn = mail._connect()
+        # bulk first: it must not mark anything read, so both see the same mailbox
+        for label, fn in (("bulk", bulk_uid_fetch), ("rfc822", per_message_rfc822)):
+            unseen = sum("\\Seen" not in m["flags"] for m in box.messages)
+            handler.bytes_sent = 0
+            start = time.perf_counter()
+            outputs[label] = fn(mail, conn, count)
+            row[f"{label}_ms"] = round((time.perf_counter() - start) * 1000, 1)
+            row[f"{label}_kib"] = round(handler.bytes_sent / 1024, 1)
+            row[f"{label}_marked_read"] = unseen - sum("\\Seen" not in m["flags"] for m in box.messages)
+        conn.logout()
+        mail.pool.close()
+        server.shutdown()
+        row["same_output"] = outputs["rfc822"] == outputs["bulk"]
+        results.append(row)
+        print(f"{count:3d} msgs  RFC822 {row['rfc822_ms']:7.1f} ms {row['rfc822_kib']:9.1f} KiB "
+              f"({row['rfc822_marked_read']} marked read)  bulk {row['bulk_ms']:7.1f} ms {row['bulk_kib']:7.1f} KiB "
+              f"({row['bulk_marked_read']} marked read)  same output: {row['same_output']}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+New-mail alert latency benchmark.
+Starts an IMAPWatcher against a local IMAP stand-in (fake_imap.py), delivers messages at
+random moments and measures the time from delivery to the watcher's callback, with IMAP IDLE
+and with the NOOP polling fallback. The old behaviour was a 300 s background tick.
+
+Usage: python benchmarks/imap_idle.py [--messages 5] [--poll-seconds 10] [--latency-ms 20]
+"""
+import argparse
+import json
+import os
+import queue
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_imap import Mailbox, fake_iitk_mail, start_server
+from services.iitk_mail import IMAPWatcher
+
+
+def measure(mailbox, port, messages, poll_seconds, rng):
+    events = queue.Queue()
+    watcher = IMAPWatcher(fake_iitk_mail(port), lambda headers: events.put((time.perf_counter(), headers)),
+                          poll_seconds=poll_seconds)
+    watcher.start()
+    while watcher.last_uid is None:
+        time.sleep(0.01)
+    latencies = []
+    for _ in range(messages):
+        time.sleep(rng.uniform(0, poll_seconds))
+        delivered = time.perf_counter()
+        mailbox.add()
+        received, headers = events.get(timeout=poll_seconds * 2 + 5)
+        assert len(headers) == 1, headers
+        latencies.append((received - delivered) * 1000)
+    watcher.stop()
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=5)
+    parser.add_argument("--poll-seconds", type=float, default=10)
+    parser.add_argument("--latency-ms", type=float, default=20)
+    parser.add_argument("--json", help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    results = {}
+    for label, idle in (("idle", True), ("noop_poll", False)):
+        mailbox = Mailbox(count=50)
+        server, port, handler = start_server(mailbox, latency=args.latency_ms / 1000, handshake=0, idle=idle)
+        latencies = measure(mailbox, port, args.messages, args.poll_seconds, rng)
+        results[label] = {"mean_ms": round(statistics.mean(latencies), 1), "max_ms": round(max(latencies), 1),
+                          "commands": handler.commands}
+        print(f"{label:9s} alert latency mean {results[label]['mean_ms']:8.1f} ms  max {results[label]['max_ms']:8.1f} ms  "
+              f"({handler.commands} IMAP commands)")
+        server.shutdown()
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+IITK mail (IMAP) per-call latency benchmark.
+Runs IITKMail.unread and IITKMail.search against a local IMAP stand-in (fake_imap.py) with a
+fixed delay for connection setup and per command, comparing a fresh connect/login/select/logout
+per call (the old behaviour) with the pooled connections, sequentially and from concurrent
+threads like the asyncio.to_thread workers in mcp_server.py.
+
+Usage: python benchmarks/imap_pool.py [--calls 20] [--latency-ms 20] [--handshake-ms 150] [--threads 4] [--pool-size 2]
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_imap import Mailbox, fake_iitk_mail, start_server
+from services.iitk_mail import POOL_SIZE
+
+
+def per_call_connection(mail, fn):
+    conn = mail._connect()
+    try:
+        return fn(conn)
+    finally:
+        conn.logout()
+
+
+def pooled(mail, fn):
+    return mail.pool.run(fn)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=20)
+    parser.add_argument("--latency-ms", type=float, default=20)
+    parser.add_argument("--handshake-ms", type=float, default=150)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--pool-size", type=int, default=POOL_SIZE)
+    parser.add_argument("--json", help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    server, port, handler = start_server(Mailbox(count=200), latency=args.latency_ms / 1000,
+                                         handshake=args.handshake_ms / 1000)
+    mail = fake_iitk_mail(port, pool_size=args.pool_size)
+    calls = [lambda conn: mail._unread(conn, 5, 48), lambda conn: mail._search(conn, "quiz", 5, 30)]
+
+    results = {}
+    for label, strategy in (("per_call", per_call_connection), ("pooled", pooled)):
+        for mode, workers in (("sequential", 1), ("concurrent", args.threads)):
+            handler.connections = 0
+            latencies = []
+
+            def timed(n):
+                start = time.perf_counter()
+                strategy(mail, calls[n % len(calls)])
+                latencies.append((time.perf_counter() - start) * 1000)
+
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                list(pool.map(timed, range(args.calls)))
+            wall = (time.perf_counter() - start) * 1000
+            row = {"mean_ms": round(statistics.mean(latencies), 1), "p95_ms": round(sorted(latencies)[min(int(len(latencies) * 0.95), len(latencies) - 1)], 1),
+                   "wall_ms": round(wall, 1), "connections": handler.connections}
+            results[f"{label}_{mode}"] = row
+            print(f"{label:8s} {mode:10s} mean {row['mean_ms']:7.1f} ms  p95 {row['p95_ms']:7.1f} ms  "
+                  f"wall {row['wall_ms']:8.1f} ms  connections {row['connections']}")
+
+    mail.pool.close()
+    server.shutdown()
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+IITK mail search benchmark.
+Times IITKMail.search against a local IMAP stand-in (fake_imap.py) holding 40 days of mail,
+served by IMAP SEARCH on the server (old behaviour) vs. the local SQLite/FTS5 mirror:
+the first call (answered by the server while the mirror backfills in the background), the
+time until that backfill completes, warm calls (incremental sync plus local query), and a
+range reaching past the mirror's window that falls back to the server for the older days.
+
+Usage: python benchmarks/imap_search.py [--days 40] [--queries 20] [--latency-ms 20]
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_imap import Mailbox, fake_iitk_mail, start_server
+
+QUERIES = ["quiz", "deadline", "midsem", "hostel mess", "Prof. Sharma", "project report", "endsem", "lab"]
+
+
+def timed_searches(mail, queries, since_days):
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        mail.search(query, max_results=5, since_days=since_days)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, default=40)
+    parser.add_argument("--queries", type=int, default=20)
+    parser.add_argument("--latency-ms", type=float, default=20)
+    parser.add_argument("--json", help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    mailbox = Mailbox(count=24 * args.days)
+    server, port, handler = start_server(mailbox, latency=args.latency_ms / 1000, handshake=0)
+    tmp = tempfile.TemporaryDirectory()
+    queries = [QUERIES[n % len(QUERIES)] for n in range(args.queries)]
+
+    server_mail = fake_iitk_mail(port, store_path=os.path.join(tmp.name, "unused.db"))
+    server_mail.store = None
+    local_mail = fake_iitk_mail(port, store_path=os.path.join(tmp.name, "iitk_mail.db"))
+
+    results = {}
+    cases = [("server", server_mail, queries, 30), ("local_first_sync", local_mail, queries[:1], 30),
+             ("local_warm", local_mail, queries, 30), ("local_past_window", local_mail, queries, args.days)]
+    for label, mail, batch, since_days in cases:
+        handler.commands = 0
+        start = time.perf_counter()
+        latencies = timed_searches(mail, batch, since_days)
+        results[label] = {"mean_ms": round(statistics.mean(latencies), 1), "commands_per_call": round(handler.commands / len(batch), 1)}
+        print(f"{label:18s} mean {results[label]['mean_ms']:8.1f} ms  {results[label]['commands_per_call']:5.1f} IMAP commands/call")
+        if label == "local_first_sync":
+            while mail._synced[1] is None:
+                time.sleep(0.01)
+            results["backfill_seconds"] = round(time.perf_counter() - start, 2)
+            print(f"{'backfill':18s} done after {results['backfill_seconds']} s in the background")
+
+    server_mail.pool.close()
+    local_mail.pool.close()
+    server.shutdown()
+    tmp.cleanup()
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Quantized vector store benchmark.
+Builds a VectorStore over synthetic chunks, then reports index size, query latency and
+recall@k of the int8 scalar-quantized index (with exact re-ranking) against the float32 flat index.
+
+Usage: python benchmarks/quantization_recall.py [--chunks 20000] [--k 5] [--queries 50]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import faiss
+from langchain_core.documents import Document
+
+from RAG import embed_model, text_splitter
+from vector_store import VectorStore
+
+WORDS = ("quiz exam deadline lecture assignment submission course meeting schedule project report "
+         "review grade syllabus tutorial lab midsem endsem notice hostel mess library club fest").split()
+
+
+def synthetic_docs(n, seed=0):
+    rng = random.Random(seed)
+    return [Document(page_content=" ".join(rng.choice(WORDS) for _ in range(rng.randint(20, 70))),
+                     metadata={"id": f"doc{i}"}) for i in range(n)]
+
+
+def index_bytes(store):
+    return int(faiss.serialize_index(store.vectorstore.index).nbytes)
+
+
+def query_latency(store, queries, k):
+    start = time.perf_counter()
+    for q in queries:
+        store.search(q, k=k)
+    return (time.perf_counter() - start) / len(queries) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=20000)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--json", help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    queries = [" ".join(rng.choice(WORDS) for _ in range(3)) for _ in range(args.queries)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = VectorStore(embed_model, path=tmp, max_docs=args.chunks, quantize_threshold=0)
+        store.upsert(synthetic_docs(args.chunks), text_splitter)
+
+        results = {"chunks": store.vectorstore.index.ntotal, "k": args.k}
+        results["flat"] = {"index_bytes": index_bytes(store),
+                           "query_ms": round(query_latency(store, queries, args.k), 2),
+                           f"recall@{args.k}": store.recall_at_k(queries, args.k)}
+        store._quantize()
+        results["int8"] = {"index_bytes": index_bytes(store),
+                           "query_ms": round(query_latency(store, queries, args.k), 2),
+                           f"recall@{args.k}": round(store.recall_at_k(queries, args.k), 4)}
+
+    print(json.dumps(results, indent=2))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
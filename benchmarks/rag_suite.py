@@ -0,0 +1,192 @@
+"""
+RAG micro-benchmark suite.
+Times each RAG stage offline on synthetic corpora and records peak Python heap usage
+(tracemalloc; memory allocated inside torch/FAISS native code is not included):
+
+  clean_text   services.drive.clean_text over raw PDF-like pages
+  split        RecursiveCharacterTextSplitter over Gmail-shaped email documents
+  embed        embedding model over the split chunks (no cache)
+  index_build  VectorStore.upsert with precomputed embeddings (dedup, BM25, FAISS add, save)
+  query        average vector and hybrid search latency
+  extract_pdf / extract_docx   extract_pages + stream_chunks over synthetic files
+
+Results are written as JSON; pass two result files to --compare to diff them.
+
+Usage:
+  python benchmarks/rag_suite.py [--sizes 10 100 1000 10000] [--embedder model|hash] [--output bench_rag.json]
+  python benchmarks/rag_suite.py --compare old.json new.json
+"""
+import argparse
+import hashlib
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+import synthetic
+
+QUERIES = ["quiz deadline", "midsem exam schedule", "hostel mess notice", "project report submission", "ESC101 lab"]
+
+
+class HashEmbeddings(Embeddings):
+    """Deterministic bag-of-words embedder, for timing everything except the transformer."""
+    model_name = "hash-384"
+    dim = 384
+
+    def _embed(self, text):
+        vector = [0.0] * self.dim
+        for word in text.lower().split():
+            vector[int(hashlib.md5(word.encode()).hexdigest(), 16) % self.dim] += 1.0
+        return vector
+
+    def embed_documents(self, texts):
+        return [self._embed(t) for t in texts]
+
+    def embed_query(self, text):
+        return self._embed(text)
+
+
+class PrecomputedEmbeddings(Embeddings):
+    """Serves vectors computed in the embed stage, so index_build measures only the store."""
+
+    def __init__(self, model, texts, vectors):
+        self.model = model
+        self.model_name = getattr(model, "model_name", "precomputed")
+        self.vectors = dict(zip(texts, vectors))
+
+    def embed_documents(self, texts):
+        missing = [t for t in texts if t not in self.vectors]
+        if missing:
+            self.vectors.update(zip(missing, self.model.embed_documents(missing)))
+        return [self.vectors[t] for t in texts]
+
+    def embed_query(self, text):
+        return self.model.embed_query(text)
+
+
+def measure(fn, *args, repeat=1):
+    """Run fn, returning (result, {"seconds", "peak_mb"}); seconds is the mean over `repeat` runs."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn(*args)
+    elapsed = (time.perf_counter() - start) / repeat
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, {"seconds": round(elapsed, 5), "peak_mb": round(peak / 2**20, 3)}
+
+
+def run_size(n, embedder, tmp):
+    from RAG import stream_chunks, text_splitter
+    from services.drive import clean_text, extract_pages
+    from vector_store import VectorStore
+
+    rng = random.Random(n)
+    stages = {}
+
+    pages = [synthetic.raw_page(rng) for _ in range(max(1, n // 4))]
+    _, stages["clean_text"] = measure(lambda: [clean_text(p) for p in pages])
+
+    docs = [Document(page_content=c, metadata={"id": f"msg{i}"}) for i, c in enumerate(synthetic.emails(n, seed=n))]
+    splits, stages["split"] = measure(text_splitter.split_documents, docs)
+    texts = [s.page_content for s in splits]
+    stages["split"]["chunks"] = len(texts)
+
+    vectors, stages["embed"] = measure(embedder.embed_documents, texts)
+    stages["embed"]["chunks_per_sec"] = round(len(texts) / max(stages["embed"]["seconds"], 1e-9), 1)
+
+    store = VectorStore(PrecomputedEmbeddings(embedder, texts, vectors), path=os.path.join(tmp, f"store{n}"),
+                        max_docs=n + 1, quantize_threshold=0)
+    doc_ids, stages["index_build"] = measure(store.upsert, docs, text_splitter)
+
+    for query in QUERIES:  # warm query embeddings
+        embedder.embed_query(query)
+    _, stages["query"] = measure(lambda: [store.search(q, k=5, doc_ids=doc_ids) for q in QUERIES])
+    _, stages["query_hybrid"] = measure(lambda: [store.search(q, k=5, doc_ids=doc_ids, hybrid=True) for q in QUERIES])
+    for key in ("query", "query_hybrid"):
+        stages[key]["ms_per_query"] = round(stages[key].pop("seconds") / len(QUERIES) * 1000, 3)
+
+    pdf = synthetic.make_pdf(os.path.join(tmp, f"doc{n}.pdf"), pages=max(1, n // 4), seed=n)
+    chunks, stages["extract_pdf"] = measure(lambda: sum(1 for _ in stream_chunks(extract_pages(pdf))))
+    stages["extract_pdf"]["chunks"] = chunks
+    try:
+        docx_path = synthetic.make_docx(os.path.join(tmp, f"doc{n}.docx"), paragraphs=max(1, n), seed=n)
+        chunks, stages["extract_docx"] = measure(lambda: sum(1 for _ in stream_chunks(extract_pages(docx_path))))
+        stages["extract_docx"]["chunks"] = chunks
+    except ImportError:
+        pass
+    return stages
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(old_path, new_path):
+    with open(old_path) as f:
+        old = json.load(f)["results"]
+    with open(new_path) as f:
+        new = json.load(f)["results"]
+    for size in sorted(set(old) & set(new), key=int):
+        for stage in sorted(set(old[size]) & set(new[size])):
+            for metric in ("seconds", "ms_per_query", "peak_mb"):
+                a, b = old[size][stage].get(metric), new[size][stage].get(metric)
+                if a is None or b is None:
+                    continue
+                change = (b - a) / a * 100 if a else 0.0
+                flag = "  <-- regression" if change > 10 else ""
+                print(f"{size:>6} {stage:14s} {metric:13s} {a:10.4f} -> {b:10.4f} ({change:+6.1f}%){flag}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000, 10000])
+    parser.add_argument("--embedder", choices=["model", "hash"], default="model",
+                        help="'hash' skips the transformer to time only the rest of the pipeline")
+    parser.add_argument("--output", default="bench_rag.json")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"))
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    if args.embedder == "model":
+        from RAG import base_model
+        embedder = base_model.model
+    else:
+        embedder = HashEmbeddings()
+
+    report = {
+        "meta": {"commit": git_commit(), "timestamp": datetime.now().isoformat(), "python": platform.python_version(),
+                 "machine": platform.machine(), "embedder": getattr(embedder, "model_name", args.embedder)},
+        "results": {},
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in args.sizes:
+            print(f"Running {n} chunks...", file=sys.stderr)
+            report["results"][str(n)] = run_size(n, embedder, tmp)
+
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(json.dumps(report["results"], indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""
+Startup time benchmark.
+Compares how long `import RAG` takes (what mcp_server.py pays before it can answer
+`initialize`) against the time until the embedding model is actually loaded, which
+is what every import paid before the model was loaded lazily in the background.
+
+Usage: python benchmarks/startup_time.py [--runs 3]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+LAZY = "import time; t = time.perf_counter(); import RAG; print(time.perf_counter() - t)"
+EAGER = ("import time; t = time.perf_counter(); import RAG; RAG.base_model.model; "
+         "print(time.perf_counter() - t)")
+
+
+def measure(snippet):
+    out = subprocess.run([sys.executable, "-c", snippet], cwd=ROOT, capture_output=True, text=True, check=True)
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--json", help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    results = {}
+    for label, snippet in (("lazy_import", LAZY), ("eager_model_load", EAGER)):
+        times = [measure(snippet) for _ in range(args.runs)]
+        results[label] = {"median_seconds": round(statistics.median(times), 3), "runs": [round(t, 3) for t in times]}
+        print(f"{label:18s} median {results[label]['median_seconds']:.3f}s")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
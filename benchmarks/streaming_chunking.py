@@ -0,0 +1,84 @@
+"""
+Drive file chunking benchmark.
+Compares the old approach (concatenate every page into one string, then split it all at once)
+with the streaming pipeline (extract_pages -> stream_chunks) on a synthetic PDF, reporting
+wall time and peak Python memory. With --embed, chunks are also embedded in bounded batches.
+
+Usage: python benchmarks/streaming_chunking.py [--pages 500] [--embed]
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import PyPDF2
+from langchain_core.documents import Document
+
+from RAG import base_model, stream_chunks, text_splitter
+from services.drive import clean_text, extract_pages
+from synthetic import make_pdf
+
+EMBED_BATCH = 256
+
+
+def concatenated(path, embed):
+    text = ""
+    with open(path, "rb") as f:
+        for page in PyPDF2.PdfReader(f).pages:
+            text += clean_text(page.extract_text() or "")
+    texts = [d.page_content for d in text_splitter.split_documents([Document(page_content=text)])]
+    if embed:
+        base_model.embed_documents(texts)
+    return len(texts)
+
+
+def streamed(path, embed):
+    count, batch = 0, []
+    for chunk in stream_chunks(extract_pages(path)):
+        count += 1
+        batch.append(chunk)
+        if len(batch) >= EMBED_BATCH:
+            if embed:
+                base_model.embed_documents(batch)
+            batch = []
+    if batch and embed:
+        base_model.embed_documents(batch)
+    return count
+
+
+def run(fn, path, embed):
+    tracemalloc.start()
+    start = time.perf_counter()
+    chunks = fn(path, embed)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"chunks": chunks, "seconds": round(elapsed, 3), "peak_mb": round(peak / 2**20, 2)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=500)
+    parser.add_argument("--embed", action="store_true", help="Also embed the chunks (loads the model)")
+    parser.add_argument("--json", help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = make_pdf(os.path.join(tmp, "synthetic.pdf"), pages=args.pages)
+        results = {"pages": args.pages, "pdf_mb": round(os.path.getsize(path) / 2**20, 2),
+                   "concatenated": run(concatenated, path, args.embed),
+                   "streamed": run(streamed, path, args.embed)}
+
+    print(json.dumps(results, indent=2))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Synthetic corpora for the offline benchmarks.
+Generates reproducible text, PDFs (written directly as PDF objects, no extra dependencies)
+and other fixtures shaped like what the services feed into RAG.
+"""
+import random
+
+WORDS = ("quiz exam deadline lecture assignment submission course meeting schedule project report "
+         "review grade syllabus tutorial lab midsem endsem notice hostel mess library club fest "
+         "the a of to and in for on with by from at is are will be please note").split()
+
+
+def sentence(rng, min_words=6, max_words=18):
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(min_words, max_words))).capitalize() + "."
+
+
+def paragraph(rng, sentences=5):
+    return " ".join(sentence(rng) for _ in range(sentences))
+
+
+def _pdf_escape(text):
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def make_pdf(path, pages=500, lines_per_page=40, seed=0):
+    """Write a text-only PDF with `pages` pages of synthetic prose and return its path."""
+    rng = random.Random(seed)
+    objects = {1: b"<< /Type /Catalog /Pages 2 0 R >>", 3: b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"}
+    kids = []
+    for p in range(pages):
+        page_id, content_id = 4 + 2 * p, 5 + 2 * p
+        lines = [_pdf_escape(sentence(rng, 8, 12)) for _ in range(lines_per_page)]
+        stream = "BT /F1 10 Tf 12 TL 40 800 Td " + " ".join(f"({line}) '" for line in lines) + " ET"
+        stream = stream.encode("latin-1")
+        objects[content_id] = b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream)
+        objects[page_id] = (b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+                            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_id)
+        kids.append(b"%d 0 R" % page_id)
+    objects[2] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (b" ".join(kids), pages)
+
+    with open(path, "wb") as f:
+        f.write(b"%PDF-1.4\n")
+        offsets = {}
+        for obj_id in sorted(objects):
+            offsets[obj_id] = f.tell()
+            f.write(b"%d 0 obj\n%s\nendobj\n" % (obj_id, objects[obj_id]))
+        xref = f.tell()
+        size = max(objects) + 1
+        f.write(b"xref\n0 %d\n0000000000 65535 f \n" % size)
+        for obj_id in range(1, size):
+            f.write(b"%010d 00000 n \n" % offsets[obj_id])
+        f.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (size, xref))
+    return path
+
+
+SENDERS = ["Prof. Sharma <sharma@iitk.ac.in>", "DOAA Office <doaa@iitk.ac.in>", "Gymkhana <gymkhana@iitk.ac.in>",
+           "Course Updates <noreply@classroom.google.com>", "Hostel Office <hall5@iitk.ac.in>"]
+
+
+def email_content(rng, body_sentences=3):
+    """A message string shaped like the `content` Gmail.search builds for each Document."""
+    day = rng.randint(1, 28)
+    return (f"From: {rng.choice(SENDERS)}\nSubject: {sentence(rng, 3, 7)}\n"
+            f"Date: Mon, {day} Sep 2025 {rng.randint(8, 20)}:{rng.randint(0, 59):02d}:00 +0530\n"
+            f"Body: {paragraph(rng, body_sentences)}")
+
+
+def emails(n, seed=0):
+    rng = random.Random(seed)
+    return [email_content(rng) for _ in range(n)]
+
+
+def raw_page(rng, lines=40):
+    """Page text as PyPDF2 tends to return it: hard line breaks mid-sentence and blank lines."""
+    out = []
+    for _ in range(lines):
+        out.append(sentence(rng, 8, 12))
+        if rng.random() < 0.1:
+            out.append("")
+    return "\n".join(out)
+
+
+def make_docx(path, paragraphs=500, seed=0):
+    """Write a DOCX with `paragraphs` paragraphs of synthetic prose and return its path."""
+    import docx
+    rng = random.Random(seed)
+    document = docx.Document()
+    for _ in range(paragraphs):
+        document.add_paragraph(paragraph(rng))
+    document.save(path)
+    return path
@@ -0,0 +1,113 @@
+"""
+BM25 Keyword Index for RAG.
+An in-process inverted index over the same chunks the vector store holds, so exact
+tokens like "quiz", "deadline" or a course code can be matched even when embedding
+similarity misses them. Postings are kept in compact arrays and scored with NumPy.
+"""
+import math
+import re
+from array import array
+from collections import Counter
+
+import numpy as np
+
+TOKEN_RE = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> list[str]:
+    return TOKEN_RE.findall(text.lower())
+
+
+def reciprocal_rank_fusion(rankings, k: int = 60) -> list[str]:
+    """Merge several ranked lists of IDs; each ID scores sum(1 / (k + rank))."""
+    scores = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking):
+            scores[item] = scores.get(item, 0.0) + 1.0 / (k + rank + 1)
+    return sorted(scores, key=scores.get, reverse=True)
+
+
+class BM25Index:
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.ids: list[str] = []            # row -> chunk id
+        self.rows: dict[str, int] = {}      # chunk id -> row (live rows only)
+        self.doc_len = array("f")           # row -> token count (0 once removed)
+        self.postings: dict[str, array] = {}   # term -> rows containing it
+        self.freqs: dict[str, array] = {}      # term -> term frequency, parallel to postings
+        self.total_len = 0.0
+
+    def __len__(self):
+        return len(self.rows)
+
+    def add(self, chunk_id: str, text: str):
+        if chunk_id in self.rows:
+            self.remove(chunk_id)
+        row = len(self.ids)
+        self.ids.append(chunk_id)
+        self.rows[chunk_id] = row
+        counts = Counter(tokenize(text))
+        length = sum(counts.values())
+        self.doc_len.append(length)
+        self.total_len += length
+        for term, tf in counts.items():
+            self.postings.setdefault(term, array("i")).append(row)
+            self.freqs.setdefault(term, array("f")).append(tf)
+
+    def remove(self, chunk_id: str):
+        """Tombstone a chunk; its postings stay but are masked out at query time."""
+        row = self.rows.pop(chunk_id, None)
+        if row is None:
+            return
+        self.total_len -= self.doc_len[row]
+        self.doc_len[row] = 0
+        if len(self.ids) > 1000 and len(self.rows) < len(self.ids) // 2:
+            self._compact()
+
+    def _compact(self):
+        """Drop tombstoned rows by rebuilding postings for live rows only."""
+        live = {row: chunk_id for chunk_id, row in self.rows.items()}
+        old_postings, old_freqs, old_len = self.postings, self.freqs, self.doc_len
+        remap = {old: new for new, old in enumerate(sorted(live))}
+        self.ids = [live[old] for old in sorted(live)]
+        self.rows = {chunk_id: remap[row] for chunk_id, row in self.rows.items()}
+        self.doc_len = array("f", (old_len[old] for old in sorted(live)))
+        self.postings, self.freqs = {}, {}
+        for term, rows in old_postings.items():
+            tfs = old_freqs[term]
+            kept = [(remap[r], tf) for r, tf in zip(rows, tfs) if r in remap]
+            if kept:
+                self.postings[term] = array("i", (r for r, _ in kept))
+                self.freqs[term] = array("f", (tf for _, tf in kept))
+
+    def search(self, query: str, k: int = 5, allowed_ids=None) -> list[tuple[str, float]]:
+        """Top-k (chunk_id, score) pairs, optionally restricted to `allowed_ids`."""
+        if not self.rows:
+            return []
+        doc_len = np.frombuffer(self.doc_len, dtype=np.float32)
+        live = doc_len > 0
+        if allowed_ids is not None:
+            mask = np.zeros(len(self.ids), dtype=bool)
+            mask[[self.rows[c] for c in allowed_ids if c in self.rows]] = True
+            live &= mask
+        n = len(self.rows)
+        avg_len = self.total_len / n if n else 1.0
+        scores = np.zeros(len(self.ids), dtype=np.float32)
+        for term in set(tokenize(query)):
+            if term not in self.postings:
+                continue
+            rows = np.frombuffer(self.postings[term], dtype=np.int32)
+            tf = np.frombuffer(self.freqs[term], dtype=np.float32)
+            df = int(np.count_nonzero(doc_len[rows] > 0))
+            if not df:
+                continue
+            idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+            norm = self.k1 * (1 - self.b + self.b * doc_len[rows] / avg_len)
+            scores[rows] += idf * tf * (self.k1 + 1) / (tf + norm)
+        scores[~live] = 0
+        candidates = np.flatnonzero(scores)
+        if not len(candidates):
+            return []
+        top = candidates[np.argsort(-scores[candidates], kind="stable")[:k]]
+        return [(self.ids[row], float(scores[row])) for row in top]
@@ -0,0 +1,72 @@
+"""
+Near-Duplicate Detection for RAG.
+Computes 64-bit SimHash fingerprints over word shingles so chunks that repeat across
+email threads (quoted replies, forwarded bodies) can be dropped before embedding.
+Fingerprints are bucketed by 16-bit bands, so any two within MAX_DISTANCE bits
+share at least one band and are found without a full scan.
+"""
+import hashlib
+
+import numpy as np
+
+from bm25 import tokenize
+
+BITS = 64
+BANDS = 4
+MAX_DISTANCE = 3
+SHINGLE = 3
+
+
+def simhash(text: str) -> int:
+    tokens = tokenize(text)
+    if len(tokens) >= SHINGLE:
+        shingles = [" ".join(tokens[i:i + SHINGLE]) for i in range(len(tokens) - SHINGLE + 1)]
+    else:
+        shingles = tokens or [text]
+    hashes = np.array(
+        [int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "big") for s in shingles],
+        dtype=">u8",
+    )
+    bits = np.unpackbits(hashes.view(np.uint8).reshape(-1, 8), axis=1)  # (n, 64), most significant bit first
+    votes = bits.sum(axis=0, dtype=np.int64) * 2 - len(shingles)
+    return int.from_bytes(np.packbits(votes > 0).tobytes(), "big")
+
+
+def _bands(signature: int):
+    width = BITS // BANDS
+    mask = (1 << width) - 1
+    return [(band, (signature >> (band * width)) & mask) for band in range(BANDS)]
+
+
+class SimHashIndex:
+    def __init__(self, max_distance: int = MAX_DISTANCE):
+        self.max_distance = max_distance
+        self.signatures: dict[str, int] = {}
+        self.buckets: dict[tuple[int, int], set[str]] = {}
+
+    def __len__(self):
+        return len(self.signatures)
+
+    def add(self, item_id: str, signature: int):
+        self.signatures[item_id] = signature
+        for key in _bands(signature):
+            self.buckets.setdefault(key, set()).add(item_id)
+
+    def remove(self, item_id: str):
+        signature = self.signatures.pop(item_id, None)
+        if signature is None:
+            return
+        for key in _bands(signature):
+            bucket = self.buckets.get(key)
+            if bucket:
+                bucket.discard(item_id)
+                if not bucket:
+                    del self.buckets[key]
+
+    def find(self, signature: int):
+        """Return the ID of a stored near-duplicate of `signature`, or None."""
+        for key in _bands(signature):
+            for item_id in self.buckets.get(key, ()):
+                if (self.signatures[item_id] ^ signature).bit_count() <= self.max_distance:
+                    return item_id
+        return None
@@ -0,0 +1,179 @@
+"""
+Embedding Cache for RAG.
+Stores chunk embeddings in a memory-mapped float32 array on disk, keyed by a hash of
+the chunk text and the embedding model name, so repeated chunks (e.g. the same unread
+emails on every background tick) skip the transformer entirely.
+Least recently used entries are overwritten once the cache is full. The slot table lives in
+SQLite, so each put writes only the rows it changed.
+"""
+import hashlib
+import os
+import sqlite3
+import sys
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "embedding_cache")
+MAX_ENTRIES = 20000
+
+
+class EmbeddingCache:
+    def __init__(self, path: str = DEFAULT_PATH, max_entries: int = MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self.dim = None
+        self.vectors = None
+        # key -> slot in the memmap, ordered from least to most recently used
+        self.slots: OrderedDict[str, int] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._tick = 0
+        self._load()
+
+    @property
+    def _index_path(self):
+        return os.path.join(self.path, "index.db")
+
+    @property
+    def _vectors_path(self):
+        return os.path.join(self.path, "vectors.f32")
+
+    @staticmethod
+    def key(model_name: str, text: str) -> str:
+        return hashlib.sha256(f"{model_name}\0{text}".encode("utf-8")).hexdigest()
+
+    def _open_vectors(self, mode: str):
+        self.vectors = np.memmap(
+            self._vectors_path, dtype=np.float32, mode=mode, shape=(self.max_entries, self.dim)
+        )
+
+    def _open_index(self):
+        os.makedirs(self.path, exist_ok=True)
+        self.conn = sqlite3.connect(self._index_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        with self.conn:
+            # `used` orders slots from least to most recently stored
+            self.conn.execute("CREATE TABLE IF NOT EXISTS slots (key TEXT PRIMARY KEY, slot INTEGER, used INTEGER)")
+            self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+
+    def _load(self):
+        """Reopen the memmap and slot table, starting empty if they are missing or don't match."""
+        self.conn = None
+        try:
+            self._open_index()
+            meta = dict(self.conn.execute("SELECT key, value FROM meta"))
+            if meta.get("max_entries") != str(self.max_entries) or not os.path.exists(self._vectors_path):
+                with self.conn:
+                    self.conn.execute("DELETE FROM slots")
+                    self.conn.execute("DELETE FROM meta")
+                return
+            self.dim = int(meta["dim"])
+            self._open_vectors("r+")
+            self.slots = OrderedDict(self.conn.execute("SELECT key, slot FROM slots ORDER BY used"))
+            self._tick = self.conn.execute("SELECT COALESCE(MAX(used), 0) FROM slots").fetchone()[0]
+        except (sqlite3.Error, KeyError, ValueError, OSError) as e:
+            print(f"[EmbeddingCache] Failed to load, starting empty: {e}", file=sys.stderr)
+            self.dim, self.vectors, self.slots = None, None, OrderedDict()
+
+    def _store(self, evicted, writes, stored):
+        """Apply a put (called under lock): forget evicted keys before their slots are
+        overwritten with the new (slot, vector) writes, then record the stored (key, slot) rows."""
+        try:
+            with self.conn:
+                self.conn.executemany("DELETE FROM slots WHERE key = ?", [(key,) for key in evicted])
+            for slot, vector in writes:
+                self.vectors[slot] = vector
+            self.vectors.flush()
+            rows = []
+            for key, slot in stored:
+                self._tick += 1
+                rows.append((key, slot, self._tick))
+            with self.conn:
+                self.conn.executemany("INSERT OR REPLACE INTO slots VALUES (?, ?, ?)", rows)
+        except (sqlite3.Error, OSError) as e:
+            print(f"[EmbeddingCache] Failed to save: {e}", file=sys.stderr)
+
+    def get_many(self, keys):
+        """Return a list parallel to `keys` with cached vectors or None for misses."""
+        found = []
+        with self._lock:
+            for key in keys:
+                slot = self.slots.get(key)
+                if slot is None:
+                    self.misses += 1
+                    found.append(None)
+                else:
+                    self.hits += 1
+                    self.slots.move_to_end(key)
+                    found.append(self.vectors[slot].tolist())
+        return found
+
+    def put_many(self, keys, vectors):
+        if not keys:
+            return
+        with self._lock:
+            if self.conn is None:
+                return
+            if self.vectors is None:
+                self.dim = len(vectors[0])
+                self._open_vectors("w+")
+                with self.conn:
+                    self.conn.executemany("INSERT OR REPLACE INTO meta VALUES (?, ?)",
+                                          [("dim", str(self.dim)), ("max_entries", str(self.max_entries))])
+            evicted, writes, stored = [], [], []
+            for key, vector in zip(keys, vectors):
+                if key in self.slots:
+                    self.slots.move_to_end(key)
+                    stored.append((key, self.slots[key]))
+                    continue
+                if len(self.slots) < self.max_entries:
+                    slot = len(self.slots)
+                else:
+                    old_key, slot = self.slots.popitem(last=False)
+                    evicted.append(old_key)
+                writes.append((slot, vector))
+                self.slots[key] = slot
+                stored.append((key, slot))
+            self._store(evicted, writes, stored)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+            "entries": len(self.slots),
+        }
+
+
+class CachedEmbeddings(Embeddings):
+    """Wraps a LangChain embedding model and consults an EmbeddingCache before running it."""
+
+    def __init__(self, model, cache: EmbeddingCache = None):
+        self.model = model
+        self.model_name = getattr(model, "model_name", type(model).__name__)
+        self.cache = cache or EmbeddingCache()
+
+    def embed_documents(self, texts):
+        keys = [EmbeddingCache.key(self.model_name, t) for t in texts]
+        vectors = self.cache.get_many(keys)
+        missing = [i for i, v in enumerate(vectors) if v is None]
+        if missing:
+            computed = self.model.embed_documents([texts[i] for i in missing])
+            for i, vector in zip(missing, computed):
+                vectors[i] = vector
+            self.cache.put_many([keys[i] for i in missing], computed)
+        return vectors
+
+    def embed_query(self, text):
+        key = EmbeddingCache.key(f"{self.model_name}:query", text)
+        vector = self.cache.get_many([key])[0]
+        if vector is None:
+            vector = self.model.embed_query(text)
+            self.cache.put_many([key], [vector])
+        return vector
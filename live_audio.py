@@ -7,7 +7,8 @@ Key Components:
  - Asynchronous audio streaming (PyAudio).
  - Integrated wake-word detection using Vosk.
  - Dynamic tool binding via Model Context Protocol (MCP Server).
- - Parallel background tasks for email triaging & Persona extraction.
+ - Parallel background tasks for email triaging (IMAP IDLE push) & Persona extraction.
+ - Timed reminders for calendar events and due notes (heap scheduler, no polling).
 """
 import asyncio
 import sys
@@ -28,6 +29,11 @@ from langchain_mcp_adapters.tools import load_mcp_tools
 from mem0 import MemoryClient
 from short_term_memory import ShortTermMemory
 from user_persona import UserPersona
+from services.iitk_mail import IITKMail, IMAPWatcher
+from services.calender import GoogleCalendar
+from notepad import Notepad
+from OAuth import Authenticate
+from reminders import CALENDAR_STORE_PATH, REFRESH_SECONDS, ReminderScheduler, collect_reminders
 
 # --- AUDIO SETTINGS (Gemini Live requires 16kHz PCM) ---
 FORMAT = pyaudio.paInt16
@@ -92,6 +98,18 @@ def map_mcp_to_genai_declarations(mcp_tools):
         tools_dict[tool.name] = tool
     return declarations, tools_dict
 
+MAX_MAIL_EVENT_MESSAGES = 10
+
+def new_mail_event(headers):
+    """Compact system event for newly arrived IITK mail (headers only)."""
+    listing = "\n---\n".join(headers[:MAX_MAIL_EVENT_MESSAGES])
+    if len(headers) > MAX_MAIL_EVENT_MESSAGES:
+        listing += f"\n(+{len(headers) - MAX_MAIL_EVENT_MESSAGES} more)"
+    return (f"[SYSTEM EVENT: New IITK mail:\n{listing}\n"
+            "If any are about Quizzes, Exams, Classes, or Deadlines, alert the user verbally and call calendar_create "
+            "to schedule them (use iitk_mail_search for details). Otherwise remain completely silent. "
+            "CRITICAL: DO NOT SEND ANY EMAILS OR REPLIES. Only read them and alert the user!]")
+
 async def handle_tool_call(fc, tools_dict, jarvis_active=None):
     """Execute a single function call and return the result string."""
     name = fc.name
@@ -201,6 +219,7 @@ IMPORTANT - Notes & Reminders:
 2. When the user asks "what did I note?", "read my notes", "what's on my todo list?", use `note_list` (optionally with a category filter).
 3. When the user asks about a specific note or topic, use `note_search` to find it.
 4. When the user says they finished a task, use `note_done` to mark it complete.
+5. When the user wants to be reminded of something at a specific time, pass that time as `when` to `note_add`. You will receive a [SYSTEM EVENT: Reminder ...] when it is due, and before calendar events start.
 {persona_block}
 {context_block}
 Respond conversationally. Be helpful, concise, and slightly witty like J.A.R.V.I.S."""
@@ -241,6 +260,43 @@ Respond conversationally. Be helpful, concise, and slightly witty like J.A.R.V.I
             # we reconnect the Live session while keeping MCP + Vosk alive.
             reconnect_delay = 5  # seconds, grows with exponential backoff
             MAX_RECONNECT_DELAY = 60
+
+            # New-mail push: an IMAP IDLE watcher thread feeds this queue, which outlives
+            # Live session reconnects so mail arriving mid-reconnect is still announced
+            mail_events = asyncio.Queue()
+            # The watcher opens its own connection; no pool or local mirror in this process
+            iitk_mail = IITKMail(pool_size=0, store_path=None)
+            if iitk_mail.email_address and iitk_mail.password:
+                main_loop = asyncio.get_running_loop()
+                IMAPWatcher(
+                    iitk_mail, lambda headers: main_loop.call_soon_threadsafe(mail_events.put_nowait, headers)
+                ).start()
+                print("IITK mail watcher started.", file=sys.stderr)
+
+            # Reminders: the scheduler sleeps until the next calendar event or due note and
+            # feeds this queue; like mail_events it outlives Live session reconnects
+            reminder_events = asyncio.Queue()
+            reminders = ReminderScheduler()
+            try:
+                calendar = GoogleCalendar(Authenticate(), store_path=CALENDAR_STORE_PATH)
+            except Exception as e:
+                print(f"Warning: Calendar unavailable for reminders ({e}).", file=sys.stderr)
+                calendar = None
+            notepad = Notepad()
+
+            async def reminder_refresh_loop():
+                """Re-reads reminders from the calendar mirror (one incremental sync) and notes."""
+                while True:
+                    try:
+                        reminders.replace(await asyncio.to_thread(collect_reminders, calendar, notepad))
+                    except Exception as e:
+                        print(f"[Reminder refresh failed: {e}]", file=sys.stderr)
+                    await asyncio.sleep(REFRESH_SECONDS)
+
+            background_tasks = [
+                asyncio.create_task(reminders.run(reminder_events.put)),
+                asyncio.create_task(reminder_refresh_loop()),
+            ]
             
             while True:  # Reconnection loop
                 try:
@@ -302,26 +358,36 @@ Respond conversationally. Be helpful, concise, and slightly witty like J.A.R.V.I
 
                         async def background_tick():
                             """
-                            Runs perpetually in the background. Wakes every 5 minutes
-                            to silently inject a command to triage emails. Every 20 minutes, 
+                            Runs perpetually in the background. Every 20 minutes,
                             it silently kicks off the Persona Reflection engine in a separate thread.
+                            (Email triage is pushed by mail_watch_loop instead of polled here.)
                             """
-                            tick_count = 0
                             try:
                                 while not should_reconnect.is_set():
-                                    # Run every 5 minutes (300 seconds)
-                                    await asyncio.sleep(300)
+                                    # Run every 20 minutes (1200 seconds)
+                                    await asyncio.sleep(1200)
                                     if should_reconnect.is_set():
                                         break
-                                    tick_count += 1
-                                    await system_event_queue.put(
-                                        "[SYSTEM EVENT: Background Check. 1. Call iitk_mail_unread. 2. If you see emails about Quizzes, Exams, Classes, or Deadlines, alert the user verbally and call calendar_create to schedule them. 3. If there is nothing urgent or new, remain completely silent. CRITICAL: DO NOT SEND ANY EMAILS OR REPLIES OUTSTANDINGLY. Only read them and alert the user!]"
-                                    )
-                                    # Every 20 minutes (4 ticks), run persona reflection silently
-                                    if tick_count % 4 == 0:
-                                        conversation_log = stm.get_context(max_entries=30)
-                                        if conversation_log:
-                                            await asyncio.to_thread(persona.reflect, conversation_log)
+                                    conversation_log = stm.get_context(max_entries=30)
+                                    if conversation_log:
+                                        await asyncio.to_thread(persona.reflect, conversation_log)
+                            except asyncio.CancelledError:
+                                pass
+
+                        async def mail_watch_loop():
+                            """Turns new IITK mail reported by the IMAP watcher into system events."""
+                            try:
+                                while not should_reconnect.is_set():
+                                    headers = await mail_events.get()
+                                    await system_event_queue.put(new_mail_event(headers))
+                            except asyncio.CancelledError:
+                                pass
+
+                        async def reminder_loop():
+                            """Passes reminders from the scheduler on as system events."""
+                            try:
+                                while not should_reconnect.is_set():
+                                    await system_event_queue.put(await reminder_events.get())
                             except asyncio.CancelledError:
                                 pass
 
@@ -433,6 +499,8 @@ Respond conversationally. Be helpful, concise, and slightly witty like J.A.R.V.I
                             asyncio.create_task(receive_loop()),
                             asyncio.create_task(system_event_loop()),
                             asyncio.create_task(background_tick()),
+                            asyncio.create_task(mail_watch_loop()),
+                            asyncio.create_task(reminder_loop()),
                             asyncio.create_task(reconnect_monitor()),
                         ]
                         if mode == "audio":
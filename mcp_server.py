@@ -15,17 +15,24 @@ from OAuth import Authenticate
 from services.calender import GoogleCalendar, parse_datetime_to_iso
 from services.mail import Gmail
 from services.iitk_mail import IITKMail
-from services.drive import GoogleDrive
+from services.drive import GoogleDrive, start_extract_pool
+from services.outbox import Outbox, describe
 from services.web_search import WebSearch, scrape_page
 from notepad import Notepad
+import RAG
 from datetime import datetime, timedelta
 import pytz
 import asyncio
 
+if __name__ == "__main__":
+    # Fork the Drive text-extraction workers before any service starts a thread
+    start_extract_pool()
+
 # Initialize Google Services
 creds = Authenticate()
-mail_service = Gmail(creds)
-iitk_mail_service = IITKMail()
+outbox = Outbox()
+mail_service = Gmail(creds, outbox=outbox)
+iitk_mail_service = IITKMail(outbox=outbox)
 drive_service = GoogleDrive(creds)
 calendar_service = GoogleCalendar(creds)
 notepad_service = Notepad()
@@ -38,26 +45,36 @@ async def gmail_send(to: str, subject: str, body: str) -> str:
     """
     CRITICAL RESTRICTION: NEVER CALL THIS TOOL WITHOUT EXPLICIT VERBAL PERMISSION FROM THE USER FIRST.
     If you are autonomously checking emails, DO NOT REPLY TO THEM.
-    Send an email using Gmail
+    Send an email using Gmail. The email is queued and sent in the background; the reply contains an ID for mail_status.
     """
     return str(await asyncio.to_thread(mail_service.send_mail, to, subject, body))
 
 @mcp.tool()
-async def gmail_search(query: str, results: int = 5) -> str:
-    """Search Gmail inbox and return semantically relevant emails"""
-    return str(await asyncio.to_thread(mail_service.search, query, results=results, rag=True))
+async def mail_status(email_id: int) -> str:
+    """Check whether a queued email (gmail_send or iitk_mail_send) was delivered, using the ID they returned"""
+    return describe(await asyncio.to_thread(outbox.status, email_id))
+
+@mcp.tool()
+async def gmail_search(query: str, results: int = 5, hybrid: bool = False) -> str:
+    """Search Gmail inbox and return semantically relevant emails. Set hybrid=True for keyword-heavy queries (quiz, deadline, course codes) to also match exact words."""
+    return str(await asyncio.to_thread(mail_service.search, query, results=results, rag=True, hybrid=hybrid))
 
 @mcp.tool()
 async def gmail_unread(results: int = 5) -> str:
-    """Fetch unread Gmail messages"""
-    return str(await asyncio.to_thread(mail_service.unread, max_results=results))
+    """Fetch unread Gmail messages (sender, subject, date and a short snippet). Use gmail_read with a message id to get the full body."""
+    return str(await asyncio.to_thread(mail_service.unread, max_results=results, triage=True))
+
+@mcp.tool()
+async def gmail_read(message_id: str) -> str:
+    """Read the full body of a Gmail message by its id (as returned by gmail_unread)"""
+    return str(await asyncio.to_thread(mail_service.get_message, message_id))
 
 @mcp.tool()
 async def iitk_mail_send(to: str, subject: str, body: str) -> str:
     """
     CRITICAL RESTRICTION: NEVER CALL THIS TOOL WITHOUT EXPLICIT VERBAL PERMISSION FROM THE USER FIRST.
     If you are autonomously checking emails, DO NOT REPLY TO THEM.
-    Send an email using IITK Webmail (IMAP/SMTP)
+    Send an email using IITK Webmail (IMAP/SMTP). The email is queued and sent in the background; the reply contains an ID for mail_status.
     """
     return str(await asyncio.to_thread(iitk_mail_service.send_mail, to, subject, body))
 
@@ -72,9 +89,9 @@ async def iitk_mail_search(query: str, results: int = 5) -> str:
     return str(await asyncio.to_thread(iitk_mail_service.search, query, max_results=results))
 
 @mcp.tool()
-async def drive_search(query: str, keywords: List[str], max_results: int = 5) -> str:
-    """Search Google Drive for files related to list of keywords and retrieve content through RAG for a given query"""
-    return str(await asyncio.to_thread(drive_service.get_results, query, keywords, max_results=max_results))
+async def drive_search(query: str, keywords: List[str], max_results: int = 5, hybrid: bool = False) -> str:
+    """Search Google Drive for files related to list of keywords and retrieve content through RAG for a given query. Set hybrid=True for keyword-heavy queries (course codes, exact terms) to also match exact words."""
+    return str(await asyncio.to_thread(drive_service.get_results, query, keywords, max_results=max_results, hybrid=hybrid))
 
 @mcp.tool()
 async def calendar_search(query: str, max_results: int = 5) -> str:
@@ -95,12 +112,12 @@ async def calendar_create(summary: str, start: str, end: str = None, timezone: s
     end: optional natural language end time; if not provided, defaults to 1 hour after start
     timezone: e.g., "Asia/Kolkata"
     """
-    # Parse start datetime to ISO
-    start_iso = parse_datetime_to_iso(start, timezone)
+    # Parse start datetime to ISO (off the event loop: unusual phrasings fall back to dateparser)
+    start_iso = await asyncio.to_thread(parse_datetime_to_iso, start, timezone)
 
     # Parse end datetime
     if end:
-        end_iso = parse_datetime_to_iso(end, timezone)
+        end_iso = await asyncio.to_thread(parse_datetime_to_iso, end, timezone)
     else:
         # Default: 1 hour after start
         start_dt = datetime.fromisoformat(start_iso)
@@ -115,9 +132,11 @@ async def calendar_delete(summary: str, days_ahead: int = 30) -> str:
     return str(await asyncio.to_thread(calendar_service.delete_event, summary, days_ahead=days_ahead))
 
 @mcp.tool()
-async def note_add(content: str, category: str = "general") -> str:
-    """Save a note, todo item, phone number, or reminder. Category can be: general, todo, contact, reminder, shopping, idea."""
-    return str(await asyncio.to_thread(notepad_service.add_note, content, category))
+async def note_add(content: str, category: str = "general", when: str = "") -> str:
+    """Save a note, todo item, phone number, or reminder. Category can be: general, todo, contact, reminder, shopping, idea.
+    when: optional natural language time (e.g. "tomorrow 5pm") at which to remind the user of the note."""
+    due = await asyncio.to_thread(parse_datetime_to_iso, when) if when else None
+    return str(await asyncio.to_thread(notepad_service.add_note, content, category, due))
 
 @mcp.tool()
 async def note_list(category: str = "") -> str:
@@ -353,4 +372,8 @@ async def system_command(command: str) -> str:
         return f"Error executing command: {e}"
 
 if __name__ == "__main__":
+    # Load the embedding model in the background so non-RAG tools answer immediately
+    RAG.warm_up()
+    # Keep the local Drive corpus index current so drive_search can answer without the network
+    drive_service.start_sync()
     mcp.run()
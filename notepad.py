@@ -29,14 +29,18 @@ class Notepad:
             self.notes = []
 
     def _save(self):
+        # Written to a temp file and swapped in, so other processes re-reading it never see half a file
         try:
-            with open(self.path, "w") as f:
+            tmp = self.path + ".tmp"
+            with open(tmp, "w") as f:
                 json.dump(self.notes, f, indent=2, default=str)
-        except IOError as e:
+            os.replace(tmp, self.path)
+        except (IOError, OSError) as e:
             print(f"[Notepad] Save failed: {e}")
 
-    def add_note(self, content: str, category: str = "general") -> str:
-        """Add a new note. Category can be: general, todo, contact, reminder, etc."""
+    def add_note(self, content: str, category: str = "general", due: str = None) -> str:
+        """Add a new note. Category can be: general, todo, contact, reminder, etc.
+        `due` is an optional ISO datetime at which J.A.R.V.I.S. reminds the user of it."""
         note = {
             "id": len(self.notes) + 1,
             "content": content,
@@ -44,10 +48,19 @@ class Notepad:
             "created": datetime.now().isoformat(),
             "done": False
         }
+        if due:
+            note["due"] = due
         with self._lock:
             self.notes.append(note)
             self._save()
-        return f"Note #{note['id']} saved under '{category}': {content}"
+        when = f" (reminder at {due})" if due else ""
+        return f"Note #{note['id']} saved under '{category}'{when}: {content}"
+
+    def due_notes(self) -> list[dict]:
+        """Open notes that have a due time, re-read from disk (other processes add notes)."""
+        with self._lock:
+            self._load()
+            return [n for n in self.notes if n.get("due") and not n.get("done")]
 
     def list_notes(self, category: str = None) -> str:
         """List all notes, optionally filtered by category."""
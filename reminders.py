@@ -0,0 +1,101 @@
+"""
+Reminder Scheduler for J.A.R.V.I.S.
+Keeps reminders for upcoming calendar events and notes with a due time in a heap ordered by
+reminder time, and sleeps until the earliest one is due. Nothing is polled and the model is
+only prompted when a reminder actually fires. The scheduler lives outside the Live API
+session, so reminders keep their timing across reconnects.
+"""
+import asyncio
+import heapq
+import os
+import sys
+import time
+from datetime import datetime
+
+# Calendar events are announced this many minutes before they start; notes at their due time
+LEAD_MINUTES = int(os.environ.get("REMINDER_LEAD_MINUTES", "10"))
+# How often reminders are re-read from the calendar mirror and the notepad
+REFRESH_SECONDS = int(os.environ.get("REMINDER_REFRESH_SECONDS", "60"))
+# Only events starting within this many hours are scheduled (refreshes pick up later ones)
+HORIZON_HOURS = 24
+# Reminders missed by up to this much (e.g. while the process was down) still fire
+LATE_GRACE_SECONDS = 15 * 60
+MAX_EVENTS = 100
+# The reminder process keeps its own calendar mirror; the MCP server's mirror is another process's file
+CALENDAR_STORE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "reminder_calendar_mirror.json")
+
+
+class ReminderScheduler:
+    def __init__(self):
+        self._heap = []      # (fire_at, key); entries no longer in _pending are skipped when popped
+        self._pending = {}   # key -> (fire_at, text)
+        self._fired = {}     # key -> fire_at of reminders already announced
+        self._wake = asyncio.Event()
+
+    def replace(self, reminders):
+        """Swap in the current reminders, {key: (fire_at, text)}. A key includes the time it is
+        for, so a moved event is a new reminder while an unchanged one never fires twice, even if
+        it is missing from one refresh: fired keys are kept until they are past the grace period."""
+        cutoff = time.time() - LATE_GRACE_SECONDS
+        self._fired = {key: fire_at for key, fire_at in self._fired.items() if key in reminders or fire_at >= cutoff}
+        self._pending = {key: value for key, value in reminders.items() if key not in self._fired}
+        self._heap = [(fire_at, key) for key, (fire_at, _) in self._pending.items()]
+        heapq.heapify(self._heap)
+        self._wake.set()
+
+    def _pop_due(self, now):
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            fire_at, key = heapq.heappop(self._heap)
+            entry = self._pending.get(key)
+            if entry is None or entry[0] != fire_at:
+                continue
+            del self._pending[key]
+            self._fired[key] = fire_at
+            if now - fire_at <= LATE_GRACE_SECONDS:
+                due.append(entry[1])
+        return due
+
+    async def run(self, emit):
+        """Await emit(text) for each reminder as it comes due; runs until cancelled."""
+        while True:
+            for text in self._pop_due(time.time()):
+                await emit(text)
+            delay = self._heap[0][0] - time.time() if self._heap else None
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+
+
+def collect_reminders(calendar=None, notepad=None, now=None, lead_minutes=LEAD_MINUTES):
+    """Reminders for the scheduler from the calendar mirror (synced first) and the notepad.
+    If the sync fails (e.g. offline), the mirror's existing events are used. Blocking; run it in a thread."""
+    now = now or time.time()
+    reminders = {}
+    if calendar is not None:
+        try:
+            calendar.sync()
+        except Exception as e:
+            print(f"[Reminders] Calendar sync failed, using mirrored events: {e}", file=sys.stderr)
+        for event in calendar.mirror.between(now, now + HORIZON_HOURS * 3600, limit=MAX_EVENTS):
+            if "dateTime" not in event["start"]:
+                continue  # all-day events have no start time to remind about
+            start = calendar.mirror.timestamp(event["start"])
+            if start < now:
+                continue  # already under way
+            fire_at = start - lead_minutes * 60
+            minutes = max(round((start - max(now, fire_at)) / 60), 1)
+            at = datetime.fromtimestamp(start).strftime("%H:%M")
+            where = f" at {event['location']}" if event.get("location") else ""
+            text = (f"[SYSTEM EVENT: Reminder: '{event.get('summary', '(No Title)')}' starts at {at}{where}, "
+                    f"in about {minutes} minute{'s' if minutes != 1 else ''}. Briefly remind the user.]")
+            reminders[f"event:{event['id']}:{start}"] = (fire_at, text)
+    if notepad is not None:
+        for note in notepad.due_notes():
+            due = datetime.fromisoformat(note["due"]).timestamp()
+            text = (f"[SYSTEM EVENT: Reminder due now from note #{note['id']}: {note['content']}. "
+                    "Briefly remind the user.]")
+            reminders[f"note:{note['id']}:{due}"] = (due, text)
+    return reminders
@@ -1,19 +1,121 @@
 """
 Google Calendar Service Wrapper.
 Provides integration with the Google Calendar API for creating, deleting, and searching upcoming events. 
-Parses natural language dates using dateparser and handles timezone conversions.
+Parses natural language dates (common formats directly, the rest with dateparser restricted
+to DATEPARSER_LANGUAGES) and handles timezone conversions.
+Events are mirrored locally and kept current with the API's syncToken incremental sync,
+so lookups are answered from memory.
 """
 import sys
 from googleapiclient.discovery import build
+from googleapiclient.errors import HttpError
+import bisect
 import datetime
-from RAG import RAG
-import dateparser
+import functools
+import json
+import os
+import re
+import threading
+import time
 import pytz
 
-def parse_datetime_to_iso(natural_date: str, timezone="Asia/Kolkata") -> str:
-    
+DEFAULT_STORE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "calendar_mirror.json")
+# How far back the first full sync reaches; later syncs only fetch changes
+SYNC_PAST_DAYS = int(os.environ.get("CALENDAR_SYNC_PAST_DAYS", "30"))
+# Lookups within this many seconds of the last sync are answered without any request
+SYNC_INTERVAL = int(os.environ.get("CALENDAR_SYNC_INTERVAL", "60"))
+SYNC_PAGE_SIZE = 250
+TOKEN_RE = re.compile(r"\w+")
+
+# dateparser otherwise tries every locale it knows, which takes seconds on some inputs
+DATEPARSER_LANGUAGES = os.environ.get("DATEPARSER_LANGUAGES", "en").split(",")
+
+MONTHS = {name: n for n in range(1, 13) for name in (
+    datetime.date(2000, n, 1).strftime("%b").lower(), datetime.date(2000, n, 1).strftime("%B").lower())}
+MONTHS["sept"] = 9
+TIME_PART = r"(\d{1,2})(?:[:.](\d{2}))?\s*(am|pm)?"
+TIME_RE = re.compile(TIME_PART + "$")
+# Only the extended ISO form; dateparser reads compact ones like "20250908" differently
+ISO_DATE_RE = re.compile(r"\d{4}-\d{2}-\d{2}")
+# "8 sep 2025 23:30", "sep 8 2025 11:30 pm" (after normalize(): no commas, ordinals or "at")
+DAY_FIRST_RE = re.compile(r"(\d{1,2}) ([a-z]+) (\d{4})(?: (.+))?$")
+MONTH_FIRST_RE = re.compile(r"([a-z]+) (\d{1,2}) (\d{4})(?: (.+))?$")
+RELATIVE_DAY_RE = re.compile(r"(today|tomorrow)(?: (.+))?$")
+# Phrases whose meaning depends on the current time of day, which are not memoized
+CLOCK_RELATIVE_RE = re.compile(r"\b(now|ago|in|hours?|minutes?|mins?|seconds?|secs?)\b")
+
+
+def normalize(text):
+    text = text.strip().lower().replace(",", " ")
+    text = re.sub(r"(\d)(st|nd|rd|th)\b", r"\1", text)
+    text = re.sub(r"\bat\b", " ", text)
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def _clock(text):
+    """(hour, minute) of "23:30", "5pm", "5:30 pm", or None (also for a bare number like "5")."""
+    match = TIME_RE.match(text)
+    if not match:
+        return None
+    hour, minute, meridiem = int(match.group(1)), int(match.group(2) or 0), match.group(3)
+    if match.group(2) is None and not meridiem:
+        return None  # a bare "5" may be a day, a month or 5 pm; leave it to dateparser
+    if meridiem:
+        if not 1 <= hour <= 12:
+            return None
+        hour = hour % 12 + (12 if meridiem == "pm" else 0)
+    if hour > 23 or minute > 59:
+        return None
+    return hour, minute
+
+
+def _fast_parse(text, tz):
+    """Datetime for ISO strings and the common phrasings, or None to fall back to dateparser."""
+    if ISO_DATE_RE.match(text.strip()):
+        try:
+            dt = datetime.datetime.fromisoformat(text.strip())
+            return dt if dt.tzinfo else tz.localize(dt)
+        except ValueError:
+            pass
+
+    text = normalize(text)
+    now = datetime.datetime.now(tz)
+    for regex, day_group, month_group in ((DAY_FIRST_RE, 1, 2), (MONTH_FIRST_RE, 2, 1)):
+        match = regex.match(text)
+        if match and match.group(month_group) in MONTHS:
+            clock = _clock(match.group(4)) if match.group(4) else (0, 0)
+            if clock is None:
+                return None
+            try:
+                day = datetime.datetime(int(match.group(3)), MONTHS[match.group(month_group)],
+                                        int(match.group(day_group)), *clock)
+            except ValueError:
+                return None
+            return tz.localize(day)
+
+    match = RELATIVE_DAY_RE.match(text)
+    if match:
+        day = now + datetime.timedelta(days=1 if match.group(1) == "tomorrow" else 0)
+        if not match.group(2):
+            return day
+        clock = _clock(match.group(2))
+        if clock is None:
+            return None
+        return tz.localize(datetime.datetime(day.year, day.month, day.day, *clock))
+
+    clock = _clock(text)
+    if clock:
+        return tz.localize(datetime.datetime(now.year, now.month, now.day, *clock))
+    return None
+
+
+def _parse(natural_date, timezone):
     tz = pytz.timezone(timezone)
-    dt = dateparser.parse(natural_date, settings={'TIMEZONE': timezone, 'RETURN_AS_TIMEZONE_AWARE': True})
+    dt = _fast_parse(natural_date, tz)
+    if dt is None:
+        import dateparser  # slow to import; most inputs never need it
+        dt = dateparser.parse(natural_date, languages=DATEPARSER_LANGUAGES,
+                              settings={'TIMEZONE': timezone, 'RETURN_AS_TIMEZONE_AWARE': True})
     
     if dt is None:
         raise ValueError(f"Could not parse datetime from '{natural_date}'")
@@ -25,33 +127,225 @@ def parse_datetime_to_iso(natural_date: str, timezone="Asia/Kolkata") -> str:
     return dt.isoformat()
 
 
+@functools.lru_cache(maxsize=1024)
+def _parse_on_day(natural_date, timezone, day):
+    """
+    _parse memoized per calendar day in `timezone` (relative phrases like "tomorrow 5pm" change daily).
+    Returns (iso, live): `live` is True when the result carries the current time of day, as dateparser
+    gives "day after tomorrow" or "next week"; such results must be recomputed on every call.
+    """
+    tz = pytz.timezone(timezone)
+    before = datetime.datetime.now(tz).replace(microsecond=0).time()
+    iso = _parse(natural_date, timezone)
+    after = datetime.datetime.now(tz).time()
+    return iso, before <= datetime.datetime.fromisoformat(iso).time() <= after
+
+
+def parse_datetime_to_iso(natural_date: str, timezone="Asia/Kolkata") -> str:
+    text = normalize(natural_date)
+    # "tomorrow" without a clock time and "in 2 hours" resolve against the current time, so they are never memoized
+    relative_day = RELATIVE_DAY_RE.match(text)
+    if CLOCK_RELATIVE_RE.search(text) or (relative_day and not (relative_day.group(2) and _clock(relative_day.group(2)))):
+        return _parse(natural_date, timezone)
+    day = datetime.datetime.now(pytz.timezone(timezone)).date()
+    iso, live = _parse_on_day(natural_date, timezone, day)
+    return _parse(natural_date, timezone) if live else iso
+
+
+
+
+
+
 
+def tokenize(text):
+    return set(TOKEN_RE.findall((text or "").lower()))
+
+
+class CalendarMirror:
+    """
+    In-memory copy of the primary calendar's (single, expanded) events, persisted as JSON
+    together with the syncToken it is current to. Events are indexed by start time (a sorted
+    list of (start, id), scanned from now minus the longest event so ongoing events are found)
+    and by the words of their summary and location.
+    """
+
+    def __init__(self, path: str = DEFAULT_STORE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self.sync_token = None
+        self.time_zone = "UTC"
+        self.events = {}  # id -> event resource
+        self._load()
+
+    def _load(self):
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, "r") as f:
+                    state = json.load(f)
+                self.sync_token = state.get("sync_token")
+                self.time_zone = state.get("time_zone") or "UTC"
+                self.events = state.get("events", {})
+            except (json.JSONDecodeError, OSError, AttributeError) as e:
+                print(f"[CalendarMirror] Failed to load, starting empty: {e}", file=sys.stderr)
+                self.sync_token, self.events = None, {}
+        self._reindex()
+
+    def _save(self):
+        """Persist the mirror (called under lock)."""
+        try:
+            tmp = self.path + ".tmp"
+            with open(tmp, "w") as f:
+                json.dump({"sync_token": self.sync_token, "time_zone": self.time_zone, "events": self.events}, f)
+            os.replace(tmp, self.path)
+        except (IOError, OSError) as e:
+            print(f"[CalendarMirror] Failed to save: {e}", file=sys.stderr)
 
+    def timestamp(self, when):
+        """Epoch seconds of an event start/end ({"dateTime": ...} or an all-day {"date": ...})."""
+        if "dateTime" in when:
+            return datetime.datetime.fromisoformat(when["dateTime"].replace("Z", "+00:00")).timestamp()
+        day = datetime.datetime.fromisoformat(when["date"])
+        return pytz.timezone(self.time_zone).localize(day).timestamp()
 
+    def _reindex(self):
+        self._starts = []     # sorted (start, id)
+        self._spans = {}      # id -> (start, end)
+        self._tokens = {}     # word -> ids
+        self._max_span = 0.0  # longest event, in seconds
+        for event in self.events.values():
+            self._index(event)
+
+    def _index(self, event):
+        start, end = self.timestamp(event["start"]), self.timestamp(event["end"])
+        bisect.insort(self._starts, (start, event["id"]))
+        self._spans[event["id"]] = (start, end)
+        self._max_span = max(self._max_span, end - start)
+        for word in tokenize(event.get("summary")) | tokenize(event.get("location")):
+            self._tokens.setdefault(word, set()).add(event["id"])
+
+    def _unindex(self, event_id):
+        event = self.events.pop(event_id, None)
+        if event is None:
+            return
+        start, _ = self._spans.pop(event_id)
+        i = bisect.bisect_left(self._starts, (start, event_id))
+        if i < len(self._starts) and self._starts[i] == (start, event_id):
+            del self._starts[i]
+        for word in tokenize(event.get("summary")) | tokenize(event.get("location")):
+            ids = self._tokens.get(word)
+            if ids is not None:
+                ids.discard(event_id)
+                if not ids:
+                    del self._tokens[word]
+
+    def apply(self, events, sync_token=None, time_zone=None, reset=False):
+        """Apply event resources from a sync (cancelled ones are removed) and store the new token."""
+        with self._lock:
+            changed_zone = time_zone and time_zone != self.time_zone
+            if reset:
+                self.events = {}
+            if changed_zone:
+                self.time_zone = time_zone
+            if reset or changed_zone:
+                self._reindex()
+            for event in events:
+                self._unindex(event["id"])
+                if event.get("status") != "cancelled" and "start" in event and "end" in event:
+                    self.events[event["id"]] = event
+                    self._index(event)
+            if sync_token:
+                self.sync_token = sync_token
+            self._save()
+
+    def remove(self, event_id):
+        with self._lock:
+            self._unindex(event_id)
+            self._save()
+
+    def between(self, start, end=None, query=None, limit=10):
+        """Events overlapping [start, end) in start order, optionally only those whose summary or
+        location contains every word of `query` (falling back to a substring match)."""
+        with self._lock:
+            ids = None
+            if query:
+                words = tokenize(query)
+                postings = [self._tokens.get(word, set()) for word in words]
+                ids = set.intersection(*postings) if postings else set()
+                if not ids:
+                    needle = query.lower()
+                    ids = {i for i, e in self.events.items()
+                           if needle in (e.get("summary") or "").lower() or needle in (e.get("location") or "").lower()}
+            found = []
+            for begin, event_id in self._starts[bisect.bisect_left(self._starts, (start - self._max_span,)):]:
+                if end is not None and begin >= end:
+                    break
+                if self._spans[event_id][1] <= start or (ids is not None and event_id not in ids):
+                    continue
+                found.append(self.events[event_id])
+                if len(found) >= limit:
+                    break
+            return found
 
 
 class GoogleCalendar:
-    def __init__(self, credentials):
+    def __init__(self, credentials, store_path: str = DEFAULT_STORE_PATH):
         try:
             self.service = build("calendar", "v3", credentials=credentials)
             
         except:
             self.service= None
             pass # "Unable to make connection with gmail")
+        self.mirror = CalendarMirror(store_path)
+        self._sync_lock = threading.Lock()
+        self._synced = 0.0
+
+    def sync(self, force=False):
+        """
+        Bring the mirror up to date: a full sync of events from SYNC_PAST_DAYS ago on the first
+        run (or when the server expires the token with 410), then only changes since the stored
+        syncToken. Skipped if the last sync was under SYNC_INTERVAL seconds ago.
+        """
+        if not self.service:
+            return
+        with self._sync_lock:
+            if not force and time.time() - self._synced < SYNC_INTERVAL:
+                return
+            token = self.mirror.sync_token
+            try:
+                self._sync(token)
+            except HttpError as e:
+                if token is None or e.resp.status != 410:
+                    raise
+                print("[GoogleCalendar] Sync token expired, running a full sync", file=sys.stderr)
+                self._sync(None)
+            self._synced = time.time()
+
+    def _sync(self, token):
+        params = {"calendarId": "primary", "singleEvents": True, "showDeleted": True, "maxResults": SYNC_PAGE_SIZE}
+        if token:
+            params["syncToken"] = token
+        else:
+            since = datetime.datetime.now(datetime.UTC) - datetime.timedelta(days=SYNC_PAST_DAYS)
+            params["timeMin"] = since.isoformat()
+        events, page_token = [], None
+        while True:
+            results = self.service.events().list(pageToken=page_token, **params).execute()
+            events.extend(results.get("items", []))
+            page_token = results.get("nextPageToken")
+            if not page_token:
+                break
+        self.mirror.apply(events, results.get("nextSyncToken"), results.get("timeZone"), reset=token is None)
+
+    def _window(self, days_ahead=None):
+        now = time.time()
+        return now, (now + days_ahead * 86400 if days_ahead is not None else None)
 
     def upcoming_events(self, max_results=10):
-        now = datetime.datetime.now(datetime.UTC).isoformat()
-        results = self.service.events().list(
-            calendarId="primary",
-            timeMin=now,
-            maxResults=max_results,
-            singleEvents=True,
-            orderBy="startTime"
-        ).execute()
-        events = results.get("items", [])
+        self.sync()
+        now, _ = self._window()
 
         formatted = []
-        for event in events:
+        for event in self.mirror.between(now, limit=max_results):
             start = event["start"].get("dateTime", event["start"].get("date"))
             formatted.append({
                 "start": start,
@@ -63,20 +357,10 @@ class GoogleCalendar:
         return formatted
     
     def search_events(self, query, max_results=10, days_ahead=30):
-        now = datetime.datetime.now(datetime.UTC).isoformat()
-        future = (datetime.datetime.now(datetime.UTC) + datetime.timedelta(days=days_ahead)).isoformat()
-
-        results = self.service.events().list(
-            calendarId="primary",
-            q=query,
-            timeMin=now,
-            timeMax=future,
-            maxResults=max_results,
-            singleEvents=True,
-            orderBy="startTime"
-        ).execute()
-
-        events = results.get("items", [])
+        self.sync()
+        now, future = self._window(days_ahead)
+
+        events = self.mirror.between(now, future, query=query, limit=max_results)
         return [
             {
                 "id": e["id"],
@@ -86,7 +370,10 @@ class GoogleCalendar:
             }
             for e in events
         ]
-    
+
+    def find_event_by_summary(self, summary, days_ahead=30):
+        """Upcoming events within `days_ahead` days whose summary or location matches `summary`."""
+        return self.search_events(summary, days_ahead=days_ahead)
 
     def create_event(self, summary, start_time, end_time, timezone="UTC"):
         event = {
@@ -94,12 +381,18 @@ class GoogleCalendar:
             "start": {"dateTime": start_time, "timeZone": timezone},
             "end": {"dateTime": end_time, "timeZone": timezone},
         }
-        return self.service.events().insert(calendarId="primary", body=event).execute()
+        created = self.service.events().insert(calendarId="primary", body=event).execute()
+        # Visible to lookups right away; the next sync brings the same version again
+        self.mirror.apply([created])
+        return created
 
 
 
     def delete_event(self, summary, days_ahead=30):
+        """Delete the first upcoming event matching `summary`; returns it, or None if none matched."""
         events = self.find_event_by_summary(summary, days_ahead)
         if not events:
             return None
-        return self.delete_event(events[0]["id"])
+        self.service.events().delete(calendarId="primary", eventId=events[0]["id"]).execute()
+        self.mirror.remove(events[0]["id"])
+        return events[0]
@@ -7,10 +7,18 @@ import sys
 from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 from googleapiclient.http import MediaIoBaseDownload
-from langchain.schema import Document
-from RAG import RAG
+from RAG import forget, index_stream, is_indexed, persist, retrieve
+import hashlib
 import io
+import json
+import multiprocessing
 import os
+import tempfile
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from itertools import chain, islice
 
 
 import docx
@@ -28,75 +36,445 @@ def clean_text(text):
     return text.strip()
 
 
+SUPPORTED_EXTENSIONS = (".pdf", ".docx", ".txt")
+TXT_BLOCK_SIZE = 64 * 1024
+LIST_PAGE_SIZE = 100
+SCAN_FACTOR = 3
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_CACHE_PATH = os.path.join(ROOT, "drive_cache")
+CACHE_MAX_BYTES = int(os.environ.get("DRIVE_CACHE_MAX_MB", "500")) * 1024 * 1024
+DEFAULT_TEXT_CACHE_PATH = os.path.join(ROOT, "drive_text_cache")
+TEXT_CACHE_MAX_BYTES = int(os.environ.get("DRIVE_TEXT_CACHE_MAX_MB", "200")) * 1024 * 1024
+DEFAULT_INDEX_STATE_PATH = os.path.join(ROOT, "drive_index.json")
+# Most recently modified files indexed on the first sync; later changes are indexed as they come
+INDEX_MAX_FILES = int(os.environ.get("DRIVE_INDEX_MAX_FILES", "300"))
+SYNC_INTERVAL = int(os.environ.get("DRIVE_SYNC_INTERVAL", "300"))
+# Downloads are streamed in chunks of this size (MediaIoBaseDownload defaults to 100 MB)
+DOWNLOAD_CHUNK_BYTES = int(os.environ.get("DRIVE_DOWNLOAD_CHUNK_KB", "1024")) * 1024
+# Files above this size are skipped before any bytes are transferred, except formats that can be
+# read from a prefix, which are downloaded up to the cap
+MAX_FILE_BYTES = int(os.environ.get("DRIVE_MAX_FILE_MB", "20")) * 1024 * 1024
+TRUNCATABLE_EXTENSIONS = (".txt",)
+# Extraction stops once this much text has been read from one file
+MAX_TEXT_CHARS = int(os.environ.get("DRIVE_MAX_TEXT_CHARS", "2000000"))
+DOWNLOAD_WORKERS = int(os.environ.get("DRIVE_DOWNLOAD_WORKERS", "4"))
+EXTRACT_WORKERS = int(os.environ.get("DRIVE_EXTRACT_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+# Google Workspace files are exported; other files are downloaded as they are
+EXPORT_FORMATS = {
+    "application/vnd.google-apps.document": ("application/pdf", ".pdf"),
+    "application/vnd.google-apps.spreadsheet": ("application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", ".xlsx"),
+    "application/vnd.google-apps.presentation": ("application/vnd.openxmlformats-officedocument.presentationml.presentation", ".pptx"),
+}
+DOWNLOAD_EXTENSIONS = {
+    "application/pdf": ".pdf",
+    "application/vnd.openxmlformats-officedocument.wordprocessingml.document": ".docx",
+    "text/plain": ".txt",
+}
+# Files whose text can be extracted, i.e. the ones kept in the corpus index
+INDEXABLE_MIME_TYPES = ["application/vnd.google-apps.document", *DOWNLOAD_EXTENSIONS]
+INDEXABLE_QUERY = "(" + " or ".join(f"mimeType = '{m}'" for m in INDEXABLE_MIME_TYPES) + ") and trashed = false"
+LIST_FIELDS = "nextPageToken, files(id, name, mimeType, modifiedTime, size, owners)"
+CHANGE_FIELDS = ("nextPageToken, newStartPageToken, "
+                 "changes(fileId, removed, file(id, name, mimeType, modifiedTime, size, trashed))")
+
+
+class FileTooLarge(Exception):
+    pass
+
+
+def extract_pages(filepath):
+    """Lazily yield cleaned text one PDF page, DOCX paragraph or ~64 KB block of a TXT file at a time."""
+    if filepath.endswith(".pdf"):
+        with open(filepath, "rb") as f:
+            reader = PyPDF2.PdfReader(f)
+            for page in reader.pages:
+                yield clean_text(page.extract_text() or "")
+    elif filepath.endswith(".docx"):
+        doc = docx.Document(filepath)
+        for para in doc.paragraphs:
+            yield clean_text(para.text)
+    elif filepath.endswith(".txt"):
+        # errors="replace": a file downloaded up to the size cap may end mid-character
+        with open(filepath, "r", encoding="utf-8", errors="replace") as f:
+            lines, size = [], 0
+            for line in f:
+                lines.append(line)
+                size += len(line)
+                if size >= TXT_BLOCK_SIZE:
+                    yield clean_text("".join(lines))
+                    lines, size = [], 0
+            if lines:
+                yield clean_text("".join(lines))
+
+
+def extract_text(filepath, max_chars=MAX_TEXT_CHARS):
+    """Lazily yield the pages of a file, stopping once `max_chars` characters have been read.
+    Pages past the limit are never parsed."""
+    total = 0
+    for page in extract_pages(filepath):
+        yield page
+        total += len(page)
+        if total >= max_chars:
+            return
+
+
+def extract_to_file(filepath, out_path, max_chars=MAX_TEXT_CHARS):
+    """Extract a file's text straight into a text cache file at `out_path`, one page at a time;
+    runs in the extraction process pool. Only the path goes back to the parent, never the text,
+    so memory stays flat for any file size."""
+    with open(out_path, "wb") as fh:
+        write_text(fh, extract_text(filepath, max_chars))
+    return out_path
+
+
+# PDF/DOCX parsing is pure Python and would hold the GIL, stalling the audio loop and the
+# other tool threads, so it runs in worker processes. "fork" keeps workers from re-importing
+# the server's __main__ module (which builds services at import time). Forking a process
+# that already runs threads can copy a lock some thread holds, so mcp_server.py calls
+# start_extract_pool() before any service starts its threads; with fork, all workers are
+# started together on the first submit. Only a pool rebuilt after a worker crash is forked
+# later, and its workers touch nothing but the file they parse and the file they write.
+_extract_pool = None
+_extract_pool_lock = threading.Lock()
+
+
+def get_extract_pool():
+    global _extract_pool
+    with _extract_pool_lock:
+        if _extract_pool is None:
+            _extract_pool = ProcessPoolExecutor(max_workers=EXTRACT_WORKERS,
+                                                mp_context=multiprocessing.get_context("fork"))
+        return _extract_pool
+
+
+def start_extract_pool():
+    """Fork the extraction workers now; call it while the process has no other threads."""
+    get_extract_pool().submit(int).result()
+
+
+def _reset_extract_pool():
+    global _extract_pool
+    with _extract_pool_lock:
+        _extract_pool = None
+
+
+def write_text(fh, pages):
+    """Write extracted pages to a text cache file, one JSON string per line."""
+    for page in pages:
+        fh.write((json.dumps(page) + "\n").encode("utf-8"))
+
+
+def read_text(path):
+    """Lazily yield the pages of a text cache file."""
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            yield json.loads(line)
+
+
+def file_digest(filepath):
+    """sha256 of the file bytes, read in 1 MB blocks."""
+    digest = hashlib.sha256()
+    with open(filepath, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class DownloadCache:
+    """
+    On-disk cache of downloaded Drive files keyed by (file id, modifiedTime, export mime),
+    so an unchanged file is served without touching the network. Files are written to a
+    temporary name and renamed into place; least recently used files are evicted once the
+    total size passes max_bytes.
+    """
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, max_bytes: int = CACHE_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.entries = {}  # key -> {"file": name, "size": bytes, "last_used": time}
+        self._load()
+
+    @property
+    def _index_path(self):
+        return os.path.join(self.path, "index.json")
+
+    @staticmethod
+    def key(file_id, modified_time, export_mime=None) -> str:
+        return hashlib.sha256(f"{file_id}\0{modified_time}\0{export_mime or ''}".encode("utf-8")).hexdigest()
+
+    def _load(self):
+        if not os.path.exists(self._index_path):
+            return
+        try:
+            with open(self._index_path, "r") as f:
+                entries = json.load(f)
+            self.entries = {k: e for k, e in entries.items() if os.path.exists(os.path.join(self.path, e["file"]))}
+        except (json.JSONDecodeError, KeyError, TypeError, OSError) as e:
+            print(f"[DownloadCache] Failed to load index, starting empty: {e}", file=sys.stderr)
+            self.entries = {}
+
+    def _save(self):
+        """Persist the index (called under lock)."""
+        try:
+            tmp = self._index_path + ".tmp"
+            with open(tmp, "w") as f:
+                json.dump(self.entries, f)
+            os.replace(tmp, self._index_path)
+        except (IOError, OSError) as e:
+            print(f"[DownloadCache] Failed to save index: {e}", file=sys.stderr)
+
+    def get(self, key):
+        """Path of the cached file for `key`, or None."""
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            if not os.path.exists(os.path.join(self.path, entry["file"])):
+                del self.entries[key]
+                return None
+            entry["last_used"] = time.time()
+            self._save()
+            return os.path.join(self.path, entry["file"])
+
+    def put(self, key, extension, write):
+        """Cache a file written by write(fileobj) and return its path; nothing is cached if write raises."""
+        tmp = self.temp_path()
+        try:
+            with open(tmp, "wb") as f:
+                write(f)
+        except BaseException:
+            os.remove(tmp)
+            raise
+        return self.adopt(key, extension, tmp)
+
+    def temp_path(self):
+        """A new temporary file in the cache directory, for a file adopt() takes in once written."""
+        os.makedirs(self.path, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.path, suffix=".part")
+        os.close(fd)
+        return tmp
+
+    def adopt(self, key, extension, tmp):
+        """Cache the finished file at `tmp` (from temp_path) under `key` and return its path."""
+        name = key + extension
+        os.replace(tmp, os.path.join(self.path, name))
+        with self._lock:
+            self.entries[key] = {"file": name, "size": os.path.getsize(os.path.join(self.path, name)),
+                                 "last_used": time.time()}
+            self._evict(keep=key)
+            self._save()
+        return os.path.join(self.path, name)
+
+    def _evict(self, keep):
+        """Drop least recently used files until the cache fits in max_bytes (called under lock)."""
+        total = sum(e["size"] for e in self.entries.values())
+        for key in sorted(self.entries, key=lambda k: self.entries[k]["last_used"]):
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            entry = self.entries.pop(key)
+            total -= entry["size"]
+            try:
+                os.remove(os.path.join(self.path, entry["file"]))
+            except OSError:
+                pass
+
+
+class DriveIndex:
+    """
+    State of the local Drive corpus index: the changes.list page token it is synced up to,
+    and the version (GoogleDrive.version) each file in the corpus was indexed at.
+    The corpus is ready for retrieval once the first backfill has stored a page token.
+    """
+
+    def __init__(self, path: str = DEFAULT_INDEX_STATE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self.page_token = None
+        self.files = {}  # file id -> {"name": ..., "version": ...}
+        self._load()
+
+    @property
+    def ready(self) -> bool:
+        return self.page_token is not None
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r") as f:
+                state = json.load(f)
+            self.page_token = state.get("page_token")
+            self.files = state.get("files", {})
+        except (json.JSONDecodeError, OSError, AttributeError) as e:
+            print(f"[DriveIndex] Failed to load state, starting empty: {e}", file=sys.stderr)
+
+    def _save(self):
+        """Persist the state (called under lock)."""
+        try:
+            tmp = self.path + ".tmp"
+            with open(tmp, "w") as f:
+                json.dump({"page_token": self.page_token, "files": self.files}, f)
+            os.replace(tmp, self.path)
+        except (IOError, OSError) as e:
+            print(f"[DriveIndex] Failed to save state: {e}", file=sys.stderr)
+
+    def file_ids(self):
+        with self._lock:
+            return list(self.files)
+
+    def entries(self):
+        """Snapshot of file id -> {"name": ..., "version": ...}."""
+        with self._lock:
+            return dict(self.files)
+
+    def put(self, file, version):
+        with self._lock:
+            if self.files.get(file["id"], {}).get("version") != version:
+                self.files[file["id"]] = {"name": file.get("name"), "version": version}
+                self._save()
+
+    def remove(self, file_id) -> bool:
+        with self._lock:
+            if self.files.pop(file_id, None) is None:
+                return False
+            self._save()
+            return True
+
+    def set_page_token(self, token):
+        with self._lock:
+            self.page_token = token
+            self._save()
+
+
 class GoogleDrive:
-    def __init__(self, credentials):
+    def __init__(self, credentials, cache: DownloadCache = None, download_workers: int = DOWNLOAD_WORKERS,
+                 text_cache: DownloadCache = None, index: DriveIndex = None):
+        self.credentials = credentials
         try:
             self.service = build("drive", "v3", credentials=credentials)
         except:
             self.service = None
             pass # "Unable to make connection with Drive")
+        self.cache = cache or DownloadCache()
+        # Extracted text, keyed like the download cache, so re-indexing never re-parses a file
+        self.text_cache = text_cache or DownloadCache(DEFAULT_TEXT_CACHE_PATH, TEXT_CACHE_MAX_BYTES)
+        self.index = index or DriveIndex()
+        self.download_workers = download_workers
+        self.chunk_bytes = DOWNLOAD_CHUNK_BYTES
+        self.max_file_bytes = MAX_FILE_BYTES
+        self._local = threading.local()
+        self._sync_thread = None
+        self._stop_sync = threading.Event()
 
-    def search_files(self, keywords=None, max_results=10):
-        if not self.service:
-            return []
+    def _thread_service(self):
+        """A Drive client for the calling download thread (httplib2 connections are not thread-safe)."""
+        service = getattr(self._local, "service", None)
+        if service is None:
+            service = self._local.service = build("drive", "v3", credentials=self.credentials)
+        return service
 
-        if not keywords:
-            return []
+    def iter_files(self, keywords=None, page_size=LIST_PAGE_SIZE):
+        """Yield files matching any of `keywords`, requesting the next files.list page only when it is reached."""
+        if not self.service or not keywords:
+            return
 
-        # Build the Drive query with AND conditions
+        # Build the Drive query with OR conditions
         query_parts = [f"fullText contains '{kw}'" for kw in keywords]
         query = " or ".join(query_parts)
         # Exclude folders
         query = f"({query}) and mimeType != 'application/vnd.google-apps.folder'"
 
-        results = self.service.files().list(
-            q=query,
-            pageSize=max_results,
-            fields="files(id, name, mimeType, modifiedTime, owners)"
-        ).execute()
-    
-        return results.get("files", [])
+        yield from self._list(query, page_size)
+
+    def _list(self, query, page_size=LIST_PAGE_SIZE, service=None, order_by=None):
+        service = service or self.service
+        page_token = None
+        while True:
+            results = service.files().list(
+                q=query,
+                pageSize=page_size,
+                pageToken=page_token,
+                orderBy=order_by,
+                fields=LIST_FIELDS
+            ).execute()
+            yield from results.get("files", [])
+            page_token = results.get("nextPageToken")
+            if not page_token:
+                return
+
+    def search_files(self, keywords=None, max_results=10):
+        return list(islice(self.iter_files(keywords, page_size=min(max_results, LIST_PAGE_SIZE)), max_results))
+
+    @staticmethod
+    def extension(mime_type) -> str:
+        """Local file extension a file of `mime_type` is downloaded or exported as."""
+        return EXPORT_FORMATS.get(mime_type, (None, None))[1] or DOWNLOAD_EXTENSIONS.get(mime_type, "")
+
+    def _skip_reason(self, file):
+        """Why a listed file should not be downloaded for text search, or None. Decided from the
+        listing alone, so nothing is transferred for skipped files."""
+        extension = self.extension(file["mimeType"])
+        if not extension.endswith(SUPPORTED_EXTENSIONS):
+            return f"no text extraction for {file['mimeType']}"
+        size = int(file.get("size") or 0)
+        if size > self.max_file_bytes and extension not in TRUNCATABLE_EXTENSIONS:
+            return f"{size} bytes is over the {self.max_file_bytes} byte cap"
+        return None
+
+    def _media_request(self, file_id, mime_type, service=None):
+        """(request, extension, export mime) for downloading a file, or None if it cannot be exported."""
+        service = service or self.service
+        if mime_type.startswith("application/vnd.google-apps"):
+            if mime_type not in EXPORT_FORMATS:
+                pass # f"Export not supported for mime type {mime_type}")
+                return None
+            export_mime, extension = EXPORT_FORMATS[mime_type]
+            return service.files().export_media(fileId=file_id, mimeType=export_mime), extension, export_mime
+        # guess extension if possible
+        extension = DOWNLOAD_EXTENSIONS.get(mime_type, "")
+        return service.files().get_media(fileId=file_id), extension, None
+
+    def _write_media(self, request, fh, truncate=False):
+        """
+        Stream a download into `fh` in DOWNLOAD_CHUNK_BYTES chunks. Past max_file_bytes the
+        download stops: it is cut at the cap if `truncate`, else FileTooLarge is raised.
+        """
+        downloader = MediaIoBaseDownload(fh, request, chunksize=self.chunk_bytes)
+        done = False
+        while not done:
+            status, done = downloader.next_chunk()
+            if not done and fh.tell() >= self.max_file_bytes:
+                if not truncate:
+                    raise FileTooLarge(f"download reached the {self.max_file_bytes} byte cap")
+                fh.truncate(self.max_file_bytes)
+                return
 
     def download_file(self, file_id, filepath="Temporary/downloaded_file"):
         try:
             os.makedirs(os.path.dirname(filepath), exist_ok=True)
 
-            file = self.service.files().get(fileId=file_id).execute()
-            mime_type = file.get("mimeType")
-
-            if mime_type.startswith("application/vnd.google-apps"):
-                export_mime = None
-                if mime_type == "application/vnd.google-apps.document":
-                    export_mime = "application/pdf"
-                    filepath += ".pdf"
-                elif mime_type == "application/vnd.google-apps.spreadsheet":
-                    export_mime = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-                    filepath += ".xlsx"
-                elif mime_type == "application/vnd.google-apps.presentation":
-                    export_mime = "application/vnd.openxmlformats-officedocument.presentationml.presentation"
-                    filepath += ".pptx"
-
-                if not export_mime:
-                    pass # f"Export not supported for mime type {mime_type}")
-                    return None
-
-                request = self.service.files().export_media(fileId=file_id, mimeType=export_mime)
-            else:
-                # guess extension if possible
-                if mime_type == "application/pdf":
-                    filepath += ".pdf"
-                elif mime_type == "application/vnd.openxmlformats-officedocument.wordprocessingml.document":
-                    filepath += ".docx"
-                elif mime_type == "text/plain":
-                    filepath += ".txt"
-                request = self.service.files().get_media(fileId=file_id)
-
-            fh = io.FileIO(filepath, "wb")
-            downloader = MediaIoBaseDownload(fh, request)
-
-            done = False
-            while not done:
-                status, done = downloader.next_chunk()
+            file = self.service.files().get(fileId=file_id, fields="id, name, mimeType, size").execute()
+            size = int(file.get("size") or 0)
+            truncate = self.extension(file["mimeType"]) in TRUNCATABLE_EXTENSIONS
+            if size > self.max_file_bytes and not truncate:
+                return None
+            media = self._media_request(file_id, file.get("mimeType"))
+            if media is None:
+                return None
+            request, extension, _ = media
+            filepath += extension
+
+            try:
+                with io.FileIO(filepath, "wb") as fh:
+                    self._write_media(request, fh, truncate)
+            except FileTooLarge:
+                os.remove(filepath)
+                return None
 
             return filepath
 
@@ -104,46 +482,281 @@ class GoogleDrive:
             pass # f"An error occurred: {error}")
             return None
 
-    def rag_on_file(self, filepaths, query):
-        """Download a file, extract text, and run RAG on it."""
+    @staticmethod
+    def version(file) -> str:
+        """Cache key and index digest of a files.list entry: changes whenever the file is modified."""
+        export_mime = EXPORT_FORMATS.get(file["mimeType"], (None, None))[0]
+        return DownloadCache.key(file["id"], file.get("modifiedTime"), export_mime)
+
+    def fetch_file(self, file, service=None):
+        """
+        Local path of a files.list entry (needs id, mimeType and modifiedTime), served from
+        the download cache while the file's modifiedTime is unchanged, else downloaded into it.
+        Formats without text extraction and files over the size cap give None, with no download.
+        Pass `service` when calling from a thread other than the one that owns self.service.
+        """
+        try:
+            key = self.version(file)
+            cached = self.cache.get(key)
+            if cached:
+                return cached
+
+            reason = self._skip_reason(file)
+            if reason:
+                print(f"[GoogleDrive] Skipping {file.get('name')}: {reason}", file=sys.stderr)
+                return None
+            media = self._media_request(file["id"], file["mimeType"], service)
+            if media is None:
+                return None
+            request, extension, _ = media
+            truncate = extension in TRUNCATABLE_EXTENSIONS
+            return self.cache.put(key, extension, lambda fh: self._write_media(request, fh, truncate))
+
+        except FileTooLarge as error:
+            print(f"[GoogleDrive] Skipping {file.get('name')}: {error}", file=sys.stderr)
+            return None
+
+        except HttpError as error:
+            pass # f"An error occurred: {error}")
+            return None
+
+    def _fetch_many(self, files, max_results):
+        """
+        Download up to `max_results` files from the iterator `files` concurrently, in a pool of
+        download_workers threads. A failed download is replaced by the next file from the
+        iterator. Returns (file, path) pairs in listing order and whether any file was listed.
+        """
+        ready, listed = [], 0
+        with ThreadPoolExecutor(max_workers=self.download_workers) as pool:
+            pending = {}
+
+            def submit_next():
+                nonlocal listed
+                file = next(files, None)
+                if file is not None:
+                    pending[pool.submit(lambda: self.fetch_file(file, self._thread_service()))] = (listed, file)
+                    listed += 1
+
+            for _ in range(max_results):
+                submit_next()
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    position, file = pending.pop(future)
+                    path = future.result()
+                    if path:
+                        ready.append((position, file, path))
+                    else:
+                        submit_next()
+        ready.sort(key=lambda r: r[0])
+        return [(file, path) for _, file, path in ready], listed > 0
+
+    def _index(self, doc_ids, digests, filepaths, names, pinned=None):
+        """
+        Index documents whose digest changed. Text comes from the text cache when this digest
+        was extracted before, else from the file: worker processes extract it straight into
+        the text cache while earlier documents are being indexed, and indexing streams it back
+        from there. A document with neither is skipped. `pinned` (parallel to `doc_ids`) marks
+        corpus documents, which the vector store never evicts. A file whose extraction fails
+        (e.g. a corrupt PDF) is logged and skipped; returns the doc_ids of such files.
+        """
+        stale = [n for n in range(len(doc_ids)) if not is_indexed(doc_ids[n], digests[n])]
+        cached = {n: self.text_cache.get(digests[n]) for n in stale}
+        to_extract = [n for n in stale if not cached[n] and filepaths[n]]
+
+        extracted = {}  # n -> (future, temporary text cache path)
+        failed = []
+        try:
+            if to_extract:
+                try:
+                    pool = get_extract_pool()
+                    for n in to_extract:
+                        tmp = self.text_cache.temp_path()
+                        try:
+                            extracted[n] = (pool.submit(extract_to_file, filepaths[n], tmp), tmp)
+                        except BaseException:
+                            os.remove(tmp)
+                            raise
+                except (BrokenProcessPool, OSError) as e:
+                    print(f"[GoogleDrive] Extraction pool unavailable, extracting in-process: {e}", file=sys.stderr)
+                    _reset_extract_pool()
+
+            for n in stale:
+                path = cached[n]
+                if not path and filepaths[n]:
+                    try:
+                        if n in extracted:
+                            future, tmp = extracted.pop(n)
+                            try:
+                                path = self.text_cache.adopt(digests[n], ".jsonl", future.result())
+                            except BaseException as e:
+                                if os.path.exists(tmp):
+                                    os.remove(tmp)
+                                if not isinstance(e, BrokenProcessPool):
+                                    raise
+                                print(f"[GoogleDrive] Extraction worker died, extracting in-process: {e}", file=sys.stderr)
+                                _reset_extract_pool()
+                        if not path:
+                            path = self.text_cache.put(digests[n], ".jsonl",
+                                                       lambda fh: write_text(fh, extract_text(filepaths[n])))
+                    except Exception as e:
+                        print(f"[GoogleDrive] Skipping {names[n]}: text extraction failed: {e}", file=sys.stderr)
+                        failed.append(doc_ids[n])
+                        continue
+                if path:
+                    index_stream(doc_ids[n], digests[n], read_text(path), metadata={"file": names[n]},
+                                 pinned=bool(pinned and pinned[n]))
+        finally:
+            # Extractions never adopted (an earlier document failed): wait for them, drop their output
+            for future, tmp in extracted.values():
+                try:
+                    future.result()
+                except Exception:
+                    pass
+                if os.path.exists(tmp):
+                    os.remove(tmp)
+        return failed
+
+    def rag_on_file(self, filepaths, query, file_ids=None, hybrid=False, versions=None):
+        """Download a file, extract text, and run RAG on it.
+        `file_ids` (parallel to `filepaths`) key the persistent index by Drive file ID.
+        hybrid=True adds BM25 keyword matching to the semantic retrieval.
+        `versions` (parallel to `filepaths`, see version()) identify the content; by default
+        it is hashed from the file bytes. Files whose version is already indexed are not
+        re-extracted at all, and previously extracted versions come from the text cache."""
         pass # "Fecting resources from Drive")
-        docs=[]
-        text=""
         for filepath in filepaths:
-            if filepath.endswith(".pdf"):
-                with open(filepath, "rb") as f:
-                    reader = PyPDF2.PdfReader(f)
-                    for page in reader.pages:
-                        text += clean_text(page.extract_text()) or ""
-            elif filepath.endswith(".docx"):
-                doc = docx.Document(filepath)
-                for para in doc.paragraphs:
-                    text += clean_text(para.text) + "\n"
-            elif filepath.endswith(".txt"):
-                with open(filepath, "r", encoding="utf-8") as f:
-                    text = clean_text(f.read())
-            else:
+            if not filepath.endswith(SUPPORTED_EXTENSIONS):
                 return f"Text extraction not supported for {filepath}"
-            docs.append(Document(page_content=text, metadata={"file": filepath}))
-
-        return RAG(docs, query)
-
-    def get_results(self, query, keywords, max_results=5):
-        files = self.search_files(keywords, max_results)
-        if not files:
-            return "No files found."
-        
-        filepaths=[]
-        for i,file in enumerate(files):
-            pass # f"Found file: {file['name']} (ID: {file['id']})")
-            path=self.download_file(file['id'], f"Temporary/downloaded_file{i}")
-            if path:
-                filepaths.append(path)
-        
-        if not filepaths:
+
+        doc_ids = [file_ids[n] if file_ids else filepath for n, filepath in enumerate(filepaths)]
+        digests = versions or [file_digest(filepath) for filepath in filepaths]
+        self._index(doc_ids, digests, filepaths, filepaths)
+
+        return retrieve(query, doc_ids, hybrid=hybrid)
+
+    def index_file(self, file, service=None) -> bool:
+        """Bring one files.list entry up to date in the corpus index, downloading it only if its
+        current version is neither indexed nor in the text cache."""
+        version = self.version(file)
+        path = None
+        if not is_indexed(file["id"], version) and not self.text_cache.get(version):
+            path = self.fetch_file(file, service)
+            if path is None or not path.endswith(SUPPORTED_EXTENSIONS):
+                return False
+        if self._index([file["id"]], [version], [path], [file["name"]], pinned=[True]):
+            return False
+        self.index.put(file, version)
+        return True
+
+    def _repair(self, service):
+        """Re-index corpus files that are no longer in the vector store at their recorded version,
+        from the text cache if it still has that version, else by fetching the file again."""
+        for file_id, entry in self.index.entries().items():
+            if is_indexed(file_id, entry["version"]):
+                continue
+            if self.text_cache.get(entry["version"]):
+                self._index([file_id], [entry["version"]], [None], [entry["name"]], pinned=[True])
+                continue
+            try:
+                file = service.files().get(fileId=file_id, fields="id, name, mimeType, modifiedTime, size").execute()
+            except HttpError as e:
+                print(f"[GoogleDrive] Could not re-index {entry['name']}: {e}", file=sys.stderr)
+                continue
+            self.index_file(file, service)
+
+    def sync(self):
+        """
+        One pass of the corpus index sync. The first pass indexes the INDEX_MAX_FILES most
+        recently modified text files; later passes apply changes.list since the saved token,
+        re-indexing modified files and dropping deleted, trashed or non-text ones, then
+        re-index any corpus file missing from the vector store.
+        """
+        service = self._thread_service()
+        try:
+            self._sync(service)
+        finally:
+            # The vector store batches its writes; persist this pass's updates in one go
+            persist()
+
+    def _sync(self, service):
+        if not self.index.ready:
+            token = service.changes().getStartPageToken().execute()["startPageToken"]
+            files = self._list(INDEXABLE_QUERY, LIST_PAGE_SIZE, service, order_by="modifiedTime desc")
+            for file in islice(files, INDEX_MAX_FILES):
+                self.index_file(file, service)
+            self.index.set_page_token(token)
+            return
+
+        page_token = self.index.page_token
+        while page_token:
+            results = service.changes().list(pageToken=page_token, pageSize=LIST_PAGE_SIZE, spaces="drive",
+                                             fields=CHANGE_FIELDS).execute()
+            for change in results.get("changes", []):
+                file = change.get("file")
+                if change.get("removed") or not file or file.get("trashed") \
+                        or file.get("mimeType") not in INDEXABLE_MIME_TYPES:
+                    if change.get("fileId") and self.index.remove(change["fileId"]):
+                        forget([change["fileId"]])
+                else:
+                    self.index_file(file, service)
+            page_token = results.get("nextPageToken")
+            self.index.set_page_token(results.get("newStartPageToken") or page_token or self.index.page_token)
+        self._repair(service)
+
+    def start_sync(self, interval: int = SYNC_INTERVAL):
+        """Keep the corpus index current from a background thread, syncing every `interval` seconds."""
+        if not self.service or self._sync_thread is not None:
+            return
+        self._sync_thread = threading.Thread(target=self._sync_loop, args=(interval,), daemon=True)
+        self._sync_thread.start()
+
+    def stop_sync(self):
+        self._stop_sync.set()
+
+    def _sync_loop(self, interval):
+        while not self._stop_sync.is_set():
+            try:
+                self.sync()
+            except Exception as e:
+                print(f"[GoogleDrive] Index sync failed: {e}", file=sys.stderr)
+            self._stop_sync.wait(interval)
+
+    def get_results(self, query, keywords, max_results=5, hybrid=False):
+        # The listing is cheap; only the matches the local index lacks are downloaded
+        listing = islice(self.iter_files(keywords, page_size=min(max_results, LIST_PAGE_SIZE)),
+                         SCAN_FACTOR * max_results)
+        head = list(islice(listing, max_results))
+        if not head:
+            # Nothing listed (e.g. offline): the synced corpus may still answer
+            context = retrieve(query, self.index.file_ids(), hybrid=hybrid) if self.index.ready else ""
+            return context or "No files found."
+
+        def indexed(file):
+            return is_indexed(file["id"], self.version(file))
+
+        covered = [file for file in head if indexed(file)]
+        missing = [file for file in head if not indexed(file)]
+        fetched = []
+        if missing:
+            # Files that fail to download are replaced by the next unindexed matches
+            # (up to SCAN_FACTOR * max_results listed in all)
+            candidates = chain(missing, (file for file in listing if not indexed(file)))
+            fetched, _ = self._fetch_many(candidates, len(missing))
+            fetched = [(file, path) for file, path in fetched if path.endswith(SUPPORTED_EXTENSIONS)]
+        if not covered and not fetched:
             return "Failed to download any relevant files for searching."
-        
-        context = self.rag_on_file(filepaths, query)
 
-        return context
-        
\ No newline at end of file
+        if fetched:
+            pinned = [file["mimeType"] in INDEXABLE_MIME_TYPES for file, _ in fetched]
+            failed = self._index([file["id"] for file, _ in fetched], [self.version(file) for file, _ in fetched],
+                                 [path for _, path in fetched], [file["name"] for file, _ in fetched], pinned=pinned)
+            for (file, _), corpus in zip(fetched, pinned):
+                if corpus and file["id"] not in failed:
+                    self.index.put(file, self.version(file))
+            fetched = [(file, path) for file, path in fetched if file["id"] not in failed]
+            if not covered and not fetched:
+                return "Failed to extract text from any relevant files for searching."
+
+        file_ids = [file["id"] for file in covered] + [file["id"] for file, _ in fetched]
+        return retrieve(query, file_ids, hybrid=hybrid)
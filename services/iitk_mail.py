@@ -11,26 +11,377 @@ from email.mime.multipart import MIMEMultipart
 import imaplib
 import email
 import email.header
+import email.utils
+import re
+import select
+import sqlite3
+import ssl
+import threading
+import time
+from contextlib import contextmanager
 from datetime import datetime, timedelta
+from services.outbox import PermanentFailure
+
+POOL_SIZE = int(os.environ.get("IITK_IMAP_POOL_SIZE", "2"))
+# Servers may drop connections idle for more than ~30 minutes (RFC 3501); NOOP well before that
+KEEPALIVE_SECONDS = float(os.environ.get("IITK_IMAP_KEEPALIVE", "240"))
+# Errors after which a connection is discarded instead of returned to the pool
+CONNECTION_ERRORS = (imaplib.IMAP4.abort, ssl.SSLError, OSError, EOFError)
+# IMAPWatcher: re-issue IDLE before the server's 29-minute limit; NOOP interval without IDLE
+IDLE_SECONDS = 25 * 60
+POLL_SECONDS = float(os.environ.get("IITK_IMAP_POLL", "60"))
+
+# _format_email shows 500 characters of body, so only the start of the message text is fetched;
+# BODY.PEEK leaves \Seen untouched, and attachments after the first few KB are never downloaded
+PARTIAL_BODY_BYTES = 4096
+FETCH_ITEMS = (f"(UID BODY.PEEK[HEADER.FIELDS (FROM SUBJECT DATE CONTENT-TYPE CONTENT-TRANSFER-ENCODING)]"
+               f" BODY.PEEK[TEXT]<0.{PARTIAL_BODY_BYTES}>)")
+HEADER_ITEMS = "(UID BODY.PEEK[HEADER.FIELDS (FROM SUBJECT DATE)])"
+
+# Local mirror: the last SYNC_DAYS of the inbox with up to STORE_BODY_BYTES of each message's text
+DEFAULT_STORE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "iitk_mail.db")
+SYNC_DAYS = int(os.environ.get("IITK_MAIL_SYNC_DAYS", "30"))
+SYNC_BATCH = 100
+# Searches within this many seconds of the last sync use the store as is
+SYNC_INTERVAL = float(os.environ.get("IITK_MAIL_SYNC_INTERVAL", "60"))
+STORE_BODY_BYTES = 16384
+STORE_ITEMS = (f"(UID BODY.PEEK[HEADER.FIELDS (FROM SUBJECT DATE CONTENT-TYPE CONTENT-TRANSFER-ENCODING)]"
+               f" BODY.PEEK[TEXT]<0.{STORE_BODY_BYTES}>)")
+FETCH_START_RE = re.compile(rb"^\d+ \(")
+UID_RE = re.compile(rb"UID (\d+)")
+
+
+class IMAPPool:
+    """
+    Thread-safe pool of logged-in IMAP connections with INBOX already selected.
+    At most `size` connections exist at once; callers block until one is free.
+    Idle connections are kept alive with NOOP by a daemon thread, checked with NOOP
+    before reuse if they have been idle a while, and replaced when they fail.
+    A pool of size 0 (for a client that only opens its own connections) starts no thread.
+    """
+
+    def __init__(self, connect, size: int = POOL_SIZE, keepalive: float = KEEPALIVE_SECONDS):
+        self._connect = connect
+        self.keepalive = keepalive
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+        self._idle = []  # (connection, last used monotonic time)
+        self._closed = False
+        self.opened = 0
+        if keepalive > 0 and size > 0:
+            threading.Thread(target=self._keepalive_loop, daemon=True).start()
+
+    @staticmethod
+    def _discard(mail):
+        try:
+            mail.logout()
+        except Exception:
+            pass
+
+    @staticmethod
+    def _healthy(mail):
+        try:
+            return mail.noop()[0] == "OK"
+        except CONNECTION_ERRORS + (imaplib.IMAP4.error,):
+            return False
+
+    def _checkout(self):
+        """A live connection: an idle one (NOOP-checked if stale) or a new one."""
+        while True:
+            with self._lock:
+                if not self._idle:
+                    break
+                mail, last_used = self._idle.pop()
+            if time.monotonic() - last_used < self.keepalive / 2 or self._healthy(mail):
+                return mail
+            self._discard(mail)
+        mail = self._connect()
+        self.opened += 1
+        return mail
+
+    def _checkin(self, mail):
+        with self._lock:
+            if not self._closed:
+                self._idle.append((mail, time.monotonic()))
+                return
+        self._discard(mail)
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection; it goes back to the pool unless the block raised. After any error
+        (a dropped socket, or an IMAP/parse error that may leave a response half read) it is logged out."""
+        with self._slots:
+            mail = self._checkout()
+            ok = False
+            try:
+                yield mail
+                ok = True
+            finally:
+                if ok:
+                    self._checkin(mail)
+                else:
+                    self._discard(mail)
+
+    def run(self, fn):
+        """Call fn(connection), retrying once on a fresh connection if the pooled one had died."""
+        try:
+            with self.connection() as mail:
+                return fn(mail)
+        except CONNECTION_ERRORS:
+            with self.connection() as mail:
+                return fn(mail)
+
+    def _keepalive_loop(self):
+        while not self._closed:
+            time.sleep(self.keepalive / 2)
+            now = time.monotonic()
+            with self._lock:
+                due = [entry for entry in self._idle if now - entry[1] >= self.keepalive / 2]
+                self._idle = [entry for entry in self._idle if now - entry[1] < self.keepalive / 2]
+            for mail, _ in due:
+                if self._healthy(mail):
+                    self._checkin(mail)
+                else:
+                    self._discard(mail)
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for mail, _ in idle:
+            self._discard(mail)
+
+
+class IITKMailStore:
+    """
+    SQLite mirror of recent inbox messages (decoded headers and text body) keyed by IMAP UID,
+    with an FTS5 index over sender, subject and body. UIDs are only meaningful for one
+    UIDVALIDITY, which is kept in the meta table; reset() clears everything when it changes.
+    """
+
+    def __init__(self, path: str = DEFAULT_STORE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self.conn:
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS messages (uid INTEGER PRIMARY KEY, sender TEXT, subject TEXT,"
+                " date TEXT, received REAL, body TEXT)"
+            )
+            self.conn.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(sender, subject, body,"
+                " content='messages', content_rowid='uid')"
+            )
+            self.conn.execute(
+                "CREATE TRIGGER IF NOT EXISTS messages_ai AFTER INSERT ON messages BEGIN"
+                " INSERT INTO messages_fts(rowid, sender, subject, body) VALUES (new.uid, new.sender, new.subject, new.body);"
+                " END"
+            )
+            self.conn.execute(
+                "CREATE TRIGGER IF NOT EXISTS messages_ad AFTER DELETE ON messages BEGIN"
+                " INSERT INTO messages_fts(messages_fts, rowid, sender, subject, body)"
+                " VALUES ('delete', old.uid, old.sender, old.subject, old.body);"
+                " END"
+            )
+            self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+
+    def get_meta(self, key):
+        with self._lock:
+            row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, key, value):
+        with self._lock, self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, str(value)))
+
+    def uids(self) -> set:
+        with self._lock:
+            return {row[0] for row in self.conn.execute("SELECT uid FROM messages")}
+
+    def put(self, rows):
+        """Store (uid, sender, subject, date, received, body) rows."""
+        with self._lock, self.conn:
+            self.conn.executemany("INSERT OR IGNORE INTO messages VALUES (?, ?, ?, ?, ?, ?)", rows)
+
+    def delete(self, uids):
+        with self._lock, self.conn:
+            self.conn.executemany("DELETE FROM messages WHERE uid = ?", [(uid,) for uid in uids])
+
+    def search(self, query: str, limit: int, since: float = 0):
+        """(sender, date, subject, body) of the newest messages since `since` matching `query` as a phrase prefix."""
+        match = '"' + query.replace('"', '""') + '"*'
+        with self._lock:
+            return self.conn.execute(
+                "SELECT m.sender, m.date, m.subject, m.body FROM messages_fts JOIN messages m ON m.uid = messages_fts.rowid"
+                " WHERE messages_fts MATCH ? AND m.received >= ? ORDER BY m.uid DESC LIMIT ?",
+                (match, since, limit),
+            ).fetchall()
+
+    def reset(self):
+        with self._lock, self.conn:
+            self.conn.execute("DELETE FROM messages")
+            self.conn.execute("DELETE FROM meta")
+
+
+class IMAPWatcher:
+    """
+    Watches the IITK inbox on its own connection and calls `on_new(headers)` from a daemon
+    thread with the formatted headers of messages whose UIDs were not seen before.
+    Uses IMAP IDLE (RFC 2177) when the server supports it and NOOP polling otherwise,
+    and reconnects with exponential backoff after errors.
+    """
+
+    def __init__(self, mail_service, on_new, poll_seconds: float = POLL_SECONDS, idle_seconds: float = IDLE_SECONDS):
+        self.mail_service = mail_service
+        self.on_new = on_new
+        self.poll_seconds = poll_seconds
+        self.idle_seconds = idle_seconds
+        self.last_uid = None
+        self._stop = threading.Event()
+        self._mail = None
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        mail = self._mail
+        if mail is not None:
+            try:
+                mail.shutdown()
+            except Exception:
+                pass
+
+    def _run(self):
+        delay = 5
+        while not self._stop.is_set():
+            try:
+                self._mail = self.mail_service._connect()
+                delay = 5
+                self._watch(self._mail)
+            except Exception as e:
+                if self._stop.is_set():
+                    break
+                print(f"[IMAPWatcher] {e}; reconnecting in {delay}s", file=sys.stderr)
+                self._stop.wait(delay)
+                delay = min(delay * 2, 300)
+            finally:
+                if self._mail is not None:
+                    IMAPPool._discard(self._mail)
+                    self._mail = None
+
+    def _watch(self, mail):
+        self._check(mail)
+        use_idle = "IDLE" in mail.capabilities
+        while not self._stop.is_set():
+            if use_idle:
+                self._idle(mail)
+            else:
+                self._stop.wait(self.poll_seconds)
+                mail.noop()
+            self._check(mail)
+
+    @staticmethod
+    def _buffered(mail):
+        """Whether a response line can be read without waiting on the socket. select() only sees
+        bytes still in the socket; lines the server sent in one packet may already sit in
+        imaplib's buffered reader (or the TLS layer), so peek at it without blocking."""
+        timeout = mail.sock.gettimeout()
+        mail.sock.setblocking(False)
+        try:
+            return bool(mail.file.peek(1))
+        except (BlockingIOError, ssl.SSLWantReadError):
+            return False
+        finally:
+            mail.sock.settimeout(timeout)
+
+    def _idle(self, mail):
+        """IDLE until the server reports new mail or idle_seconds pass, then end it with DONE."""
+        tag = mail._new_tag()
+        mail.send(tag + b" IDLE\r\n")
+        line = mail.readline()
+        if not line.startswith(b"+"):
+            raise imaplib.IMAP4.error(f"IDLE rejected: {line!r}")
+        deadline = time.monotonic() + self.idle_seconds
+        while not self._stop.is_set():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            if not self._buffered(mail) and not select.select([mail.sock], [], [], min(remaining, 1.0))[0]:
+                continue
+            line = mail.readline()
+            if not line:
+                raise imaplib.IMAP4.abort("connection closed during IDLE")
+            if line.rstrip().endswith(b"EXISTS"):
+                break
+        mail.send(b"DONE\r\n")
+        while True:
+            line = mail.readline()
+            if not line:
+                raise imaplib.IMAP4.abort("connection closed while ending IDLE")
+            if line.startswith(tag):
+                return
+
+    def _check(self, mail):
+        """Report messages with UIDs above the last one seen (the first check only records it)."""
+        if self.last_uid is None:
+            status, data = mail.uid('search', None, 'UID *')
+            uids = data[0].split()
+            self.last_uid = int(uids[-1]) if uids else 0
+            return
+        status, data = mail.uid('search', None, f'UID {self.last_uid + 1}:*')
+        # "n:*" always matches the highest UID, even when it is below n
+        new = [uid for uid in data[0].split() if int(uid) > self.last_uid]
+        if not new:
+            return
+        self.last_uid = max(int(uid) for uid in new)
+        messages = self.mail_service._fetch_messages(mail, new, HEADER_ITEMS)
+        self.on_new([self.mail_service._format_email(msg, include_body=False) for _, msg in messages])
+
 
 class IITKMail:
-    def __init__(self):
+    """
+    IITK webmail over IMAP (pooled connections, local mirror for search) and SMTP.
+    store_path=None skips the local mirror, so searches go to the server; pool_size=0
+    suits a client that only opens its own connections, like IMAPWatcher's.
+    """
+
+    def __init__(self, pool_size: int = POOL_SIZE, store_path: str = DEFAULT_STORE_PATH, outbox=None):
         self.email_address = os.environ.get("IITK_EMAIL")
         self.password = os.environ.get("IITK_PASSWORD")
         self.imap_server = os.environ.get("IITK_IMAP_SERVER", "qasid.iitk.ac.in")
         self.smtp_server = os.environ.get("IITK_SMTP_SERVER", "mmtp.iitk.ac.in")
+        self.pool = IMAPPool(self._connect, size=pool_size)
+        try:
+            self.store = IITKMailStore(store_path) if store_path else None
+        except sqlite3.Error as e:
+            print(f"[IITKMail] Local mail store unavailable, searching on the server: {e}", file=sys.stderr)
+            self.store = None
+        self._synced = (0.0, None)  # (monotonic time of last sync, epoch time the store is complete from)
+        self._sync_lock = threading.Lock()
+        self._smtp = None
+        self._smtp_lock = threading.Lock()
+        self.outbox = outbox
+        if outbox is not None:
+            outbox.register("iitk", self._deliver)
         
         if not self.email_address or not self.password:
             pass # "Warning: IITK_EMAIL or IITK_PASSWORD is not set in environment."
 
+    def _open(self):
+        return imaplib.IMAP4_SSL(self.imap_server, 993)
+
     def _connect(self):
-        """Connect and login to IMAP, returns mail object."""
-        mail = imaplib.IMAP4_SSL(self.imap_server, 993)
+        """Connect and login to IMAP and select the inbox, returns mail object."""
+        mail = self._open()
         username = self.email_address.split('@')[0] if '@' in self.email_address else self.email_address
         try:
             mail.login(username, self.password)
         except Exception:
             mail.login(self.email_address, self.password)
+        mail.select('inbox')
         return mail
 
     def _decode_header(self, header_value):
@@ -62,117 +413,263 @@ class IITKMail:
                 return ""
         return ""
 
+    def _format_fields(self, sender, date, subject, body=None):
+        result = f"From: {sender}\nDate: {date}\nSubject: {subject}"
+        # Truncate body to avoid flooding
+        if body:
+            body = body.strip()[:500]
+            result += f"\nBody: {body}"
+        return result
+
     def _format_email(self, msg, include_body=True):
         """Format an email.message.Message into a readable string."""
         sender = self._decode_header(msg.get('From'))
         subject = self._decode_header(msg.get('Subject', '(No Subject)'))
         date = msg.get('Date', '(Unknown Date)')
-        result = f"From: {sender}\nDate: {date}\nSubject: {subject}"
-        if include_body:
-            body = self._get_body(msg)
-            # Truncate body to avoid flooding
-            if body:
-                body = body.strip()[:500]
-                result += f"\nBody: {body}"
-        return result
+        return self._format_fields(sender, date, subject, self._get_body(msg) if include_body else None)
 
-    def send_mail(self, to_email: str, subject: str, message: str) -> str:
-        try:
-            msg = MIMEMultipart()
-            msg['From'] = self.email_address
-            msg['To'] = to_email
-            msg['Subject'] = subject
-            msg.attach(MIMEText(message, 'plain'))
+    def _open_smtp(self):
+        return smtplib.SMTP_SSL(self.smtp_server, 465)
 
-            server = smtplib.SMTP_SSL(self.smtp_server, 465)
+    def _smtp_session(self):
+        """The warm SMTP session, logging in again if there is none."""
+        if self._smtp is None:
+            server = self._open_smtp()
             server.ehlo()
             server.login(self.email_address, self.password)
-            server.send_message(msg)
-            server.quit()
-            return f"Successfully sent email to {to_email}"
+            self._smtp = server
+        return self._smtp
+
+    def _close_smtp(self):
+        if self._smtp is not None:
+            try:
+                self._smtp.quit()
+            except Exception:
+                pass
+            self._smtp = None
+
+    def _deliver(self, payload) -> str:
+        """Send one {to, subject, body} payload over the reused SMTP session (outbox sender).
+        Raises PermanentFailure when the server refuses it for good."""
+        msg = MIMEMultipart()
+        msg['From'] = self.email_address
+        msg['To'] = payload["to"]
+        msg['Subject'] = payload["subject"]
+        msg.attach(MIMEText(payload["body"], 'plain'))
+
+        try:
+            with self._smtp_lock:
+                try:
+                    self._smtp_session().send_message(msg)
+                except smtplib.SMTPRecipientsRefused:
+                    raise  # an OSError too, but the session is fine
+                except (smtplib.SMTPServerDisconnected, smtplib.SMTPResponseException, OSError) as e:
+                    if isinstance(e, smtplib.SMTPResponseException) and e.smtp_code != 421:
+                        raise
+                    # The server dropped the idle session: reconnect once
+                    self._close_smtp()
+                    self._smtp_session().send_message(msg)
+        except smtplib.SMTPRecipientsRefused as e:
+            raise PermanentFailure(f"Recipient refused: {', '.join(e.recipients)}") from e
+        except smtplib.SMTPResponseException as e:
+            # 5xx replies (bad address, rejected login or content) are final; 4xx ones are worth retrying
+            if 500 <= e.smtp_code < 600:
+                raise PermanentFailure(f"SMTP server rejected the message: {e}") from e
+            raise
+        return f"Successfully sent email to {payload['to']}"
+
+    def send_mail(self, to_email: str, subject: str, message: str) -> str:
+        """Queue an email for delivery (or send it right away without an outbox)."""
+        payload = {"to": to_email, "subject": subject, "body": message}
+        try:
+            if self.outbox is not None:
+                mail_id = self.outbox.enqueue("iitk", payload)
+                return f"Email to {to_email} queued for delivery (ID {mail_id}). Check it with mail_status."
+            return self._deliver(payload)
         except Exception as e:
             return f"Failed to send email: {e}"
 
+    def _fetch_messages(self, mail, uids, items=FETCH_ITEMS):
+        """Fetch `items` for `uids` in one UID FETCH; returns (uid, Message) pairs, newest first."""
+        if not uids:
+            return []
+        status, data = mail.uid('fetch', b",".join(uids).decode(), items)
+        if status != 'OK':
+            return []
+
+        # Each message arrives as one or more (prefix, literal) tuples, followed by closing bytes
+        messages = []
+        current = None
+        for part in data:
+            if isinstance(part, tuple):
+                prefix, payload = part
+                if FETCH_START_RE.match(prefix) or current is None:
+                    current = {"meta": b"", "header": b"", "text": b""}
+                    messages.append(current)
+                current["meta"] += prefix
+                section = prefix.rsplit(b"BODY[", 1)[-1]
+                current["header" if section.startswith(b"HEADER") else "text"] = payload
+            elif current is not None and part:
+                current["meta"] += part
+
+        results = []
+        for parts in messages:
+            match = UID_RE.search(parts["meta"])
+            results.append((int(match.group(1)) if match else 0, email.message_from_bytes(parts["header"] + parts["text"])))
+        results.sort(key=lambda item: item[0], reverse=True)
+        return results
+
+    def _fetch_formatted(self, mail, uids):
+        """Fetch headers and the start of the body for `uids` in one UID FETCH, formatted newest first."""
+        return [self._format_email(msg, include_body=True) for _, msg in self._fetch_messages(mail, uids)]
+
+    def _unread(self, mail, max_results, since_hours):
+        # Build IMAP search: UNSEEN + received since N hours ago
+        since_date = (datetime.now() - timedelta(hours=since_hours)).strftime("%d-%b-%Y")
+        status, search_data = mail.uid('search', None, f'(UNSEEN SINCE {since_date})')
+        if status != 'OK':
+            return "Error fetching unread messages."
+
+        uids = search_data[0].split()
+
+        if not uids:
+            return "No recent unread emails."
+
+        results = self._fetch_formatted(mail, uids[max(len(uids) - max_results, 0):])
+        if not results:
+            return "No recent unread emails."
+        return "\n---\n".join(results)
+
     def unread(self, max_results: int = 5, since_hours: int = 48) -> str:
         """Fetch recent unread emails from the last `since_hours` hours (default 48h)."""
         try:
-            mail = self._connect()
+            return self.pool.run(lambda mail: self._unread(mail, max_results, since_hours))
+        except Exception as e:
+            return f"Failed to fetch unread emails: {e}"
+
+    def _sync(self, mail):
+        """
+        Bring the local store up to date with the last SYNC_DAYS of the inbox: fetch UIDs it
+        lacks, drop UIDs that were expunged or aged out, and start over if UIDVALIDITY changed.
+        Returns the epoch time from which the store is complete, or None while it is not: more
+        than SYNC_BATCH missing messages (the first sync of a whole inbox) are fetched by a
+        background thread instead of inside the caller's tool call.
+        """
+        synced_at, synced_since = self._synced
+        if synced_since is not None and time.monotonic() - synced_at < SYNC_INTERVAL:
+            return synced_since
+        if not self._sync_lock.acquire(blocking=False):
+            return synced_since  # another sync (possibly a background backfill) is running
+
+        backfilling = False
+        try:
             mail.select('inbox')
-            
-            # Build IMAP search: UNSEEN + received since N hours ago
-            since_date = (datetime.now() - timedelta(hours=since_hours)).strftime("%d-%b-%Y")
-            status, search_data = mail.search(None, f'(UNSEEN SINCE {since_date})')
+            uidvalidity = mail.response('UIDVALIDITY')[1][0]
+            if uidvalidity is None:
+                raise imaplib.IMAP4.error("server did not report UIDVALIDITY")
+            uidvalidity = uidvalidity.decode()
+            if self.store.get_meta("uidvalidity") != uidvalidity:
+                self.store.reset()
+                self.store.set_meta("uidvalidity", uidvalidity)
+
+            cutoff = (datetime.now() - timedelta(days=SYNC_DAYS)).replace(hour=0, minute=0, second=0, microsecond=0)
+            status, search_data = mail.uid('search', None, f'SINCE {cutoff.strftime("%d-%b-%Y")}')
             if status != 'OK':
-                mail.logout()
-                return "Error fetching unread messages."
-                
-            mail_ids = search_data[0].split()
-            
-            if not mail_ids:
-                mail.logout()
-                return "No recent unread emails."
-                
-            results = []
-            count = 0
-            for i in reversed(mail_ids):
-                if count >= max_results:
-                    break
-                status, data = mail.fetch(i, '(RFC822)')
-                for response_part in data:
-                    if isinstance(response_part, tuple):
-                        msg = email.message_from_bytes(response_part[1])
-                        results.append(self._format_email(msg, include_body=True))
-                count += 1
-            
-            mail.logout()
-            if not results:
-                return "No recent unread emails."
-            return "\n---\n".join(results)
+                raise imaplib.IMAP4.error("UID SEARCH failed during sync")
+            server_uids = {int(uid) for uid in search_data[0].split()}
+            local_uids = self.store.uids()
+            self.store.delete(local_uids - server_uids)
+
+            missing = sorted(server_uids - local_uids)
+            if len(missing) > SYNC_BATCH:
+                self._synced = (synced_at, None)
+                threading.Thread(target=self._backfill, args=(missing, cutoff.timestamp()), daemon=True).start()
+                backfilling = True
+                return None
+            self._store_messages(mail, missing)
+            self._synced = (time.monotonic(), cutoff.timestamp())
+            return cutoff.timestamp()
+        finally:
+            if not backfilling:
+                self._sync_lock.release()
+
+    def _backfill(self, missing, synced_since):
+        """Fetch `missing` UIDs into the store on a pooled connection, then mark the store complete
+        from `synced_since`. Holds the sync lock, taken by _sync, until done."""
+        try:
+            self.pool.run(lambda mail: self._store_messages(mail, sorted(set(missing) - self.store.uids())))
+            self._synced = (time.monotonic(), synced_since)
+            print(f"[IITKMail] Local mail store synced ({len(missing)} messages)", file=sys.stderr)
         except Exception as e:
-            return f"Failed to fetch unread emails: {e}"
+            print(f"[IITKMail] Background mail sync failed, searching on the server: {e}", file=sys.stderr)
+        finally:
+            self._sync_lock.release()
+
+    def _store_messages(self, mail, uids):
+        for start in range(0, len(uids), SYNC_BATCH):
+            batch = [str(uid).encode() for uid in uids[start:start + SYNC_BATCH]]
+            rows = []
+            for uid, msg in self._fetch_messages(mail, batch, STORE_ITEMS):
+                try:
+                    received = email.utils.parsedate_to_datetime(msg.get('Date')).timestamp()
+                except (TypeError, ValueError):
+                    received = time.time()
+                rows.append((uid, self._decode_header(msg.get('From')), self._decode_header(msg.get('Subject', '(No Subject)')),
+                             msg.get('Date', '(Unknown Date)'), received, self._get_body(msg)))
+            self.store.put(rows)
+
+    def _server_search(self, mail, query, since_date, before_date=None):
+        """UIDs matching `query` in SUBJECT, FROM or BODY, searched on the server (None on failure)."""
+        # IMAP OR search: match query in SUBJECT, FROM, or BODY
+        # IMAP syntax: (OR (OR (SUBJECT "q") (FROM "q")) (BODY "q"))
+        imap_query = f'(OR OR SUBJECT "{query}" FROM "{query}" BODY "{query}" SINCE {since_date.strftime("%d-%b-%Y")}'
+        if before_date:
+            imap_query += f' BEFORE {before_date.strftime("%d-%b-%Y")}'
+        status, search_data = mail.uid('search', None, imap_query + ')')
+        if status != 'OK':
+            return None
+        return search_data[0].split()
+
+    def _search(self, mail, query, max_results, since_days):
+        since = (datetime.now() - timedelta(days=since_days)).replace(hour=0, minute=0, second=0, microsecond=0)
+
+        # Answer from the local mirror where it is complete; only older days go to the server
+        results = []
+        before = None
+        if self.store is not None:
+            try:
+                synced_since = self._sync(mail)
+                if synced_since is not None:  # None until the first sync completes: search the server
+                    rows = self.store.search(query, max_results, since=since.timestamp())
+                    results = [self._format_fields(*row) for row in rows]
+                    if since.timestamp() >= synced_since or len(results) >= max_results:
+                        return "\n---\n".join(results) if results else f"No emails found matching '{query}'."
+                    before = datetime.fromtimestamp(synced_since)
+            except CONNECTION_ERRORS:
+                raise
+            except (imaplib.IMAP4.error, sqlite3.Error) as e:
+                print(f"[IITKMail] Local mail search failed, searching on the server: {e}", file=sys.stderr)
+                results, before = [], None
+
+        uids = self._server_search(mail, query, since, before)
+        if uids is None:
+            return f"Error searching inbox for '{query}'."
+
+        remaining = max_results - len(results)
+        results += self._fetch_formatted(mail, uids[max(len(uids) - remaining, 0):])
+        if not results:
+            return f"No emails found matching '{query}'."
+        return "\n---\n".join(results)
 
     def search(self, query: str, max_results: int = 5, since_days: int = 30) -> str:
         """Search the ENTIRE inbox (read + unread) for emails matching a keyword query.
         
-        Uses IMAP SEARCH with BODY/SUBJECT/FROM criteria to find relevant emails.
-        Searches within the last `since_days` days (default 30).
+        Matches the query in SUBJECT/FROM/BODY within the last `since_days` days (default 30).
+        The local FTS5 mirror (last IITK_MAIL_SYNC_DAYS days) is synced incrementally and
+        searched first; IMAP SEARCH on the server only covers older days it does not hold,
+        or the whole range while the mirror's first sync runs in the background.
         """
         try:
-            mail = self._connect()
-            mail.select('inbox')
-            
-            since_date = (datetime.now() - timedelta(days=since_days)).strftime("%d-%b-%Y")
-            
-            # IMAP OR search: match query in SUBJECT, FROM, or BODY
-            # IMAP syntax: (OR (OR (SUBJECT "q") (FROM "q")) (BODY "q"))
-            imap_query = f'(OR OR SUBJECT "{query}" FROM "{query}" BODY "{query}" SINCE {since_date})'
-            
-            status, search_data = mail.search(None, imap_query)
-            if status != 'OK':
-                mail.logout()
-                return f"Error searching inbox for '{query}'."
-            
-            mail_ids = search_data[0].split()
-            
-            if not mail_ids:
-                mail.logout()
-                return f"No emails found matching '{query}'."
-            
-            results = []
-            count = 0
-            for i in reversed(mail_ids):
-                if count >= max_results:
-                    break
-                status, data = mail.fetch(i, '(RFC822)')
-                for response_part in data:
-                    if isinstance(response_part, tuple):
-                        msg = email.message_from_bytes(response_part[1])
-                        results.append(self._format_email(msg, include_body=True))
-                count += 1
-            
-            mail.logout()
-            if not results:
-                return f"No emails found matching '{query}'."
-            return "\n---\n".join(results)
+            return self.pool.run(lambda mail: self._search(mail, query, max_results, since_days))
         except Exception as e:
             return f"Failed to search emails: {e}"
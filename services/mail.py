@@ -2,13 +2,21 @@
 Gmail API Service Wrapper.
 Allows for searching the Gmail inbox (with semantic RAG), fetching unread emails,
 and sending outgoing plaintext emails.
+Parsed messages are cached in a local SQLite store kept current through the
+users.history.list feed, so only new messages are downloaded.
 """
 import sys
+import os
+import json
 import base64
+import sqlite3
+import threading
+from itertools import islice
 from googleapiclient.discovery import build
-from tqdm import tqdm
+from googleapiclient.errors import HttpError
 from langchain.schema import Document
 from RAG import RAG
+from services.outbox import PermanentFailure
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 
@@ -27,107 +35,409 @@ def get_message_body(msg):
     return None
 
 
+# Gmail accepts up to 100 calls per batch request but recommends at most 50
+BATCH_SIZE = 50
+LIST_PAGE_SIZE = 500  # messages.list maximum
+
+DEFAULT_STORE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "gmail_cache.db")
+HISTORY_TYPES = ["messageAdded", "messageDeleted", "labelAdded", "labelRemoved"]
+
+# Triage only needs these headers and the snippet; the fields mask trims the rest of the response
+TRIAGE_HEADERS = ["From", "Subject", "Date"]
+TRIAGE_FIELDS = "id,threadId,labelIds,snippet,internalDate,historyId,payload/headers"
+
+# Send errors worth retrying: rate limits and server-side failures (a 400 or 404 never succeeds)
+RETRYABLE_STATUSES = {408, 429, 500, 502, 503, 504}
+RATE_LIMIT_REASONS = {"rateLimitExceeded", "userRateLimitExceeded"}
+
+
+def parse_message(msg_detail):
+    """Flatten a users.messages.get response into the dict the tools return."""
+    payload = msg_detail.get("payload", {})
+    headers = payload.get("headers", [])
+    details = {h["name"]: h["value"] for h in headers}
+    return {
+        "id": msg_detail.get("id"),
+        "from": details.get("From"),
+        "subject": details.get("Subject"),
+        "date": details.get("Date"),
+        "body": get_message_body(msg_detail),
+    }
+
+
+def triage_view(msg):
+    """The compact form unread(triage=True) returns: headers and snippet, no body."""
+    return {k: msg.get(k) for k in ("id", "from", "subject", "date", "snippet")}
+
+
+def to_document(msg):
+    """Convert a parsed message to a Document for RAG."""
+    content = f"From: {msg['from']}\nSubject: {msg['subject']}\nDate: {msg['date']}\nBody: {msg['body']}"
+    return Document(page_content=content, metadata={"id": msg["id"]})
+
+
+class GmailStore:
+    """
+    SQLite cache of parsed messages (headers, snippet, body, labels) keyed by message id.
+    Rows fetched with format=metadata have full = 0 and no body until it is fetched.
+    """
+
+    def __init__(self, path: str = DEFAULT_STORE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self.conn:
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS messages (id TEXT PRIMARY KEY, sender TEXT, subject TEXT, date TEXT,"
+                " body TEXT, labels TEXT, internal_date INTEGER, snippet TEXT, full INTEGER DEFAULT 1)"
+            )
+            columns = {row[1] for row in self.conn.execute("PRAGMA table_info(messages)")}
+            if "snippet" not in columns:
+                self.conn.execute("ALTER TABLE messages ADD COLUMN snippet TEXT")
+                self.conn.execute("ALTER TABLE messages ADD COLUMN full INTEGER DEFAULT 1")
+            self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+
+    def get_meta(self, key):
+        with self._lock:
+            row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, key, value):
+        with self._lock, self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, str(value)))
+
+    COLUMNS = "id, sender, subject, date, body, snippet"
+
+    @staticmethod
+    def _row_to_message(row):
+        return {"id": row[0], "from": row[1], "subject": row[2], "date": row[3], "body": row[4], "snippet": row[5]}
+
+    def get_many(self, msg_ids, full_only: bool = False) -> dict:
+        """Stored messages among `msg_ids`; with full_only, only those whose body has been fetched."""
+        if not msg_ids:
+            return {}
+        marks = ",".join("?" * len(msg_ids))
+        condition = " AND full = 1" if full_only else ""
+        with self._lock:
+            rows = self.conn.execute(
+                f"SELECT {self.COLUMNS} FROM messages WHERE id IN ({marks}){condition}", list(msg_ids)
+            ).fetchall()
+        return {row[0]: self._row_to_message(row) for row in rows}
+
+    def has(self, msg_id) -> bool:
+        with self._lock:
+            return self.conn.execute("SELECT 1 FROM messages WHERE id = ?", (msg_id,)).fetchone() is not None
+
+    def put(self, msg_details, full: bool = True):
+        """Store raw users.messages.get responses (format=full, or format=metadata with full=False)."""
+        rows = []
+        for detail in msg_details:
+            msg = parse_message(detail)
+            rows.append((msg["id"], msg["from"], msg["subject"], msg["date"], msg["body"],
+                         json.dumps(detail.get("labelIds", [])), int(detail.get("internalDate", 0)),
+                         detail.get("snippet"), int(full)))
+        with self._lock, self.conn:
+            if full:
+                self.conn.executemany("INSERT OR REPLACE INTO messages VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            else:
+                # Never overwrite an already fetched body with a metadata-only response
+                self.conn.executemany(
+                    "INSERT INTO messages VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) ON CONFLICT(id) DO UPDATE SET"
+                    " labels = excluded.labels, snippet = excluded.snippet", rows
+                )
+
+    def update_labels(self, msg_id, added=(), removed=()):
+        with self._lock, self.conn:
+            row = self.conn.execute("SELECT labels FROM messages WHERE id = ?", (msg_id,)).fetchone()
+            if row is None:
+                return
+            labels = (set(json.loads(row[0])) | set(added)) - set(removed)
+            self.conn.execute("UPDATE messages SET labels = ? WHERE id = ?", (json.dumps(sorted(labels)), msg_id))
+
+    def delete(self, msg_ids):
+        with self._lock, self.conn:
+            self.conn.executemany("DELETE FROM messages WHERE id = ?", [(i,) for i in msg_ids])
+
+    def unread(self, limit: int, since: int = 0):
+        """Most recent unread inbox messages held locally, received at or after `since` (ms epoch)."""
+        with self._lock:
+            rows = self.conn.execute(
+                f"SELECT {self.COLUMNS} FROM messages WHERE labels LIKE '%\"UNREAD\"%'"
+                " AND labels LIKE '%\"INBOX\"%' AND internal_date >= ? ORDER BY internal_date DESC LIMIT ?",
+                (since, limit),
+            ).fetchall()
+        return [self._row_to_message(row) for row in rows]
+
+    def oldest_internal_date(self, msg_ids) -> int:
+        marks = ",".join("?" * len(msg_ids))
+        with self._lock:
+            row = self.conn.execute(
+                f"SELECT MIN(internal_date) FROM messages WHERE id IN ({marks})", list(msg_ids)
+            ).fetchone()
+        return row[0] or 0
+
+    def reset(self):
+        with self._lock, self.conn:
+            self.conn.execute("DELETE FROM messages")
+            self.conn.execute("DELETE FROM meta")
+
+
 class Gmail:
-    def __init__(self, credentials):
+    def __init__(self, credentials, store_path: str = DEFAULT_STORE_PATH, outbox=None):
+        self.credentials = credentials
+        self._local = threading.local()
         try:
             self.service = build("gmail", "v1", credentials=credentials)
         except:
             self.service = None
             pass # "Unable to make connection with Gmail")
+        self.store = GmailStore(store_path)
+        self.outbox = outbox
+        if outbox is not None and self.service:
+            outbox.register("gmail", self._deliver)
+
+    def _thread_service(self):
+        """A Gmail client for the calling thread, so the outbox worker never shares the tool calls'
+        httplib2 connection (which is not thread-safe)."""
+        service = getattr(self._local, "service", None)
+        if service is None:
+            service = self._local.service = build("gmail", "v1", credentials=self.credentials)
+        return service
+
+    def _get_request(self, msg_id, format):
+        if format == "metadata":
+            return self.service.users().messages().get(
+                userId="me", id=msg_id, format="metadata", metadataHeaders=TRIAGE_HEADERS, fields=TRIAGE_FIELDS
+            )
+        return self.service.users().messages().get(userId="me", id=msg_id, format=format)
+
+    def _fetch_messages(self, msg_ids, format="full"):
+        """
+        Fetch messages for `msg_ids` using Gmail batch requests (one HTTP round-trip
+        per BATCH_SIZE messages) and return them in the same order as `msg_ids`.
+        format="metadata" fetches only the triage headers and snippet.
+        Messages the batch could not return are retried individually.
+        """
+        fetched = {}
+
+        def collect(request_id, response, exception):
+            if exception is None:
+                fetched[request_id] = response
+
+        unique_ids = list(dict.fromkeys(msg_ids))
+        for start in range(0, len(unique_ids), BATCH_SIZE):
+            batch = self.service.new_batch_http_request(callback=collect)
+            for msg_id in unique_ids[start:start + BATCH_SIZE]:
+                batch.add(self._get_request(msg_id, format), request_id=msg_id)
+            try:
+                batch.execute()
+            except HttpError:
+                pass
+
+        for msg_id in unique_ids:
+            if msg_id not in fetched:
+                fetched[msg_id] = self._get_request(msg_id, format).execute()
+        return [fetched[msg_id] for msg_id in msg_ids]
 
+    def _get_messages(self, msg_ids, full: bool = True):
+        """
+        Parsed messages for `msg_ids` in order, served from the local store and fetching only unknown ids.
+        With full=False, stored metadata is enough and missing messages are fetched as metadata only.
+        """
+        cached = self.store.get_many(msg_ids, full_only=full)
+        missing = [i for i in msg_ids if i not in cached]
+        if missing:
+            self.store.put(self._fetch_messages(missing, format="full" if full else "metadata"), full=full)
+            cached.update(self.store.get_many(missing))
+        return [cached[i] for i in msg_ids if i in cached]
+
+    def get_message(self, msg_id: str):
+        """Full message (with body) by id; the body is fetched on first request and cached."""
+        try:
+            if not self.service:
+                return "Gmail service not initialized."
+            messages = self._get_messages([msg_id])
+            if not messages:
+                return f"Message {msg_id} not found."
+            msg = messages[0]
+            return {k: msg[k] for k in ("id", "from", "subject", "date", "body")}
+        except Exception as error:
+            return f"Error fetching message: {error}"
+
+    def _reset_history(self):
+        """Start a fresh history baseline at the mailbox's current historyId."""
+        profile = self.service.users().getProfile(userId="me").execute()
+        self.store.set_meta("history_id", profile["historyId"])
 
+    def sync(self):
+        """
+        Bring the local store up to date with one users.history.list walk from the last stored
+        historyId: apply label changes and deletions, and fetch newly added inbox messages.
+        """
+        start = self.store.get_meta("history_id")
+        if not start:
+            self._reset_history()
+            return
 
-    def search(self, query: str, results: int = 5, rag: bool = False):
+        added = set()
+        latest = start
+        page_token = None
         try:
-            pass # "Searching for Mails", end="\r", flush=True)
-            results = (
+            while True:
+                response = self.service.users().history().list(
+                    userId="me", startHistoryId=start, historyTypes=HISTORY_TYPES, pageToken=page_token
+                ).execute()
+                for record in response.get("history", []):
+                    for item in record.get("messagesAdded", []):
+                        if "INBOX" in item["message"].get("labelIds", []):
+                            added.add(item["message"]["id"])
+                    for item in record.get("messagesDeleted", []):
+                        self.store.delete([item["message"]["id"]])
+                        added.discard(item["message"]["id"])
+                    for item in record.get("labelsAdded", []):
+                        msg_id = item["message"]["id"]
+                        if self.store.has(msg_id):
+                            self.store.update_labels(msg_id, added=item.get("labelIds", []))
+                        elif "INBOX" in item["message"].get("labelIds", []):
+                            added.add(msg_id)
+                    for item in record.get("labelsRemoved", []):
+                        self.store.update_labels(item["message"]["id"], removed=item.get("labelIds", []))
+                latest = response.get("historyId", latest)
+                page_token = response.get("nextPageToken")
+                if not page_token:
+                    break
+        except HttpError as error:
+            if error.resp.status != 404:
+                raise
+            # startHistoryId is too old: the store can no longer be trusted
+            self.store.reset()
+            self._reset_history()
+            return
+
+        missing = [i for i in added if not self.store.has(i)]
+        if missing:
+            # Headers and snippet only; bodies are fetched when a message is actually read
+            self.store.put(self._fetch_messages(missing, format="metadata"), full=False)
+        self.store.set_meta("history_id", latest)
+
+
+
+    def iter_message_ids(self, query: str = None, page_size: int = LIST_PAGE_SIZE, label_ids=("INBOX",)):
+        """Yield message ids matching `query`, requesting the next messages.list page only when it is reached."""
+        page_token = None
+        while True:
+            response = (
                 self.service.users()
                 .messages()
-                .list(userId="me", labelIds=["INBOX"], maxResults=results, q=query)
+                .list(userId="me", labelIds=list(label_ids), maxResults=page_size, q=query, pageToken=page_token)
                 .execute()
             )
-            messages = results.get("messages", [])
+            for m in response.get("messages", []):
+                yield m["id"]
+            page_token = response.get("nextPageToken")
+            if not page_token:
+                return
 
-            if not messages:
+    def iter_messages(self, query: str = None, page_size: int = BATCH_SIZE, full: bool = True):
+        """
+        Yield parsed messages matching `query` a page at a time: each page of ids is fetched
+        in one batch (or served from the store) before any of the next page is listed,
+        so a consumer that stops early never pays for the rest of the scan.
+        """
+        ids = self.iter_message_ids(query, page_size=page_size)
+        while True:
+            page = list(islice(ids, page_size))
+            if not page:
+                return
+            yield from self._get_messages(page, full=full)
+
+    def search(self, query: str, results: int = 5, rag: bool = False, hybrid: bool = False):
+        """
+        Search the inbox with a Gmail query.
+        If rag=True, return semantic search using RAG; hybrid=True adds BM25 keyword matching to it.
+        """
+        try:
+            pass # "Searching for Mails", end="\r", flush=True)
+            self.sync()
+            page_size = min(results, BATCH_SIZE)
+            detailed_messages = list(islice(self.iter_messages(query, page_size=page_size), results))
+
+            if not detailed_messages:
                 return "No messages found."
-            
-            pass # "Fetching Complete Messages...", end="\r", flush=True)
-            detailed_messages = []
-            docs = []
-            for m in tqdm(messages):
-                msg_id = m["id"]
-                msg_detail = self.service.users().messages().get(
-                    userId="me", id=msg_id, format="full"
-                ).execute()
-                payload = msg_detail.get("payload", {})
-                headers = payload.get("headers", [])
-                body = get_message_body(msg_detail)
-
-                details = {h["name"]: h["value"] for h in headers}
-                msg = {
-                    "id": msg_id,
-                    "from": details.get("From"),
-                    "subject": details.get("Subject"),
-                    "date": details.get("Date"),
-                    "body": body,
-                }
-                detailed_messages.append(msg)
-
-                # Convert to Document for RAG
-                content = f"From: {msg['from']}\nSubject: {msg['subject']}\nDate: {msg['date']}\nBody: {msg['body']}"
-                docs.append(Document(page_content=content, metadata={"id": msg_id}))
+
+            docs = [to_document(msg) for msg in detailed_messages]
 
             if rag:  # If rag=True, run semantic retrieval
-                return RAG(docs, query, results=results)
+                return RAG(docs, query, results=results, hybrid=hybrid)
             else:
                 return detailed_messages
 
         except Exception as error:
             return f"Error: {error}"
         
-    def send_mail(self, to: str, subject: str, body: str, cc: list = None, bcc: list = None, is_html: bool = False):
-        """
-        Send an email using Gmail API.
-        """
-        try:
-            if not self.service:
-                return "Gmail service not initialized."
-
-            message = MIMEMultipart()
-            message["to"] = to
-            message["subject"] = subject
+    def _deliver(self, payload) -> str:
+        """Send one queued email through the Gmail API (outbox sender); raises on failure,
+        PermanentFailure when the API rejected the message itself."""
+        message = MIMEMultipart()
+        message["to"] = payload["to"]
+        message["subject"] = payload["subject"]
 
-            if cc:
-                message["cc"] = ", ".join(cc)
-            if bcc:
-                message["bcc"] = ", ".join(bcc)
+        if payload.get("cc"):
+            message["cc"] = ", ".join(payload["cc"])
+        if payload.get("bcc"):
+            message["bcc"] = ", ".join(payload["bcc"])
 
-            if is_html:
-                message.attach(MIMEText(body, "html"))
-            else:
-                message.attach(MIMEText(body, "plain"))
+        if payload.get("is_html"):
+            message.attach(MIMEText(payload["body"], "html"))
+        else:
+            message.attach(MIMEText(payload["body"], "plain"))
 
-            raw_message = base64.urlsafe_b64encode(message.as_bytes()).decode("utf-8")
+        raw_message = base64.urlsafe_b64encode(message.as_bytes()).decode("utf-8")
 
+        try:
             sent_message = (
-                self.service.users()
+                self._thread_service().users()
                 .messages()
                 .send(userId="me", body={"raw": raw_message})
                 .execute()
             )
+        except HttpError as e:
+            details = e.error_details if isinstance(e.error_details, list) else []
+            rate_limited = any(isinstance(d, dict) and d.get("reason") in RATE_LIMIT_REASONS for d in details)
+            if e.resp.status not in RETRYABLE_STATUSES and not rate_limited:
+                raise PermanentFailure(f"Gmail rejected the message ({e.resp.status}): {e.reason}") from e
+            raise
+
+        return f"Message sent! ID: {sent_message['id']}"
+
+    def send_mail(self, to: str, subject: str, body: str, cc: list = None, bcc: list = None, is_html: bool = False):
+        """
+        Send an email using Gmail API.
+        With an outbox, the email is queued and delivered in the background; the returned
+        ID can be looked up with Outbox.status.
+        """
+        try:
+            if not self.service:
+                return "Gmail service not initialized."
 
-            return f"Message sent! ID: {sent_message['id']}"
+            payload = {"to": to, "subject": subject, "body": body, "cc": cc, "bcc": bcc, "is_html": is_html}
+            if self.outbox is not None:
+                mail_id = self.outbox.enqueue("gmail", payload)
+                return f"Email to {to} queued for delivery (ID {mail_id}). Check it with mail_status."
+            return self._deliver(payload)
 
         except Exception as error:
             return f"Error sending email: {error}"
         
 
 
-    def unread(self, max_results: int = 10, rag: bool = False, query: str = None):
+    def unread(self, max_results: int = 10, rag: bool = False, query: str = None, triage: bool = False):
         """
         Fetch unread mails from inbox.
         If query is provided, apply Gmail's native query search on unread mails.
         If rag=True, return semantic search using RAG on unread mails.
+        If triage=True (and rag=False), return only id, from, subject, date and snippet without
+        downloading bodies; use get_message(id) to read one.
         """
         try:
             if not self.service:
@@ -135,51 +445,48 @@ class Gmail:
 
             pass # "Fetching unread emails...", end="\r")
 
-            search_query = "is:unread"
-            if query:
-                search_query += f" {query}"
+            self.sync()
+            detailed_messages = None
+            # Every unread inbox message received since `unread_floor` is in the store (seeded by a
+            # list() below, then kept current by sync()), so the newest max_results are exact locally
+            # once the store has that many of them, or always when the floor is 0 (it has them all).
+            floor = self.store.get_meta("unread_floor")
+            if not query and floor is not None:
+                local = self.store.unread(max_results, since=int(floor))
+                if len(local) >= max_results or int(floor) == 0:
+                    detailed_messages = local
+                    if rag or not triage:
+                        # Messages synced as metadata only get their bodies now
+                        detailed_messages = self._get_messages([m["id"] for m in local])
 
-            results = (
-                self.service.users()
-                .messages()
-                .list(userId="me", labelIds=["INBOX"], q=search_query, maxResults=max_results)
-                .execute()
-            )
-            messages = results.get("messages", [])
-
-            if not messages:
-                return "No unread messages found."
-
-            detailed_messages = []
-            docs = []
-            for m in messages:
-                msg_id = m["id"]
-                msg_detail = self.service.users().messages().get(
-                    userId="me", id=msg_id, format="full"
-                ).execute()
+            if detailed_messages is None:
+                search_query = "is:unread"
+                if query:
+                    search_query += f" {query}"
 
-                payload = msg_detail.get("payload", {})
-                headers = payload.get("headers", [])
-                body = get_message_body(msg_detail)
+                results = (
+                    self.service.users()
+                    .messages()
+                    .list(userId="me", labelIds=["INBOX"], q=search_query, maxResults=max_results)
+                    .execute()
+                )
+                messages = results.get("messages", [])
+                msg_ids = [m["id"] for m in messages]
+                detailed_messages = self._get_messages(msg_ids, full=rag or not triage)
+                if not query:
+                    complete = not results.get("nextPageToken") and len(messages) < max_results
+                    new_floor = 0 if complete else self.store.oldest_internal_date(msg_ids)
+                    self.store.set_meta("unread_floor", min(new_floor, int(floor)) if floor is not None else new_floor)
 
-                details = {h["name"]: h["value"] for h in headers}
-                msg = {
-                    "id": msg_id,
-                    "from": details.get("From"),
-                    "subject": details.get("Subject"),
-                    "date": details.get("Date"),
-                    "body": body,
-                }
-                detailed_messages.append(msg)
-
-                # Prepare docs for RAG
-                content = f"From: {msg['from']}\nSubject: {msg['subject']}\nDate: {msg['date']}\nBody: {msg['body']}"
-                docs.append(Document(page_content=content, metadata={"id": msg_id}))
+            if not detailed_messages:
+                return "No unread messages found."
 
             if rag:
-                return RAG(docs, query or "Unread emails")
+                return RAG([to_document(msg) for msg in detailed_messages], query or "Unread emails")
+            elif triage:
+                return [triage_view(msg) for msg in detailed_messages]
             else:
-                return detailed_messages
+                return [{k: msg[k] for k in ("id", "from", "subject", "date", "body")} for msg in detailed_messages]
 
         except Exception as error:
             return f"Error fetching unread emails: {error}"
@@ -0,0 +1,128 @@
+"""
+Outbound Mail Queue.
+Accepted emails are written to a SQLite outbox before the tool call returns, and a
+background worker delivers them through the sender registered for their channel
+("gmail", "iitk"), retrying transient failures with exponential backoff; a sender raises
+PermanentFailure for errors retrying cannot fix (e.g. an invalid address). Mail still queued
+when the process stops is picked up again on the next start (at-least-once delivery).
+"""
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "outbox.db")
+MAX_ATTEMPTS = 6
+RETRY_BASE_SECONDS = 30
+RETRY_MAX_SECONDS = 15 * 60
+
+
+class PermanentFailure(Exception):
+    """Raised by a sender when delivery can never succeed; the mail is marked failed at once."""
+
+
+class Outbox:
+    def __init__(self, path: str = DEFAULT_PATH, max_attempts: int = MAX_ATTEMPTS):
+        self.path = path
+        self.max_attempts = max_attempts
+        self.senders = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._worker = None
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self.conn:
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS outbox (id INTEGER PRIMARY KEY AUTOINCREMENT, channel TEXT, payload TEXT,"
+                " status TEXT, attempts INTEGER DEFAULT 0, next_attempt REAL, result TEXT, created REAL, updated REAL)"
+            )
+
+    def register(self, channel: str, send):
+        """Deliver `channel` mail with send(payload) -> result string; it raises to signal a retryable
+        failure, or PermanentFailure when retrying cannot help."""
+        self.senders[channel] = send
+        with self._lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, daemon=True)
+                self._worker.start()
+        self._wake.set()
+
+    def enqueue(self, channel: str, payload: dict) -> int:
+        now = time.time()
+        with self._lock, self.conn:
+            cursor = self.conn.execute(
+                "INSERT INTO outbox (channel, payload, status, next_attempt, created, updated)"
+                " VALUES (?, ?, 'queued', ?, ?, ?)",
+                (channel, json.dumps(payload), now, now, now),
+            )
+        self._wake.set()
+        return cursor.lastrowid
+
+    def status(self, mail_id: int):
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT id, channel, payload, status, attempts, result, updated FROM outbox WHERE id = ?", (mail_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        payload = json.loads(row[2])
+        return {"id": row[0], "channel": row[1], "to": payload.get("to"), "subject": payload.get("subject"),
+                "status": row[3], "attempts": row[4], "result": row[5], "updated": row[6]}
+
+    def _due(self):
+        """Queued mail whose retry time has come, plus the next retry time among the rest."""
+        with self._lock:
+            channels = list(self.senders)
+            marks = ",".join("?" * len(channels))
+            due = self.conn.execute(
+                f"SELECT id, channel, payload, attempts FROM outbox WHERE status = 'queued' AND channel IN ({marks})"
+                " AND next_attempt <= ? ORDER BY id", (*channels, time.time())
+            ).fetchall()
+            upcoming = self.conn.execute(
+                f"SELECT MIN(next_attempt) FROM outbox WHERE status = 'queued' AND channel IN ({marks})", channels
+            ).fetchone()[0]
+        return due, upcoming
+
+    def _record(self, mail_id, status, attempts, result, next_attempt=None):
+        with self._lock, self.conn:
+            self.conn.execute(
+                "UPDATE outbox SET status = ?, attempts = ?, result = ?, next_attempt = ?, updated = ? WHERE id = ?",
+                (status, attempts, result, next_attempt, time.time(), mail_id),
+            )
+
+    def _deliver(self, mail_id, channel, payload, attempts):
+        attempts += 1
+        try:
+            result = self.senders[channel](json.loads(payload))
+        except Exception as e:
+            if attempts >= self.max_attempts or isinstance(e, PermanentFailure):
+                self._record(mail_id, "failed", attempts, f"{type(e).__name__}: {e}")
+            else:
+                delay = min(RETRY_BASE_SECONDS * 2 ** (attempts - 1), RETRY_MAX_SECONDS)
+                self._record(mail_id, "queued", attempts, f"Retrying in {delay}s after {type(e).__name__}: {e}",
+                             time.time() + delay)
+            print(f"[Outbox] Delivery of #{mail_id} via {channel} failed (attempt {attempts}): {e}", file=sys.stderr)
+            return
+        self._record(mail_id, "sent", attempts, result)
+
+    def _run(self):
+        while True:
+            self._wake.clear()
+            due, upcoming = self._due()
+            for mail_id, channel, payload, attempts in due:
+                self._deliver(mail_id, channel, payload, attempts)
+            if due:
+                continue
+            timeout = None if upcoming is None else max(upcoming - time.time(), 0.1)
+            self._wake.wait(timeout)
+
+
+def describe(status) -> str:
+    """Human-readable delivery status for the mail_status tool."""
+    if status is None:
+        return "No queued email with that ID."
+    text = f"Email #{status['id']} to {status['to']} ({status['subject']}) via {status['channel']}: {status['status']}"
+    if status["result"]:
+        text += f" — {status['result']}"
+    return text
@@ -0,0 +1,507 @@
+"""
+Persistent Vector Store for RAG.
+Keeps a FAISS index of document chunks on disk, keyed by a stable document ID and
+a content hash. Documents seen before are not re-embedded; changed documents have
+their old chunks replaced, and retrieval runs against the existing index.
+A BM25 keyword index over the same chunks is kept in memory for hybrid retrieval.
+Once the corpus passes QUANTIZE_THRESHOLD chunks, the float32 index is converted to
+int8 scalar quantization (4x smaller) and the top candidates are re-ranked exactly, using
+float32 copies the store keeps in a memory-mapped file (read only for those candidates).
+Chunks that near-duplicate an already indexed chunk (SimHash) are not embedded again;
+the surviving chunk lists every source document in its 'sources' metadata.
+Updates are written to disk at most every SAVE_INTERVAL seconds (and at exit, or on flush()),
+not once per document, so indexing many documents doesn't rewrite the whole index each time.
+"""
+import atexit
+import hashlib
+import json
+import os
+import sys
+import threading
+from datetime import datetime
+
+import numpy as np
+from langchain_community.vectorstores import FAISS
+
+from bm25 import BM25Index, reciprocal_rank_fusion
+from dedup import SimHashIndex, simhash
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "vector_store")
+MAX_DOCS = 5000
+# Chunk count at which the index switches to int8 storage; 0 keeps it float32 forever
+QUANTIZE_THRESHOLD = int(os.environ.get("RAG_QUANTIZE_THRESHOLD", 20000))
+# Quantized searches fetch this many times k candidates for exact re-ranking
+RERANK_FACTOR = 4
+# Float32 vectors of a quantized index, one row per chunk; a chunk's row is its 'exact_row' metadata
+EXACT_VECTORS_FILE = "exact.f32"
+# Chunks embedded per batch when streaming a large document into the index
+STREAM_BATCH_SIZE = 256
+# Seconds an update may wait before the index and manifest are written out together
+SAVE_INTERVAL = float(os.environ.get("RAG_SAVE_INTERVAL", "30"))
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def document_id(doc) -> str:
+    """Stable ID for a Document: its 'id' metadata, else its source file, else its content hash."""
+    meta = doc.metadata or {}
+    return str(meta.get("id") or meta.get("file") or content_hash(doc.page_content))
+
+
+class VectorStore:
+    def __init__(self, embed_model, path: str = DEFAULT_PATH, max_docs: int = MAX_DOCS,
+                 quantize_threshold: int = QUANTIZE_THRESHOLD):
+        self.path = path
+        self.embed_model = embed_model
+        self.max_docs = max_docs
+        self.quantize_threshold = quantize_threshold
+        self._lock = threading.Lock()
+        self._streamed = threading.Condition(self._lock)
+        self._streaming = set()  # doc_ids an upsert_stream is indexing right now
+        self.vectorstore = None
+        self.keyword_index = BM25Index()
+        self.near_dups = SimHashIndex()
+        self.exact = None     # float32 memmap of chunk vectors, once quantized
+        self._free_rows = []  # rows of `exact` no chunk uses
+        # doc_id -> {"hash": ..., "chunks": [own chunk ids], "shared": [near-duplicate chunk ids owned
+        #            by other documents], "last_used": iso timestamp, "pinned": True if never evicted}
+        self.manifest: dict[str, dict] = {}
+        self._dirty = False        # manifest changed since the last write
+        self._index_dirty = False  # index changed since the last write
+        self._save_timer = None
+        self._load()
+        atexit.register(self._flush_at_exit)
+
+    @property
+    def _manifest_path(self):
+        return os.path.join(self.path, "manifest.json")
+
+    @property
+    def _exact_path(self):
+        return os.path.join(self.path, EXACT_VECTORS_FILE)
+
+    def _load(self):
+        """Load the FAISS index and manifest from disk, starting empty if either is missing or corrupt."""
+        if not os.path.exists(self._manifest_path):
+            return
+        try:
+            with open(self._manifest_path, "r") as f:
+                manifest = json.load(f)
+            vectorstore = FAISS.load_local(
+                self.path, self.embed_model, allow_dangerous_deserialization=True
+            )
+        except Exception as e:
+            print(f"[VectorStore] Failed to load index, rebuilding: {e}", file=sys.stderr)
+            return
+        self.manifest = manifest if isinstance(manifest, dict) else {}
+        self.vectorstore = vectorstore
+        used_rows = set()
+        for chunk_id in vectorstore.index_to_docstore_id.values():
+            doc = vectorstore.docstore.search(chunk_id)
+            self.keyword_index.add(chunk_id, doc.page_content)
+            self.near_dups.add(chunk_id, doc.metadata.get("simhash") or simhash(doc.page_content))
+            if "exact_row" in doc.metadata:
+                used_rows.add(doc.metadata["exact_row"])
+        if self.is_quantized and os.path.exists(self._exact_path):
+            rows = os.path.getsize(self._exact_path) // (4 * vectorstore.index.d)
+            self.exact = np.memmap(self._exact_path, dtype=np.float32, mode="r+", shape=(rows, vectorstore.index.d))
+            self._free_rows = sorted(set(range(rows)) - used_rows, reverse=True)
+
+    def _save(self, save_index: bool = True):
+        """Mark the manifest, and the index if it changed, for writing within SAVE_INTERVAL seconds
+        (called under lock). Both are always written together, so they never disagree on disk."""
+        self._dirty = True
+        self._index_dirty = self._index_dirty or save_index
+        if SAVE_INTERVAL <= 0:
+            self._write()
+        elif self._save_timer is None:
+            self._save_timer = threading.Timer(SAVE_INTERVAL, self.flush)
+            self._save_timer.daemon = True
+            self._save_timer.start()
+
+    def flush(self):
+        """Write pending updates to disk now."""
+        with self._lock:
+            if self._save_timer is not None:
+                self._save_timer.cancel()
+                self._save_timer = None
+            if self._dirty:
+                self._write()
+
+    def _flush_at_exit(self):
+        # A store whose directory's parent is gone (e.g. a removed temporary directory) is not recreated
+        if os.path.isdir(os.path.dirname(os.path.abspath(self.path))):
+            self.flush()
+
+    def _write(self):
+        """Persist manifest, and the index if it changed (called under lock)."""
+        save_index, self._dirty, self._index_dirty = self._index_dirty, False, False
+        try:
+            os.makedirs(self.path, exist_ok=True)
+            if save_index and self.vectorstore is not None:
+                self.vectorstore.save_local(self.path)
+                if self.exact is not None:
+                    self.exact.flush()
+            tmp = self._manifest_path + ".tmp"
+            with open(tmp, "w") as f:
+                json.dump(self.manifest, f)
+            os.replace(tmp, self._manifest_path)
+        except (IOError, OSError) as e:
+            print(f"[VectorStore] Failed to save: {e}", file=sys.stderr)
+
+    def _delete_chunks(self, chunk_ids):
+        for chunk_id in chunk_ids:
+            metadata = self._chunk_metadata(chunk_id)
+            if metadata is not None and "exact_row" in metadata:
+                self._free_rows.append(metadata["exact_row"])
+        if self.vectorstore is not None and chunk_ids:
+            self.vectorstore.delete(chunk_ids)
+        for chunk_id in chunk_ids:
+            self.keyword_index.remove(chunk_id)
+            self.near_dups.remove(chunk_id)
+
+    def _chunk_metadata(self, chunk_id):
+        """Metadata of an indexed chunk, or None if it isn't in the docstore."""
+        if chunk_id is None or self.vectorstore is None:
+            return None
+        doc = self.vectorstore.docstore.search(chunk_id)
+        if not hasattr(doc, "metadata"):
+            return None
+        doc.metadata.setdefault("sources", [doc.metadata.get("doc_id")])
+        return doc.metadata
+
+    @staticmethod
+    def _doc_chunks(entry):
+        return entry["chunks"] + entry.get("shared", [])
+
+    def _release(self, doc_id, entry):
+        """Detach a document from its chunks, deleting those no other document still shares."""
+        orphaned = []
+        for chunk_id in self._doc_chunks(entry):
+            metadata = self._chunk_metadata(chunk_id)
+            if metadata is None:
+                continue
+            metadata["sources"] = [s for s in metadata["sources"] if s != doc_id]
+            if not metadata["sources"]:
+                orphaned.append(chunk_id)
+        self._delete_chunks(orphaned)
+
+    def _dedup(self, doc_id, entry, texts, metadatas, ids, pending):
+        """
+        Drop chunks that near-duplicate an indexed chunk or one pending in this update (called under lock).
+        The surviving chunk gains `doc_id` in its sources and the document lists it under 'shared'.
+        Returns the kept (texts, metadatas, ids); kept metadata is registered in `pending`.
+        """
+        kept = ([], [], [])
+        for text, metadata, chunk_id in zip(texts, metadatas, ids):
+            signature = simhash(text)
+            duplicate = self.near_dups.find(signature)
+            dup_metadata = pending.get(duplicate) or self._chunk_metadata(duplicate)
+            if dup_metadata is not None:
+                if doc_id not in dup_metadata["sources"]:
+                    dup_metadata["sources"].append(doc_id)
+                    entry.setdefault("shared", []).append(duplicate)
+                continue
+            metadata["simhash"] = signature
+            metadata["sources"] = [doc_id]
+            self.near_dups.add(chunk_id, signature)
+            pending[chunk_id] = metadata
+            for column, value in zip(kept, (text, metadata, chunk_id)):
+                column.append(value)
+        return kept
+
+    def _evict(self) -> bool:
+        """Drop the least recently used (upserted or searched) documents once the store holds more
+        than max_docs. Pinned documents (e.g. the Drive corpus) are neither counted nor evicted;
+        they stay until remove()."""
+        evictable = [d for d, entry in self.manifest.items() if not entry.get("pinned") and d not in self._streaming]
+        overflow = len(evictable) - self.max_docs
+        if overflow <= 0:
+            return False
+        oldest = sorted(evictable, key=lambda d: self.manifest[d].get("last_used", ""))[:overflow]
+        for doc_id in oldest:
+            self._release(doc_id, self.manifest.pop(doc_id))
+        return True
+
+    def upsert(self, docs, text_splitter) -> list[str]:
+        """
+        Add new documents and replace changed ones.
+        Returns the document IDs of `docs`, for scoping a subsequent search.
+        """
+        now = datetime.now().isoformat()
+        doc_ids = []
+        with self._lock:
+            changed = False
+            texts, metadatas, ids = [], [], []
+            pending = {}
+            skipped = 0
+            for doc in docs:
+                doc_id = document_id(doc)
+                doc_ids.append(doc_id)
+                digest = content_hash(doc.page_content)
+                entry = self.manifest.get(doc_id)
+                if entry and entry["hash"] == digest:
+                    entry["last_used"] = now
+                    continue
+                if entry:
+                    self._release(doc_id, entry)
+                changed = True
+
+                splits = text_splitter.split_documents([doc])
+                chunk_ids = [f"{doc_id}:{digest[:12]}:{n}" for n in range(len(splits))]
+                entry = self.manifest[doc_id] = {"hash": digest, "chunks": [], "last_used": now}
+                kept = self._dedup(
+                    doc_id, entry, [split.page_content for split in splits],
+                    [{**split.metadata, "doc_id": doc_id, "chunk_id": c} for split, c in zip(splits, chunk_ids)],
+                    chunk_ids, pending,
+                )
+                entry["chunks"] = kept[2]
+                skipped += len(splits) - len(kept[2])
+                for column, values in zip((texts, metadatas, ids), kept):
+                    column.extend(values)
+
+            if skipped:
+                print(f"Skipped {skipped} near-duplicate chunks.", file=sys.stderr)
+            if texts:
+                print(f"Encoding {len(texts)} new chunks...", file=sys.stderr)
+                self._add(texts, self.embed_model.embed_documents(texts), metadatas, ids)
+
+            if docs:
+                self._finish(changed)
+        return doc_ids
+
+    def is_current(self, doc_id: str, digest: str) -> bool:
+        """True if `doc_id` is fully indexed at `digest`, i.e. upsert_stream would skip it."""
+        with self._lock:
+            entry = self.manifest.get(doc_id)
+            return bool(entry) and entry["hash"] == digest
+
+    def remove(self, doc_ids) -> int:
+        """Drop documents (e.g. deleted files) from the index. Returns how many were indexed."""
+        with self._lock:
+            removed = [d for d in doc_ids if d in self.manifest]
+            for doc_id in removed:
+                self._release(doc_id, self.manifest.pop(doc_id))
+            if removed:
+                self._save()
+        return len(removed)
+
+    def upsert_stream(self, doc_id: str, digest: str, chunks, metadata=None, batch_size: int = STREAM_BATCH_SIZE,
+                      pinned: bool = False) -> bool:
+        """
+        Index one large document from an iterator of chunk texts, embedding `batch_size` chunks at a time
+        so memory stays flat. `digest` identifies the content (e.g. a hash of the file bytes); if it is
+        unchanged, `chunks` is never consumed. A `pinned` document is exempt from LRU eviction.
+        Only one call indexes a given doc_id at a time; others wait for it and then re-check the digest.
+        Returns True if the document was (re)indexed.
+        """
+        with self._lock:
+            while doc_id in self._streaming:
+                self._streamed.wait()
+            now = datetime.now().isoformat()
+            entry = self.manifest.get(doc_id)
+            if entry and entry["hash"] == digest:
+                entry["last_used"] = now
+                if pinned:
+                    entry["pinned"] = True
+                self._save(save_index=False)
+                return False
+            if entry:
+                self._release(doc_id, entry)
+            # Empty hash until the last batch lands, so an interrupted run is redone next time
+            entry = self.manifest[doc_id] = {"hash": "", "chunks": [], "last_used": now}
+            if pinned:
+                entry["pinned"] = True
+            self._streaming.add(doc_id)
+
+        try:
+            batch = []
+            for text in chunks:
+                batch.append(text)
+                if len(batch) >= batch_size:
+                    if not self._add_batch(doc_id, digest, entry, batch, metadata or {}):
+                        return False
+                    batch = []
+            if batch and not self._add_batch(doc_id, digest, entry, batch, metadata or {}):
+                return False
+
+            with self._lock:
+                if self.manifest.get(doc_id) is not entry:
+                    return False
+                entry["hash"] = digest
+                entry.pop("next", None)
+                self._finish(True)
+            return True
+        finally:
+            with self._lock:
+                self._streaming.discard(doc_id)
+                self._streamed.notify_all()
+
+    def _add_batch(self, doc_id, digest, entry, texts, metadata) -> bool:
+        """Embed and add one batch of a streamed document. False if the document was removed
+        (or replaced by upsert) meanwhile, in which case nothing is added."""
+        with self._lock:
+            if self.manifest.get(doc_id) is not entry:
+                return False
+            start = entry.setdefault("next", 0)
+            entry["next"] = start + len(texts)
+            ids = [f"{doc_id}:{digest[:12]}:{start + n}" for n in range(len(texts))]
+            metadatas = [{**metadata, "doc_id": doc_id, "chunk_id": chunk_id} for chunk_id in ids]
+            texts, metadatas, ids = self._dedup(doc_id, entry, texts, metadatas, ids, {})
+        if not texts:
+            return True
+        # Embed outside the lock so searches aren't blocked while a large file is indexed
+        embeddings = self.embed_model.embed_documents(texts)
+        with self._lock:
+            if self.manifest.get(doc_id) is not entry:
+                for chunk_id in ids:
+                    self.near_dups.remove(chunk_id)
+                return False
+            self._add(texts, embeddings, metadatas, ids)
+            entry["chunks"].extend(ids)
+        return True
+
+    def _add(self, texts, embeddings, metadatas, ids):
+        """Add pre-computed embeddings to the FAISS and BM25 indexes (called under lock)."""
+        if self.is_quantized:
+            for metadata, row in zip(metadatas, self._store_exact(np.asarray(embeddings, dtype=np.float32))):
+                metadata["exact_row"] = row
+        pairs = list(zip(texts, embeddings))
+        if self.vectorstore is None:
+            self.vectorstore = FAISS.from_embeddings(pairs, self.embed_model, metadatas=metadatas, ids=ids)
+        else:
+            self.vectorstore.add_embeddings(pairs, metadatas=metadatas, ids=ids)
+        for chunk_id, text in zip(ids, texts):
+            self.keyword_index.add(chunk_id, text)
+
+    def _finish(self, changed: bool):
+        """Evict, quantize if due, and persist after an update (called under lock)."""
+        changed = self._evict() or changed
+        if self._should_quantize():
+            self._quantize()
+            changed = True
+        self._save(save_index=changed)
+
+    def _allowed_chunks(self, doc_ids) -> set:
+        return {c for d in doc_ids if d in self.manifest for c in self._doc_chunks(self.manifest[d])}
+
+    @property
+    def is_quantized(self) -> bool:
+        import faiss
+        return self.vectorstore is not None and isinstance(self.vectorstore.index, faiss.IndexScalarQuantizer)
+
+    def _should_quantize(self) -> bool:
+        return (self.quantize_threshold > 0 and self.vectorstore is not None and not self.is_quantized
+                and self.vectorstore.index.ntotal >= self.quantize_threshold)
+
+    def _store_exact(self, vectors) -> list[int]:
+        """Write float32 `vectors` to free rows of the exact-vector file, growing it as needed; returns the rows."""
+        needed = len(vectors) - len(self._free_rows)
+        if needed > 0:
+            old_rows = 0 if self.exact is None else self.exact.shape[0]
+            rows = max(old_rows + needed, 2 * old_rows)
+            if self.exact is not None:
+                self.exact.flush()
+            os.makedirs(self.path, exist_ok=True)
+            with open(self._exact_path, "ab") as f:
+                f.truncate(rows * vectors.shape[1] * 4)
+            self.exact = np.memmap(self._exact_path, dtype=np.float32, mode="r+", shape=(rows, vectors.shape[1]))
+            self._free_rows.extend(range(rows - 1, old_rows - 1, -1))
+        assigned = [self._free_rows.pop() for _ in range(len(vectors))]
+        self.exact[assigned] = vectors
+        return assigned
+
+    def _quantize(self):
+        """Swap the float32 flat index for an int8 scalar-quantized one trained on the current vectors,
+        keeping the float32 vectors on disk for exact re-ranking."""
+        import faiss
+        flat = self.vectorstore.index
+        vectors = flat.reconstruct_n(0, flat.ntotal)
+        for position, row in enumerate(self._store_exact(vectors)):
+            self._chunk_metadata(self.vectorstore.index_to_docstore_id[position])["exact_row"] = row
+        index = faiss.IndexScalarQuantizer(flat.d, faiss.ScalarQuantizer.QT_8bit, flat.metric_type)
+        index.train(vectors)
+        index.add(vectors)
+        self.vectorstore.index = index
+        print(f"[VectorStore] Quantized {flat.ntotal} vectors to int8.", file=sys.stderr)
+
+    def _vector_search(self, query, k, doc_ids):
+        kwargs = {}
+        if doc_ids is not None:
+            allowed = self._allowed_chunks(doc_ids)
+            kwargs["filter"] = lambda metadata: metadata.get("chunk_id") in allowed
+            kwargs["fetch_k"] = self.vectorstore.index.ntotal
+        if not self.is_quantized:
+            return self.vectorstore.similarity_search(query, k=k, **kwargs)
+
+        # Approximate int8 distances pick the candidates; exact float32 distances order them.
+        # Candidate vectors are read from the store's float32 copies, never re-embedded.
+        candidates = self.vectorstore.similarity_search(query, k=k * RERANK_FACTOR, **kwargs)
+        if not candidates:
+            return []
+        query_vec = np.asarray(self.embed_model.embed_query(query), dtype=np.float32)
+        rows = [d.metadata.get("exact_row") for d in candidates]
+        if self.exact is not None and None not in rows:
+            doc_vecs = np.asarray(self.exact[rows])
+        else:  # an index quantized before the store kept float32 copies
+            doc_vecs = np.asarray(self.embed_model.embed_documents([d.page_content for d in candidates]), dtype=np.float32)
+        distances = ((doc_vecs - query_vec) ** 2).sum(axis=1)
+        return [candidates[i] for i in np.argsort(distances, kind="stable")[:k]]
+
+    def recall_at_k(self, queries, k: int = 5) -> float:
+        """
+        Fraction of the exact float32 top-k (over every stored chunk) that the current index
+        returns for `queries`. 1.0 for an unquantized index; use it to check int8 quality.
+        The ground truth is built from the float32 copies in `exact.f32`, not by re-embedding.
+        """
+        import faiss
+        with self._lock:
+            if self.vectorstore is None or not queries or not self.is_quantized:
+                return 1.0
+            chunk_ids = list(self.vectorstore.index_to_docstore_id.values())
+            rows = [self._chunk_metadata(c).get("exact_row") for c in chunk_ids]
+            if self.exact is not None and None not in rows:
+                vectors = np.asarray(self.exact[rows])
+            else:  # an index quantized before the store kept float32 copies
+                texts = [self.vectorstore.docstore.search(c).page_content for c in chunk_ids]
+                vectors = np.asarray(self.embed_model.embed_documents(texts), dtype=np.float32)
+            exact = faiss.IndexFlatL2(self.vectorstore.index.d)
+            exact.add(vectors)
+
+            found = total = 0
+            for query in queries:
+                query_vec = np.asarray([self.embed_model.embed_query(query)], dtype=np.float32)
+                _, rows = exact.search(query_vec, k)
+                truth = {chunk_ids[r] for r in rows[0] if r >= 0}
+                got = {d.metadata.get("chunk_id", getattr(d, "id", None)) for d in self._vector_search(query, k, None)}
+                found += len(truth & got)
+                total += len(truth)
+            return found / total if total else 1.0
+
+    def search(self, query: str, k: int = 5, doc_ids=None, hybrid: bool = False):
+        """
+        Return the top-k chunks for `query`, optionally restricted to the given document IDs.
+        With hybrid=True, vector and BM25 rankings are merged with reciprocal rank fusion.
+        """
+        with self._lock:
+            if self.vectorstore is None:
+                return []
+            if doc_ids is not None:
+                # Retrieval counts as use for LRU eviction (persisted with the next save)
+                now = datetime.now().isoformat()
+                for doc_id in doc_ids:
+                    if doc_id in self.manifest:
+                        self.manifest[doc_id]["last_used"] = now
+            if not hybrid:
+                return self._vector_search(query, k, doc_ids)
+
+            fetch_k = max(4 * k, 20)
+            vector_docs = self._vector_search(query, fetch_k, doc_ids)
+            allowed = self._allowed_chunks(doc_ids) if doc_ids is not None else None
+            keyword_hits = self.keyword_index.search(query, fetch_k, allowed_ids=allowed)
+
+            by_id = {doc.metadata.get("chunk_id", getattr(doc, "id", None)): doc for doc in vector_docs}
+            fused = reciprocal_rank_fusion([list(by_id), [chunk_id for chunk_id, _ in keyword_hits]])[:k]
+            return [by_id.get(chunk_id) or self.vectorstore.docstore.search(chunk_id) for chunk_id in fused]